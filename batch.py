@@ -0,0 +1,298 @@
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dotenv import load_dotenv
+from services.request_scheduler import BATCH, request_priority
+from services.service_registry import get_service_registry
+from utils.config_loader import DEFAULT_CONFIG_PATH, load_config
+from utils.diagram_parser import parse_mermaid_response
+from utils.logger_config import setup_logging
+from utils.rate_limiter import TokenBucket
+from utils.stream_buffer import ResponseBuffer
+
+logger = setup_logging()
+
+# File types read when the input is a directory of requirement documents
+REQUIREMENT_EXTENSIONS = (".txt", ".md")
+
+
+def read_jobs(source):
+    """Read batch jobs from a JSONL file or a directory
+
+    JSONL lines are objects with a ``requirements`` field and an optional
+    ``id``; lines without an ID are identified by their line number. In a
+    directory, every .txt and .md file is one job identified by its path
+    relative to the directory.
+
+    Args:
+        source: Path to a JSONL file or a directory
+
+    Returns:
+        Iterator[Tuple[str, str]]: (job_id, requirements) pairs
+    """
+    if os.path.isdir(source):
+        for root, dirs, files in os.walk(source):
+            dirs.sort()
+            for name in sorted(files):
+                if not name.endswith(REQUIREMENT_EXTENSIONS):
+                    continue
+                path = os.path.join(root, name)
+                with open(path, encoding="utf-8") as f:
+                    requirements = f.read().strip()
+                if requirements:
+                    yield os.path.relpath(path, source), requirements
+        return
+
+    with open(source, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                job = json.loads(line)
+            except json.JSONDecodeError as e:
+                logger.warning(f"Skipping invalid JSON on line {line_number}: {str(e)}")
+                continue
+            if not isinstance(job, dict):
+                logger.warning(f"Skipping line {line_number}: expected a JSON object, got {type(job).__name__}")
+                continue
+            requirements = job.get("requirements")
+            requirements = requirements.strip() if isinstance(requirements, str) else ""
+            if not requirements:
+                logger.warning(f"Skipping line {line_number}: no requirements")
+                continue
+            yield str(job.get("id", line_number)), requirements
+
+
+def load_checkpoint(output_path):
+    """Get the IDs of jobs already completed in a previous run
+
+    The output file is the checkpoint: every finished job is one line.
+    Failed jobs are not counted as done, so a resumed run retries them. A
+    torn last line from an interrupted write, or any line that is not a
+    JSON object, is ignored.
+
+    Args:
+        output_path: Path to the results JSONL file
+
+    Returns:
+        Set[str]: Completed job IDs
+    """
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                result = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if isinstance(result, dict) and result.get("status") == "ok":
+                done.add(str(result.get("id")))
+    return done
+
+
+class ResultWriter:
+    """Append results to a JSONL file, one flushed line per job"""
+
+    def __init__(self, output_path):
+        """Open the output file for appending
+
+        Args:
+            output_path: Path to the results JSONL file
+        """
+        directory = os.path.dirname(output_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Terminate a torn last line so the next result starts on its own line
+        needs_newline = False
+        if os.path.exists(output_path) and os.path.getsize(output_path):
+            with open(output_path, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                needs_newline = f.read(1) != b"\n"
+        self._file = open(output_path, "a", encoding="utf-8")
+        if needs_newline:
+            self._file.write("\n")
+        self._lock = threading.Lock()
+
+    def write(self, result):
+        """Write one result and flush it to disk
+
+        Args:
+            result: JSON-serializable result
+        """
+        line = json.dumps(result, ensure_ascii=False) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
+
+
+def run_job(service, job_id, requirements, model, limiter):
+    """Generate one diagram and collect timings
+
+    Args:
+        service: DiagramGenerationService
+        job_id: Job ID
+        requirements: The requirements text
+        model: Optional model ID
+        limiter: Optional TokenBucket gating request starts
+
+    Model calls run at batch priority, so interactive requests sharing the
+    provider quota are admitted first.
+
+    Returns:
+        Dict: Result line for the output file
+    """
+    queued = time.perf_counter()
+    if limiter:
+        limiter.acquire()
+    start = time.perf_counter()
+    result = {"id": job_id, "model": model or service.specialist.model_id}
+
+    try:
+        buffer = ResponseBuffer()
+        first_token = None
+        with request_priority(BATCH):
+            for response in service.generate(requirements, model):
+                if response.content:
+                    if first_token is None:
+                        first_token = time.perf_counter()
+                    buffer.append(response.content)
+
+        diagrams, explanation = parse_mermaid_response(buffer.getvalue())
+        code, diagram = None, None
+        if diagrams:
+            with request_priority(BATCH):
+                code, diagram = service.validate_diagram(diagrams[0], model)
+        result.update({
+            "status": "no_diagram" if not diagrams else "ok" if diagram.is_valid else "invalid_diagram",
+            "diagram": code,
+            "errors": diagram.errors if diagram else [],
+            "explanation": explanation,
+            "ttft_seconds": round(first_token - start, 3) if first_token else None,
+        })
+    except Exception as e:
+        logger.error(f"Job {job_id} failed: {str(e)}")
+        result.update({"status": "error", "error": str(e)})
+
+    end = time.perf_counter()
+    result["wait_seconds"] = round(start - queued, 3)
+    result["elapsed_seconds"] = round(end - start, 3)
+    return result
+
+
+def run_batch(source, output_path, config_path=DEFAULT_CONFIG_PATH, workers=None,
+              requests_per_minute=None, model=None):
+    """Run every job in a source through the diagram service
+
+    Results are written as they complete, so an interrupted run resumes
+    from the output file and skips jobs that already succeeded.
+
+    Args:
+        source: Path to a JSONL file or a directory
+        output_path: Path to the results JSONL file
+        config_path: Path to configuration file
+        workers: Concurrent generations, defaults to batch.workers
+        requests_per_minute: Request start rate, defaults to batch.requests_per_minute
+        model: Optional model ID for every job
+
+    Returns:
+        Dict: Counts of succeeded, failed and skipped jobs
+    """
+    batch_config = load_config(config_path).get("batch", {})
+    workers = workers or batch_config.get("workers", 4)
+    requests_per_minute = requests_per_minute or batch_config.get("requests_per_minute")
+    limiter = None
+    if requests_per_minute:
+        limiter = TokenBucket.per_minute(requests_per_minute, batch_config.get("burst", workers))
+
+    service = get_service_registry().get_diagram_service(config_path)
+    done = load_checkpoint(output_path)
+    if done:
+        logger.info(f"Resuming: {len(done)} jobs already completed in {output_path}")
+
+    counts = {"ok": 0, "failed": 0, "skipped": 0}
+    writer = ResultWriter(output_path)
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="batch")
+    pending = set()
+    start = time.perf_counter()
+
+    def collect(finished):
+        for future in finished:
+            result = future.result()
+            writer.write(result)
+            counts["ok" if result["status"] == "ok" else "failed"] += 1
+            logger.info(f"[{counts['ok'] + counts['failed']}] {result['id']}: "
+                        f"{result['status']} in {result['elapsed_seconds']}s")
+
+    try:
+        seen = set()
+        for job_id, requirements in read_jobs(source):
+            if job_id in done or job_id in seen:
+                counts["skipped"] += 1
+                continue
+            seen.add(job_id)
+            # Keep a bounded window of submitted jobs rather than queueing the whole input
+            if len(pending) >= workers * 2:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                collect(finished)
+            pending.add(executor.submit(run_job, service, job_id, requirements, model, limiter))
+
+        while pending:
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            collect(finished)
+    except KeyboardInterrupt:
+        logger.warning("Interrupted; saving running jobs, completed jobs are skipped on resume")
+        for future in pending:
+            future.cancel()
+        finished, _ = wait(pending)
+        collect(future for future in finished if not future.cancelled())
+        raise
+    finally:
+        executor.shutdown(wait=True)
+        writer.close()
+
+    elapsed = time.perf_counter() - start
+    completed = counts["ok"] + counts["failed"]
+    logger.info(f"Batch finished: {counts['ok']} ok, {counts['failed']} failed, "
+                f"{counts['skipped']} skipped in {elapsed:.1f}s "
+                f"({completed / elapsed * 60 if elapsed else 0:.1f} jobs/min)")
+    return counts
+
+
+def main():
+    """Command-line entry point for batch diagram generation"""
+    parser = argparse.ArgumentParser(
+        description="Generate architecture diagrams for many requirement documents"
+    )
+    parser.add_argument("source", help="JSONL file of {id, requirements} or a directory of .txt/.md files")
+    parser.add_argument("-o", "--output", default="batch_results.jsonl",
+                        help="Results JSONL file, also used as the resume checkpoint")
+    parser.add_argument("-w", "--workers", type=int, help="Concurrent generations")
+    parser.add_argument("--rpm", type=float, help="Maximum requests started per minute")
+    parser.add_argument("--model", help="Model ID for every job")
+    parser.add_argument("--config", default=DEFAULT_CONFIG_PATH, help="Path to configuration file")
+    args = parser.parse_args()
+
+    load_dotenv()
+    if not os.getenv("GROQ_API_KEY"):
+        print("ERROR: Missing required environment variables: GROQ_API_KEY")
+        sys.exit(1)
+
+    try:
+        counts = run_batch(args.source, args.output, args.config, args.workers, args.rpm, args.model)
+    except KeyboardInterrupt:
+        sys.exit(130)
+    sys.exit(1 if counts["failed"] else 0)
+
+
+if __name__ == "__main__":
+    main()
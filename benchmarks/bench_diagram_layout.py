@@ -0,0 +1,91 @@
+"""Micro-benchmark: level-of-detail layout of large generated flowcharts
+
+Builds flowcharts with and without subgraphs, then times the overview and
+every drill-down view. Reports the node count of the largest view, which
+must stay within --max-nodes however big the diagram is. Run from the
+repository root:
+
+    python benchmarks/bench_diagram_layout.py
+    python benchmarks/bench_diagram_layout.py --sizes 500 5000 --max-nodes 30
+"""
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.diagram_layout import DiagramLayout  # noqa: E402
+from utils.mermaid_ast import parse_mermaid  # noqa: E402
+
+
+def build_flat(nodes, seed=0):
+    """A flowchart without subgraphs; most links stay between nearby services"""
+    rng = random.Random(seed)
+    lines = ["graph LR"]
+    for i in range(1, nodes):
+        j = rng.randrange(max(0, i - 8), i) if rng.random() < 0.9 else rng.randrange(i)
+        label = f"|call {i}|" if i % 4 == 0 else ""
+        lines.append(f"    S{j}[Service {j}] -->{label} S{i}[Service {i}]")
+    return "\n".join(lines)
+
+
+def build_nested(nodes, seed=0):
+    """A flowchart of domains with nested zones, linked within and across domains"""
+    rng = random.Random(seed)
+    per_zone = 12
+    zones = max(1, nodes // per_zone)
+    domains = max(1, zones // 4)
+    lines = ["flowchart TD"]
+    ids = []
+    for domain in range(domains):
+        lines.append(f"    subgraph D{domain}[Domain {domain}]")
+        for zone in range(domain, zones, domains):
+            lines.append(f"        subgraph Z{zone}[Zone {zone}]")
+            for n in range(per_zone):
+                lines.append(f"            N{zone}_{n}(Component {zone}.{n})")
+                ids.append(f"N{zone}_{n}")
+            lines.append("        end")
+        lines.append("    end")
+    for zone in range(zones):
+        for n in range(1, per_zone):
+            lines.append(f"    N{zone}_{rng.randrange(n)} --> N{zone}_{n}")
+    for _ in range(len(ids) // 10):
+        lines.append(f"    {rng.choice(ids)} -.-> {rng.choice(ids)}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[200, 1000, 5000])
+    parser.add_argument("--max-nodes", type=int, default=40)
+    args = parser.parse_args()
+
+    print(f"{'diagram':>8} {'nodes':>6} {'clusters':>9} {'parse':>10} {'overview':>10} {'all views':>10} "
+          f"{'largest view':>13}")
+    for name, build in (("flat", build_flat), ("nested", build_nested)):
+        for size in args.sizes:
+            code = build(size)
+            start = time.perf_counter()
+            diagram = parse_mermaid(code)
+            parsed = time.perf_counter()
+            layout = DiagramLayout(diagram, args.max_nodes)
+            overview = layout.overview()
+            laid_out = time.perf_counter()
+            views = [overview] + [layout.detail(cluster[0]) for cluster in layout.list_clusters()]
+            finished = time.perf_counter()
+
+            largest = 0
+            for view in views:
+                view_diagram = parse_mermaid(view)
+                assert view_diagram.is_valid, view_diagram.errors
+                largest = max(largest, len(view_diagram.nodes))
+            assert largest <= args.max_nodes, f"a view shows {largest} nodes"
+
+            print(f"{name:>8} {len(diagram.nodes):>6} {len(views) - 1:>9} {(parsed - start) * 1000:>8.2f}ms "
+                  f"{(laid_out - parsed) * 1000:>8.2f}ms {(finished - parsed) * 1000:>8.2f}ms {largest:>13}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Micro-benchmark: streaming Mermaid parser vs. the legacy regex extraction
+
+Run from the repository root:
+
+    python benchmarks/bench_diagram_parser.py
+"""
+import os
+import re
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.diagram_parser import (  # noqa: E402
+    MermaidStreamParser, DIAGRAM_COMPLETE, EXPLANATION_TEXT
+)
+
+
+def legacy_extract(text):
+    """The previous post-hoc path: DOTALL regex, str.find fallback, re.sub explanation"""
+    code = None
+    match = re.search(r'```mermaid\s*(.*?)\s*```', text, re.DOTALL)
+    if match:
+        code = match.group(1).strip()
+    elif '```mermaid' in text and '```' in text[text.find('```mermaid') + 10:]:
+        start = text.find('```mermaid') + 10
+        end = text.find('```', start)
+        if start > 10 and end > start:
+            code = text[start:end].strip()
+    explanation = re.sub(r'```mermaid\n.*?\n```', '', text, flags=re.DOTALL).strip()
+    return code, explanation
+
+
+def streaming_extract(chunks):
+    """The new path: one push per streamed chunk"""
+    parser = MermaidStreamParser()
+    code = None
+    explanation = []
+    for chunk in chunks:
+        for event in parser.push(chunk):
+            if event.kind == EXPLANATION_TEXT:
+                explanation.append(event.text)
+            elif event.kind == DIAGRAM_COMPLETE and code is None:
+                code = event.text
+    for event in parser.close():
+        if event.kind == EXPLANATION_TEXT:
+            explanation.append(event.text)
+    return code, "".join(explanation).strip()
+
+
+def build_response(blocks, edges_per_block, prose_words):
+    """Build a synthetic multi-block model response"""
+    parts = []
+    for block in range(blocks):
+        parts.append(" ".join(f"word{i}" for i in range(prose_words)) + "\n\n")
+        lines = ["graph LR"] + [f"    N{block}_{i}[Service {i}] --> N{block}_{i + 1}[Service {i + 1}]"
+                                for i in range(edges_per_block)]
+        parts.append("```mermaid\n" + "\n".join(lines) + "\n```\n\n")
+    parts.append("Closing remarks about the architecture.\n")
+    return "".join(parts)
+
+
+def chunk_text(text, size):
+    """Split text into stream-sized chunks"""
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+def time_call(func, arg, repeat):
+    """Return the best wall time of repeat calls"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(arg)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--chunk-size", type=int, default=16,
+                        help="Characters per simulated stream chunk")
+    args = parser.parse_args()
+
+    print(f"{'blocks':>6} {'edges':>6} {'bytes':>9} {'legacy final':>13} "
+          f"{'legacy/chunk':>13} {'stream total':>13}")
+
+    for blocks, edges in [(1, 50), (4, 500), (16, 2000)]:
+        text = build_response(blocks, edges, prose_words=200)
+        chunks = chunk_text(text, args.chunk_size)
+
+        # Legacy path run once on the final text
+        legacy_final = time_call(legacy_extract, text, args.repeat)
+
+        # Legacy path run on every accumulated prefix, as live detection would require
+        prefixes = ["".join(chunks[:i + 1]) for i in range(0, len(chunks), max(1, len(chunks) // 50))]
+        per_prefix = time_call(lambda ps: [legacy_extract(p) for p in ps], prefixes, 1)
+        legacy_live = per_prefix * len(chunks) / len(prefixes)
+
+        stream_total = time_call(streaming_extract, chunks, args.repeat)
+
+        assert streaming_extract(chunks)[0] == legacy_extract(text)[0]
+
+        print(f"{blocks:>6} {edges:>6} {len(text):>9} {legacy_final * 1000:>11.2f}ms "
+              f"{legacy_live * 1000:>11.2f}ms {stream_total * 1000:>11.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
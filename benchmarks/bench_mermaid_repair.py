@@ -0,0 +1,95 @@
+"""Micro-benchmark: single-pass Mermaid lexer vs. the legacy regex repair
+
+Times both repairs on collapsed flowcharts and sequence diagrams with
+thousands of edges and reports the cost per edge, which stays flat when
+the repair scales linearly. Validation (parse_mermaid) of the repaired
+code is timed alongside. Run from the repository root:
+
+    python benchmarks/bench_mermaid_repair.py
+    python benchmarks/bench_mermaid_repair.py --sizes 1000 4000 16000
+"""
+import os
+import re
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.mermaid_ast import parse_mermaid  # noqa: E402
+from utils.mermaid_lexer import repair_mermaid  # noqa: E402
+
+
+def legacy_repair(code):
+    """The previous repair: five newline-inserting re.sub passes plus fixes"""
+    repaired = code
+    repaired = re.sub(r'(\w+)-->', r'\n\1-->', repaired)
+    repaired = re.sub(r'(\w+)-.->(\w+)', r'\n\1-.-> \2', repaired)
+    repaired = re.sub(r'(participant\s+\w+)', r'\n\1', repaired)
+    repaired = re.sub(r'(\w+)->>', r'\n\1->>', repaired)
+    repaired = re.sub(r'(\w+)\[', r'\n\1[', repaired)
+    repaired = re.sub(r'-->(\|[^|]+\|)>', r'-->\1', repaired)
+    if not re.match(r'^(graph|sequenceDiagram|classDiagram|gantt|pie|flowchart)', repaired.strip()):
+        if 'participant' in repaired:
+            repaired = "sequenceDiagram\n" + repaired
+        else:
+            repaired = "graph LR\n" + repaired
+    return repaired
+
+
+def build_flowchart(edges):
+    """A collapsed flowchart with labelled nodes and edges"""
+    parts = ["graph TD"]
+    for i in range(edges):
+        label = f"|call {i}|" if i % 3 == 0 else ""
+        parts.append(f"Service{i}[Service {i}] -->{label} Service{i + 1}((Store {i + 1}))")
+    return " ".join(parts)
+
+
+def build_sequence(edges, participants=20):
+    """A collapsed sequence diagram with messages between participants"""
+    parts = ["sequenceDiagram"] + [f"participant P{i}" for i in range(participants)]
+    for i in range(edges):
+        parts.append(f"P{i % participants}->>P{(i + 7) % participants}: request {i} with payload")
+    return " ".join(parts)
+
+
+def time_call(func, arg, repeat):
+    """Return the best wall time of repeat calls"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(arg)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[500, 2000, 8000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'diagram':>10} {'edges':>6} {'bytes':>9} {'legacy':>11} {'lexer':>11} {'lexer us/edge':>14} "
+          f"{'validate':>11}")
+    for name, build in (("flowchart", build_flowchart), ("sequence", build_sequence)):
+        per_edge = []
+        for edges in args.sizes:
+            code = build(edges)
+            legacy = time_call(legacy_repair, code, args.repeat)
+            lexer = time_call(repair_mermaid, code, args.repeat)
+            per_edge.append(lexer / edges * 1e6)
+
+            repaired = repair_mermaid(code)
+            assert repaired.count("\n") >= edges, "every edge should end up on its own line"
+            assert repair_mermaid(repaired) == repaired
+            assert parse_mermaid(repaired).is_valid
+            validate = time_call(parse_mermaid, repaired, args.repeat)
+
+            print(f"{name:>10} {edges:>6} {len(code):>9} {legacy * 1000:>9.2f}ms "
+                  f"{lexer * 1000:>9.2f}ms {per_edge[-1]:>14.2f} {validate * 1000:>9.2f}ms")
+        print(f"{name:>10} per-edge cost, largest vs. smallest size: {per_edge[-1] / per_edge[0]:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
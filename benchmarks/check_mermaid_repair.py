@@ -0,0 +1,212 @@
+"""Regression corpus and fuzz check for the Mermaid repair lexer and validator
+
+Replays benchmarks/fixtures/mermaid_corpus.jsonl, then fuzzes the lexer
+and validator with generated diagrams of every supported type. Run from
+the repository root:
+
+    python benchmarks/check_mermaid_repair.py
+    python benchmarks/check_mermaid_repair.py --cases 5000 --seed 7
+
+For each generated diagram the check verifies that repair never raises,
+that it is idempotent, that collapsing the diagram onto one line and
+repairing it gives back the original, that the result validates, and
+that randomly damaged input still repairs and validates without error.
+Exits with status 1 on any failure.
+"""
+import os
+import sys
+import json
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.mermaid_ast import parse_mermaid, validate_and_repair  # noqa: E402
+from utils.mermaid_lexer import repair_mermaid  # noqa: E402
+
+CORPUS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "mermaid_corpus.jsonl")
+
+WORDS = ("api", "cache", "queue", "user", "order", "payment", "auth", "store", "worker", "report")
+FLOW_SHAPES = ("[{}]", "({})", "(({}))", "([{}])", "[[{}]]", "[({})]", "{{{{{}}}}}", "{{{}}}", "[/{}/]", ">{}]")
+FLOW_ARROWS = ("-->", "---", "-.->", "==>", "--o", "--x", "<-->", "o--o", "x--x", "~~~")
+SEQUENCE_ARROWS = ("->>", "-->>", "->", "-->", "-x", "--x", "-)", "--)")
+CLASS_ARROWS = ("<|--", "*--", "o--", "-->", "..>", "..|>", "--", "..")
+
+
+def load_corpus(path=CORPUS_PATH):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _name(rng):
+    return f"{rng.choice(WORDS).capitalize()}{rng.randint(1, 99)}"
+
+
+def _text(rng, words=3):
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, words)))
+
+
+def flowchart(rng, size):
+    lines = [f"graph {rng.choice(('TD', 'LR', 'BT', 'RL'))}"]
+    nodes = [_name(rng) for _ in range(max(2, size))]
+    depth = 1
+    for index in range(size):
+        indent = "    " * depth
+        if depth == 1 and rng.random() < 0.1:
+            lines.append(f"{indent}subgraph {_name(rng)}")
+            depth += 1
+            continue
+        if depth > 1 and rng.random() < 0.2:
+            depth -= 1
+            lines.append(f"{'    ' * depth}end")
+            continue
+        source = rng.choice(nodes)
+        target = rng.choice(nodes)
+        if rng.random() < 0.5:
+            source += rng.choice(FLOW_SHAPES).format(_text(rng))
+        if rng.random() < 0.5:
+            target += rng.choice(FLOW_SHAPES).format(_text(rng))
+        arrow = rng.choice(FLOW_ARROWS)
+        if rng.random() < 0.3 and arrow not in ("~~~",):
+            arrow += f"|{_text(rng)}|"
+        lines.append(f"{indent}{source} {arrow} {target}")
+    while depth > 1:
+        depth -= 1
+        lines.append(f"{'    ' * depth}end")
+    if rng.random() < 0.5:
+        lines.append(f"    style {rng.choice(nodes)} fill:#f9f,stroke:#333")
+    return "\n".join(lines)
+
+
+def sequence(rng, size):
+    actors = [_name(rng) for _ in range(rng.randint(2, 5))]
+    lines = ["sequenceDiagram"] + [f"    participant {actor}" for actor in actors]
+    depth = 1
+    for _ in range(size):
+        indent = "    " * depth
+        roll = rng.random()
+        if roll < 0.1:
+            lines.append(f"{indent}{rng.choice(('loop', 'alt', 'opt', 'par'))} {_text(rng)}")
+            depth += 1
+        elif roll < 0.2 and depth > 1:
+            depth -= 1
+            lines.append(f"{'    ' * depth}end")
+        elif roll < 0.25:
+            lines.append(f"{indent}Note over {rng.choice(actors)}: {_text(rng)}")
+        else:
+            arrow = rng.choice(SEQUENCE_ARROWS)
+            lines.append(f"{indent}{rng.choice(actors)}{arrow}{rng.choice(actors)}: {_text(rng, 5)}")
+    while depth > 1:
+        depth -= 1
+        lines.append(f"{'    ' * depth}end")
+    return "\n".join(lines)
+
+
+def class_diagram(rng, size):
+    classes = [_name(rng) for _ in range(max(2, size // 3))]
+    lines = ["classDiagram"]
+    for name in classes[:max(1, size // 4)]:
+        lines.append(f"    class {name} {{")
+        for _ in range(rng.randint(1, 3)):
+            visibility = rng.choice("+-#~")
+            member = rng.choice(WORDS)
+            lines.append(f"        {visibility}{member}() {rng.choice(('void', 'int'))}"
+                         if rng.random() < 0.5 else f"        {visibility}String {member}")
+        lines.append("    }")
+    for _ in range(size):
+        relation = f"    {rng.choice(classes)} {rng.choice(CLASS_ARROWS)} {rng.choice(classes)}"
+        if rng.random() < 0.3:
+            relation += f" : {rng.choice(WORDS)}"
+        lines.append(relation)
+    return "\n".join(lines)
+
+
+def gantt(rng, size):
+    lines = ["gantt", f"    title {_text(rng).capitalize()}", "    dateFormat YYYY-MM-DD"]
+    for index in range(size):
+        if index % 4 == 0:
+            lines.append(f"    section {rng.choice(WORDS).capitalize()}")
+        start = f"after t{index - 1}" if index and rng.random() < 0.5 else f"2024-01-{rng.randint(10, 28)}"
+        lines.append(f"    {_text(rng).capitalize()} :t{index}, {start}, {rng.randint(1, 30)}d")
+    return "\n".join(lines)
+
+
+def pie(rng, size):
+    lines = ["pie", f"    title {_text(rng).capitalize()}"]
+    lines += [f'    "{_text(rng)}" : {rng.randint(1, 500)}' for _ in range(size)]
+    return "\n".join(lines)
+
+
+GENERATORS = (flowchart, sequence, class_diagram, gantt, pie)
+
+
+def collapse(code):
+    """Join a diagram onto one line, as models sometimes return it"""
+    return " ".join(line.strip() for line in code.splitlines())
+
+
+def damage(rng, code):
+    """Truncate the code or splice in random characters"""
+    if rng.random() < 0.5:
+        return code[:rng.randint(0, len(code))]
+    position = rng.randint(0, len(code))
+    junk = "".join(rng.choice("[](){}|>-\"':;%&\n ") for _ in range(rng.randint(1, 5)))
+    return code[:position] + junk + code[position:]
+
+
+def check_corpus(failures):
+    cases = load_corpus()
+    for case in cases:
+        actual = repair_mermaid(case["input"])
+        if actual != case["expected"]:
+            failures.append(f"corpus {case['name']}: expected\n{case['expected']}\ngot\n{actual}")
+        _, diagram = validate_and_repair(case["input"])
+        if diagram.is_valid != case.get("valid", True):
+            failures.append(f"corpus {case['name']}: expected valid={case.get('valid', True)}, "
+                            f"got errors {diagram.errors}")
+    return len(cases)
+
+
+def check_fuzz(cases, seed, failures):
+    rng = random.Random(seed)
+    for index in range(cases):
+        generator = GENERATORS[index % len(GENERATORS)]
+        original = generator(rng, rng.randint(1, 12))
+        label = f"{generator.__name__} #{index}"
+        try:
+            formatted = repair_mermaid(original)
+            if repair_mermaid(formatted) != formatted:
+                failures.append(f"{label}: repair is not idempotent\n{original}")
+            if original.count("\n") >= 3 and formatted != original:
+                failures.append(f"{label}: well-formed input changed\n{original}\n---\n{formatted}")
+            if repair_mermaid(collapse(original)) != formatted:
+                failures.append(f"{label}: collapsed input did not round-trip\n{collapse(original)}\n---\n"
+                                f"{repair_mermaid(collapse(original))}\n---\n{formatted}")
+            diagram = parse_mermaid(formatted)
+            if not diagram.is_valid:
+                failures.append(f"{label}: valid diagram rejected: {diagram.errors}\n{formatted}")
+            validate_and_repair(damage(rng, original))
+            validate_and_repair(damage(rng, collapse(original)))
+        except Exception as e:
+            failures.append(f"{label}: raised {e!r}\n{original}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cases", type=int, default=2000, help="Generated diagrams to fuzz")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--show", type=int, default=5, help="Failures to print")
+    args = parser.parse_args()
+
+    failures = []
+    corpus_size = check_corpus(failures)
+    check_fuzz(args.cases, args.seed, failures)
+
+    for failure in failures[:args.show]:
+        print(f"FAIL {failure}\n")
+    print(f"{corpus_size} corpus cases, {args.cases} fuzz cases, {len(failures)} failures")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""Deterministic offline stand-in for the Groq chat completions API
+
+The fake replaces the SDK clients behind agno ``Groq`` models, so agents,
+pools, the router and the parser all run exactly as in production while
+responses come from recorded fixtures at a configurable token rate.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import random
+import time
+import uuid
+from types import SimpleNamespace
+
+FIXTURES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "responses.jsonl")
+
+# Characters per simulated token, matching the scheduler's estimate
+CHARS_PER_TOKEN = 4
+
+
+def load_responses(path=FIXTURES_PATH):
+    """Load recorded responses
+
+    Args:
+        path: JSONL file of {match, response} objects; the first entry whose
+            match string occurs in the prompt is replayed, "" matches anything
+
+    Returns:
+        List[Tuple[str, str]]: (match, response) pairs
+    """
+    with open(path, encoding="utf-8") as f:
+        return [(entry["match"].lower(), entry["response"])
+                for entry in (json.loads(line) for line in f if line.strip())]
+
+
+class FakeCompletions:
+    """Replay recorded responses as chat completion chunks"""
+
+    def __init__(self, responses, ttft=0.3, tokens_per_second=250.0, tokens_per_chunk=4,
+                 jitter=0.1, seed=0):
+        """Initialize the fake
+
+        Args:
+            responses: (match, response) pairs from load_responses()
+            ttft: Seconds before the first chunk
+            tokens_per_second: Streaming rate after the first chunk
+            tokens_per_chunk: Simulated tokens per streamed chunk
+            jitter: Relative random variation applied to every delay
+            seed: Seed for the jitter; the same prompt and seed give the same delays
+        """
+        self.responses = responses
+        self.ttft = ttft
+        self.tokens_per_second = tokens_per_second
+        self.tokens_per_chunk = tokens_per_chunk
+        self.jitter = jitter
+        self.seed = seed
+        self.calls = 0
+
+    def _plan(self, messages):
+        """Pick the response and per-chunk delays for a request"""
+        self.calls += 1
+        prompt = ""
+        for message in messages or ():
+            if _field(message, "role") == "user":
+                prompt = str(_field(message, "content") or "")
+        lowered = prompt.lower()
+        response = next((text for match, text in self.responses if match in lowered), self.responses[-1][1])
+
+        digest = hashlib.sha256(f"{self.seed}:{prompt}".encode("utf-8")).digest()
+        rng = random.Random(int.from_bytes(digest[:8], "big"))
+
+        def jittered(delay):
+            return max(0.0, delay * (1 + rng.uniform(-self.jitter, self.jitter)))
+
+        size = self.tokens_per_chunk * CHARS_PER_TOKEN
+        pieces = [response[i:i + size] for i in range(0, len(response), size)]
+        chunk_delay = self.tokens_per_chunk / self.tokens_per_second
+        delays = [jittered(self.ttft)] + [jittered(chunk_delay) for _ in pieces[1:]]
+        prompt_tokens = max(1, len(prompt) // CHARS_PER_TOKEN)
+        return pieces, delays, prompt_tokens
+
+    def _chunks(self, model, pieces, prompt_tokens):
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        for index, piece in enumerate(pieces):
+            last = index == len(pieces) - 1
+            yield _chunk(completion_id, model, piece, "stop" if last else None,
+                         _usage(prompt_tokens, len("".join(pieces)) // CHARS_PER_TOKEN) if last else None)
+
+    def create(self, model=None, messages=None, stream=False, **kwargs):
+        """Sync chat.completions.create"""
+        pieces, delays, prompt_tokens = self._plan(messages)
+        if not stream:
+            time.sleep(sum(delays))
+            return _completion(model, "".join(pieces), prompt_tokens)
+
+        def generate():
+            for delay, chunk in zip(delays, self._chunks(model, pieces, prompt_tokens)):
+                time.sleep(delay)
+                yield chunk
+        return generate()
+
+
+class FakeAsyncCompletions(FakeCompletions):
+    """Async counterpart of FakeCompletions"""
+
+    async def create(self, model=None, messages=None, stream=False, **kwargs):
+        """Async chat.completions.create"""
+        pieces, delays, prompt_tokens = self._plan(messages)
+        if not stream:
+            await asyncio.sleep(sum(delays))
+            return _completion(model, "".join(pieces), prompt_tokens)
+
+        async def generate():
+            for delay, chunk in zip(delays, self._chunks(model, pieces, prompt_tokens)):
+                await asyncio.sleep(delay)
+                yield chunk
+        return generate()
+
+
+def _field(message, name):
+    """Read a message field from a dict or a message object"""
+    return message.get(name) if isinstance(message, dict) else getattr(message, name, None)
+
+
+def _usage(prompt_tokens, completion_tokens):
+    return SimpleNamespace(
+        prompt_tokens=prompt_tokens,
+        completion_tokens=completion_tokens,
+        total_tokens=prompt_tokens + completion_tokens,
+        queue_time=0.0,
+        prompt_time=0.0,
+        completion_time=0.0,
+        total_time=0.0,
+    )
+
+
+def _chunk(completion_id, model, content, finish_reason, usage):
+    """Build an object shaped like groq.types.chat.ChatCompletionChunk"""
+    delta = SimpleNamespace(role="assistant", content=content, tool_calls=None, function_call=None)
+    return SimpleNamespace(
+        id=completion_id,
+        object="chat.completion.chunk",
+        created=int(time.time()),
+        model=model,
+        choices=[SimpleNamespace(index=0, delta=delta, finish_reason=finish_reason, logprobs=None)],
+        usage=None,
+        x_groq=SimpleNamespace(id=completion_id, usage=usage),
+    )
+
+
+def _completion(model, content, prompt_tokens):
+    """Build an object shaped like groq.types.chat.ChatCompletion"""
+    message = SimpleNamespace(role="assistant", content=content, tool_calls=None, function_call=None)
+    return SimpleNamespace(
+        id=f"chatcmpl-{uuid.uuid4().hex[:12]}",
+        object="chat.completion",
+        created=int(time.time()),
+        model=model,
+        choices=[SimpleNamespace(index=0, message=message, finish_reason="stop", logprobs=None)],
+        usage=_usage(prompt_tokens, len(content) // CHARS_PER_TOKEN),
+    )
+
+
+def install_fake_clients(models, **options):
+    """Point Groq models at fake sync and async clients
+
+    Args:
+        models: agno Groq model instances, e.g. ModelProviderService.providers["groq"].values()
+        **options: FakeCompletions options (ttft, tokens_per_second, jitter, seed, ...)
+
+    Returns:
+        Tuple[FakeCompletions, FakeAsyncCompletions]: The installed fakes, for call counts
+    """
+    responses = options.pop("responses", None) or load_responses()
+    completions = FakeCompletions(responses, **options)
+    async_completions = FakeAsyncCompletions(responses, **options)
+    # agno checks is_closed() before reusing a cached client
+    client = SimpleNamespace(chat=SimpleNamespace(completions=completions), is_closed=lambda: False)
+    async_client = SimpleNamespace(chat=SimpleNamespace(completions=async_completions),
+                                   is_closed=lambda: False)
+    for model in models:
+        model.client = client
+        model.async_client = async_client
+    return completions, async_completions
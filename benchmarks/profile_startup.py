@@ -0,0 +1,120 @@
+"""Startup profile: import-time cost of the application entry points
+
+Each target is imported in a fresh interpreter with ``-X importtime``, so
+the numbers reflect a cold worker. Run from the repository root:
+
+    python benchmarks/profile_startup.py
+    python benchmarks/profile_startup.py --target ui.dashboard --top 30
+    python benchmarks/profile_startup.py --budget-ms 1500
+
+With --budget-ms, the run exits with status 1 when any target's total
+import time exceeds the budget.
+"""
+import os
+import re
+import sys
+import json
+import argparse
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules imported before the first paint or the first request
+DEFAULT_TARGETS = ("ui.dashboard", "server", "batch")
+
+# Packages that should only load on first generation
+DEFERRED_PACKAGES = ("agno", "groq", "duckduckgo_search", "streamlit_mermaid", "anthropic")
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def profile_import(target):
+    """Import a module in a fresh interpreter and parse its -X importtime output
+
+    Args:
+        target: Dotted module name
+
+    Returns:
+        Dict: Total microseconds, per-module (self, cumulative, depth) and errors
+    """
+    env = dict(os.environ, GROQ_API_KEY=os.environ.get("GROQ_API_KEY", "startup-profile"))
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+        cwd=ROOT, env=env, capture_output=True, text=True
+    )
+
+    modules = []
+    other = []
+    for line in completed.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            modules.append((name, int(self_us), int(cumulative_us), len(indent) // 2))
+        elif not line.startswith("import time:"):
+            other.append(line)
+
+    top_level = [module for module in modules if module[3] == 0]
+    return {
+        "target": target,
+        "ok": completed.returncode == 0,
+        "error": "\n".join(other[-5:]) if completed.returncode else None,
+        "total_ms": round(sum(module[2] for module in top_level) / 1000, 1),
+        "modules": modules,
+    }
+
+
+def deferred_violations(modules):
+    """Deferred packages that were imported anyway"""
+    loaded = {name.split(".")[0] for name, _, _, _ in modules}
+    return sorted(loaded.intersection(DEFERRED_PACKAGES))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--target", action="append", help="Module to profile; repeatable")
+    parser.add_argument("--top", type=int, default=15, help="Slowest top-level imports to list")
+    parser.add_argument("--budget-ms", type=float, help="Fail when a target exceeds this import time")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    args = parser.parse_args()
+
+    failed = False
+    reports = []
+    for target in args.target or DEFAULT_TARGETS:
+        report = profile_import(target)
+        report["deferred_loaded"] = deferred_violations(report["modules"])
+        reports.append(report)
+
+        over_budget = args.budget_ms is not None and report["total_ms"] > args.budget_ms
+        failed |= over_budget or not report["ok"]
+        if args.json:
+            continue
+
+        status = "over budget" if over_budget else "ok" if report["ok"] else "import failed"
+        print(f"\n{target}: {report['total_ms']:.1f} ms ({status})")
+        if report["error"]:
+            print(f"  {report['error']}")
+        if report["deferred_loaded"]:
+            print(f"  loaded at import time, should be deferred: {', '.join(report['deferred_loaded'])}")
+
+        # Group cost by top-level package
+        packages = {}
+        for name, _, cumulative_us, depth in report["modules"]:
+            if depth == 0:
+                package = name.split(".")[0]
+                packages[package] = packages.get(package, 0) + cumulative_us
+        for package, cumulative_us in sorted(packages.items(), key=lambda item: -item[1])[:args.top]:
+            print(f"  {cumulative_us / 1000:>9.1f} ms  {package}")
+
+    if args.json:
+        for report in reports:
+            report["modules"] = [
+                {"module": name, "self_us": self_us, "cumulative_us": cumulative_us}
+                for name, self_us, cumulative_us, depth in report["modules"] if depth == 0
+            ]
+        print(json.dumps(reports, indent=2))
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
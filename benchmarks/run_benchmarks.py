@@ -0,0 +1,334 @@
+"""Offline benchmark suite for the diagram generation pipeline
+
+Every model call is served by the deterministic fake in
+benchmarks/fake_llm.py, so the suite needs no network or API key. Run from
+the repository root:
+
+    python benchmarks/run_benchmarks.py --output benchmarks/results/latest.json
+    python benchmarks/run_benchmarks.py --compare benchmarks/results/baseline.json
+
+With --compare, the run exits with status 1 when a latency percentile or
+throughput figure regresses by more than --tolerance.
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+import argparse
+import platform
+import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+import yaml
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_llm import install_fake_clients, load_responses  # noqa: E402
+from utils.config_loader import DEFAULT_CONFIG_PATH  # noqa: E402
+from utils.diagram_parser import MermaidStreamParser, DIAGRAM_COMPLETE  # noqa: E402
+from utils.metrics import percentile  # noqa: E402
+
+SUITES = ("parser", "service", "service_async", "cluster")
+
+# Prompts cycled through by the load generators; each matches a fixture
+PROMPTS = (
+    "Design a microservice architecture for an e-commerce platform",
+    "ETL data pipeline with validation stages",
+    "Sequence diagram for an OAuth login",
+    "Highly available web application",
+)
+
+# Recorded web search results, so agents that search never reach the network
+SEARCH_FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "search_results.json")
+
+# Result fields compared against a baseline, and whether higher is better
+COMPARED_FIELDS = {
+    "latency_p50": False,
+    "latency_p95": False,
+    "ttft_p95": False,
+    "throughput_rps": True,
+    "mb_per_second": True,
+}
+
+
+def summarize(samples, prefix):
+    """Percentiles of a list of seconds"""
+    return {
+        f"{prefix}_p50": round(percentile(samples, 0.50) or 0.0, 4),
+        f"{prefix}_p95": round(percentile(samples, 0.95) or 0.0, 4),
+        f"{prefix}_p99": round(percentile(samples, 0.99) or 0.0, 4),
+    }
+
+
+def write_bench_config(directory, pool_size):
+    """Write a settings.yaml for benchmarking
+
+    Caching, coalescing, hedging and the quota scheduler are disabled so every
+    request exercises the full pipeline at the fake model's speed. Web search
+    is answered from fixtures, so no run touches the network.
+    """
+    with open(DEFAULT_CONFIG_PATH, encoding="utf-8") as f:
+        config = yaml.safe_load(f)
+    config.setdefault("cache", {})["enabled"] = False
+    config.setdefault("coalescing", {})["enabled"] = False
+    config.setdefault("hedging", {})["enabled"] = False
+    config.setdefault("scheduler", {})["enabled"] = False
+    config.setdefault("agent_pool", {})["max_size"] = pool_size
+    config.setdefault("tools", {}).setdefault("search", {})["fixtures"] = SEARCH_FIXTURES
+    path = os.path.join(directory, "settings.yaml")
+    with open(path, "w", encoding="utf-8") as f:
+        yaml.safe_dump(config, f)
+    return path
+
+
+def bench_parser(args):
+    """Streaming parser throughput over the recorded responses"""
+    texts = [response for _, response in load_responses()] * 50
+    chunk = args.tokens_per_chunk * 4
+    streams = [[text[i:i + chunk] for i in range(0, len(text), chunk)] for text in texts]
+    total_bytes = sum(len(text) for text in texts)
+
+    best = float("inf")
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        for chunks in streams:
+            parser = MermaidStreamParser()
+            for piece in chunks:
+                parser.push(piece)
+            parser.close()
+        best = min(best, time.perf_counter() - start)
+
+    return {
+        "responses": len(texts),
+        "seconds": round(best, 4),
+        "mb_per_second": round(total_bytes / best / 1e6, 2),
+        "us_per_response": round(best / len(texts) * 1e6, 1),
+    }
+
+
+def _consume(stream, start):
+    """Drain a response stream, returning (ttft, has_diagram)"""
+    ttft = None
+    parser = MermaidStreamParser()
+    has_diagram = False
+    for response in stream:
+        if response.content:
+            if ttft is None:
+                ttft = time.perf_counter() - start
+            has_diagram |= any(e.kind == DIAGRAM_COMPLETE for e in parser.push(response.content))
+    return ttft, has_diagram
+
+
+def bench_service(service, args):
+    """End-to-end latency and throughput through DiagramGenerationService.generate"""
+    results = []
+    for concurrency in args.concurrency:
+        total = concurrency * args.requests_per_worker
+
+        def one(index):
+            prompt = f"{PROMPTS[index % len(PROMPTS)]} (request {index})"
+            start = time.perf_counter()
+            try:
+                ttft, has_diagram = _consume(service.generate(prompt), start)
+            except Exception as e:
+                logging.getLogger(__name__).error(f"Request {index} failed: {str(e)}")
+                return None
+            return ttft, time.perf_counter() - start, has_diagram
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            outcomes = list(executor.map(one, range(total)))
+        results.append(_load_result(concurrency, outcomes, time.perf_counter() - start))
+    return results
+
+
+def bench_service_async(service, args):
+    """End-to-end latency and throughput through DiagramGenerationService.astream"""
+
+    async def run(concurrency):
+        slots = asyncio.Semaphore(concurrency)
+
+        async def one(index):
+            prompt = f"{PROMPTS[index % len(PROMPTS)]} (request {index})"
+            async with slots:
+                start = time.perf_counter()
+                ttft = None
+                parser = MermaidStreamParser()
+                has_diagram = False
+                try:
+                    async for response in service.astream(prompt):
+                        if response.content:
+                            if ttft is None:
+                                ttft = time.perf_counter() - start
+                            has_diagram |= any(
+                                e.kind == DIAGRAM_COMPLETE for e in parser.push(response.content)
+                            )
+                except Exception as e:
+                    logging.getLogger(__name__).error(f"Request {index} failed: {str(e)}")
+                    return None
+                return ttft, time.perf_counter() - start, has_diagram
+
+        start = time.perf_counter()
+        outcomes = await asyncio.gather(*(one(i) for i in range(concurrency * args.requests_per_worker)))
+        return _load_result(concurrency, outcomes, time.perf_counter() - start)
+
+    return [asyncio.run(run(concurrency)) for concurrency in args.concurrency]
+
+
+def _load_result(concurrency, outcomes, elapsed):
+    completed = [outcome for outcome in outcomes if outcome is not None]
+    result = {
+        "concurrency": concurrency,
+        "requests": len(outcomes),
+        "errors": len(outcomes) - len(completed),
+        "missing_diagrams": sum(1 for outcome in completed if not outcome[2]),
+        "elapsed_seconds": round(elapsed, 3),
+        "throughput_rps": round(len(completed) / elapsed, 2) if elapsed else 0.0,
+    }
+    result.update(summarize([outcome[1] for outcome in completed], "latency"))
+    result.update(summarize([outcome[0] for outcome in completed if outcome[0] is not None], "ttft"))
+    return result
+
+
+def bench_cluster(config_path, args, fake_options):
+    """Fan-out latency of ArchitectEngineCluster at different specialist counts"""
+    from core.engine import ArchitectEngineCluster
+    from services.model_service import EnterpriseModelService
+
+    provider = EnterpriseModelService(config_path)
+    provider.cache = None
+    install_fake_clients(provider.provider_service.providers["groq"].values(), **fake_options)
+
+    results = []
+    for specialists in args.specialists:
+        latencies = []
+        serial = []
+        errors = 0
+        with ArchitectEngineCluster(provider, specialist_count=specialists,
+                                    config_path=config_path) as cluster:
+            for round_index in range(args.requests_per_worker):
+                outcome = cluster.process_request(f"{PROMPTS[0]} (round {round_index})")
+                latencies.append(outcome.elapsed_seconds)
+                serial.append(sum(r.elapsed_seconds for r in outcome.results))
+                errors += len(outcome.failed)
+        result = {
+            "specialists": specialists,
+            "rounds": args.requests_per_worker,
+            "errors": errors,
+            "parallel_speedup": round(sum(serial) / sum(latencies), 2) if sum(latencies) else 0.0,
+        }
+        result.update(summarize(latencies, "latency"))
+        results.append(result)
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"],
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, tolerance):
+    """List metrics that regressed by more than tolerance against a baseline"""
+    regressions = []
+    for suite, current in results.items():
+        if suite == "meta" or suite not in baseline:
+            continue
+        current_rows = current if isinstance(current, list) else [current]
+        baseline_rows = baseline[suite] if isinstance(baseline[suite], list) else [baseline[suite]]
+        for row, base in zip(current_rows, baseline_rows):
+            label = row.get("concurrency", row.get("specialists", ""))
+            for field, higher_is_better in COMPARED_FIELDS.items():
+                if field not in row or not base.get(field):
+                    continue
+                change = (row[field] - base[field]) / base[field]
+                if (change < -tolerance) if higher_is_better else (change > tolerance):
+                    regressions.append(f"{suite}[{label}].{field}: {base[field]} -> {row[field]} "
+                                       f"({change:+.0%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--suites", nargs="+", choices=SUITES, default=list(SUITES))
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--specialists", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--requests-per-worker", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=5, help="Parser benchmark repetitions")
+    parser.add_argument("--ttft", type=float, default=0.3, help="Fake time to first token, seconds")
+    parser.add_argument("--tokens-per-second", type=float, default=250.0)
+    parser.add_argument("--tokens-per-chunk", type=int, default=4)
+    parser.add_argument("--jitter", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    parser.add_argument("--compare", help="Baseline results JSON to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Allowed relative regression before failing, e.g. 0.2 for 20%%")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    os.environ.setdefault("GROQ_API_KEY", "offline-benchmark")
+    fake_options = {
+        "ttft": args.ttft,
+        "tokens_per_second": args.tokens_per_second,
+        "tokens_per_chunk": args.tokens_per_chunk,
+        "jitter": args.jitter,
+        "seed": args.seed,
+    }
+
+    results = {"meta": {
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "fake_model": fake_options,
+    }}
+
+    with tempfile.TemporaryDirectory() as directory:
+        config_path = write_bench_config(directory, pool_size=max(args.concurrency))
+
+        if "parser" in args.suites:
+            results["parser"] = bench_parser(args)
+            print(f"parser: {results['parser']}")
+
+        if "service" in args.suites or "service_async" in args.suites:
+            from services.diagram_service import DiagramGenerationService
+
+            service = DiagramGenerationService(config_path)
+            install_fake_clients(service.provider_service.providers["groq"].values(), **fake_options)
+            for suite, bench in (("service", bench_service), ("service_async", bench_service_async)):
+                if suite in args.suites:
+                    results[suite] = bench(service, args)
+                    for row in results[suite]:
+                        print(f"{suite}: {row}")
+
+        if "cluster" in args.suites:
+            results["cluster"] = bench_cluster(config_path, args, fake_options)
+            for row in results["cluster"]:
+                print(f"cluster: {row}")
+
+    if args.output:
+        directory = os.path.dirname(args.output)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Wrote {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions beyond {args.tolerance:.0%} against {args.compare}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Threshold tuning for the semantic prompt cache
+
+Scores labelled requirement pairs from benchmarks/fixtures/semantic_pairs.jsonl
+(paraphrases and different requests) with the cache's embedder and
+namespace rules. Prints precision and recall of a hit at each similarity
+threshold and the lowest threshold that serves no wrong diagram. Run from
+the repository root:
+
+    python benchmarks/tune_semantic_cache.py
+    python benchmarks/tune_semantic_cache.py --pairs my_pairs.jsonl --verbose
+
+Add pairs from real traffic to the fixture, then set
+cache.semantic.threshold in config/settings.yaml.
+"""
+import os
+import sys
+import json
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.semantic_cache import HashingEmbedder, SemanticCache  # noqa: E402
+
+PAIRS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "semantic_pairs.jsonl")
+
+
+def score_pairs(pairs, embedder):
+    """Similarity of each pair as the cache sees it; pairs in different namespaces score 0"""
+    scored = []
+    for pair in pairs:
+        same_namespace = SemanticCache.make_namespace(pair["a"], "model") == SemanticCache.make_namespace(pair["b"], "model")
+        similarity = float(embedder.embed(pair["a"]) @ embedder.embed(pair["b"])) if same_namespace else 0.0
+        scored.append((similarity, pair))
+    return scored
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pairs", default=PAIRS_PATH)
+    parser.add_argument("--dimensions", type=int, default=1024)
+    parser.add_argument("--verbose", action="store_true", help="Print the similarity of every pair")
+    args = parser.parse_args()
+
+    with open(args.pairs, encoding="utf-8") as f:
+        pairs = [json.loads(line) for line in f if line.strip()]
+    scored = score_pairs(pairs, HashingEmbedder(dimensions=args.dimensions))
+
+    if args.verbose:
+        for similarity, pair in sorted(scored, key=lambda item: -item[0]):
+            print(f"{similarity:6.3f} {'same' if pair['same'] else 'diff':>4}  {pair['a']!r} / {pair['b']!r}")
+        print()
+
+    positives = sum(1 for _, pair in scored if pair["same"])
+    print(f"{'threshold':>9} {'hits':>5} {'wrong':>6} {'precision':>10} {'recall':>7}")
+    safe = None
+    for step in range(20, 0, -1):
+        threshold = step / 20
+        hits = [pair for similarity, pair in scored if similarity >= threshold]
+        wrong = sum(1 for pair in hits if not pair["same"])
+        precision = (len(hits) - wrong) / len(hits) if hits else 1.0
+        recall = (len(hits) - wrong) / positives if positives else 0.0
+        if wrong == 0:
+            safe = threshold
+        print(f"{threshold:>9.2f} {len(hits):>5} {wrong:>6} {precision:>10.0%} {recall:>7.0%}")
+
+    if safe is None:
+        print("\nEvery threshold serves a wrong diagram; review the pairs")
+    else:
+        print(f"\nLowest threshold without wrong hits: {safe:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,39 +1,82 @@
 from agno.agent import Agent
 from agno.models.groq import Groq
-from agno.tools.duckduckgo import DuckDuckGoTools
-import yaml
+from core.tools import build_tools
+from services.agent_pool import AgentPool
+from utils.async_stream import astream_agent_run
+from utils.config_loader import load_config
 import os
 
 
 class DiagramSpecialist:
     """Specialist agent for diagram generation"""
 
-    def __init__(self, config_path="config/settings.yaml"):
-        """Initialize with configuration"""
+    def __init__(self, config_path="config/settings.yaml", models=None):
+        """Initialize with configuration
+
+        Args:
+            config_path: Path to configuration file
+            models: Optional mapping of model ID to pre-built model clients,
+                e.g. ModelProviderService.providers["groq"]
+        """
         # Load configuration
-        with open(config_path, 'r') as file:
-            self.config = yaml.safe_load(file)
+        self.config = load_config(config_path)
+        self.model_id = self.config["models"]["primary"]
 
         # Get API keys from environment
         self.groq_api_key = os.getenv("GROQ_API_KEY")
 
-        # Initialize agent
-        self.agent = self._create_agent()
+        # Shared model clients; agents are cheap wrappers around them
+        self.models = dict(models or {})
+        if self.model_id not in self.models:
+            self.models[self.model_id] = Groq(id=self.model_id, api_key=self.groq_api_key)
+
+        # Built on first use; generation runs check agents out of the pool
+        self._agent = None
+
+        # Per-request agents, so concurrent runs never share run state
+        pool_config = self.config.get("agent_pool", {})
+        self.agent_pool = AgentPool(
+            self._create_agent,
+            max_size=pool_config.get("max_size", 4),
+            idle_timeout=pool_config.get("idle_timeout_seconds", 600)
+        )
+
+    @property
+    def agent(self):
+        """Standalone agent for the playground, created on first access"""
+        if self._agent is None:
+            self._agent = self._create_agent()
+        return self._agent
 
-    def _create_agent(self):
-        """Create the specialized agent"""
+    def _create_agent(self, model_id=None):
+        """Create the specialized agent
+
+        Args:
+            model_id: Model to use, defaults to the primary model
+        """
         return Agent(
             name="Diagram Specialist",
             role="enterprise_diagram_generation",
-            model=Groq(
-                id=self.config["models"]["primary"],
-                api_key=self.groq_api_key
-            ),
-            tools=[DuckDuckGoTools()],
+            model=self.get_model(model_id or self.model_id),
+            tools=build_tools(self.config),
             instructions=self._get_instructions(),
             markdown=True,
         )
 
+    def get_model(self, model_id):
+        """Get the shared model client for a model ID
+
+        Args:
+            model_id: Model ID
+
+        Returns:
+            Model client
+        """
+        model = self.models.get(model_id)
+        if model is None:
+            raise ValueError(f"Model {model_id} not available")
+        return model
+
     def _get_instructions(self):
         """Get agent instructions"""
         return """
@@ -50,6 +93,41 @@ class DiagramSpecialist:
         After the diagram, provide a brief explanation of the architecture.
         """
 
-    def generate_diagram(self, requirements):
-        """Generate a diagram based on requirements"""
-        return self.agent.run(requirements, stream=True)
\ No newline at end of file
+    def generate_diagram(self, requirements, model=None):
+        """Generate a diagram based on requirements
+
+        Args:
+            requirements: The requirements text
+            model: Optional model ID for this request only
+
+        Returns:
+            Iterator: Stream of diagram generation responses
+        """
+        model_id = model or self.model_id
+        self.get_model(model_id)
+        return self._run_pooled(requirements, model_id)
+
+    def _run_pooled(self, requirements, model_id):
+        """Stream a run on a pooled agent, holding it until the stream ends"""
+        with self.agent_pool.lease(model_id) as agent:
+            yield from agent.run(requirements, stream=True)
+
+    def agenerate_diagram(self, requirements, model=None):
+        """Generate a diagram on the event loop
+
+        Args:
+            requirements: The requirements text
+            model: Optional model ID for this request only
+
+        Returns:
+            AsyncIterator: Stream of diagram generation responses
+        """
+        model_id = model or self.model_id
+        self.get_model(model_id)
+        return self._arun_pooled(requirements, model_id)
+
+    async def _arun_pooled(self, requirements, model_id):
+        """Async counterpart of _run_pooled"""
+        async with self.agent_pool.alease(model_id) as agent:
+            async for chunk in astream_agent_run(agent, requirements):
+                yield chunk
@@ -1,32 +1,222 @@
+from typing import Dict, List, Optional
+from concurrent.futures import ThreadPoolExecutor, wait
+import threading
+import time
+import logging
+from utils.config_loader import DEFAULT_CONFIG_PATH, load_config
+from utils.diagram_parser import parse_mermaid_response
+from utils.stream_buffer import ResponseBuffer
+
+logger = logging.getLogger(__name__)
+
+
+class SpecialistTimeout(Exception):
+    """Raised when a specialist exceeds its deadline"""
+
+
+class SpecialistResult:
+    """Outcome of a single specialist run"""
+
+    def __init__(self, name: str, specialist_type: str, content: str = "",
+                 error: Optional[str] = None, elapsed_seconds: float = 0.0,
+                 timed_out: bool = False):
+        self.name = name
+        self.specialist_type = specialist_type
+        self.content = content
+        self.error = error
+        self.elapsed_seconds = elapsed_seconds
+        self.timed_out = timed_out
+
+        diagrams, explanation = parse_mermaid_response(content) if content else ([], "")
+        self.diagram = diagrams[0] if diagrams else None
+        self.explanation = explanation
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and not self.timed_out
+
+    def __repr__(self):
+        status = "ok" if self.ok else ("timeout" if self.timed_out else "error")
+        return f"SpecialistResult({self.name!r}, {status}, {self.elapsed_seconds:.2f}s)"
+
+
+class ClusterResult:
+    """Aggregated results of one request fanned out across specialists"""
+
+    def __init__(self, results: List[SpecialistResult], elapsed_seconds: float):
+        self.results = results
+        self.elapsed_seconds = elapsed_seconds
+
+    @property
+    def by_name(self) -> Dict[str, SpecialistResult]:
+        return {result.name: result for result in self.results}
+
+    @property
+    def succeeded(self) -> List[SpecialistResult]:
+        return [result for result in self.results if result.ok]
+
+    @property
+    def failed(self) -> List[SpecialistResult]:
+        return [result for result in self.results if not result.ok]
+
+
 class ArchitectEngineCluster:
-    """Enterprise architecture engine for managing multiple specialized agents"""
+    """Enterprise architecture engine for managing multiple specialized agents
 
-    llm_provider = None
-    specialists = []
+    A request is fanned out to every specialist concurrently on a bounded
+    thread pool, so wall-clock time tracks the slowest specialist rather than
+    the sum of all of them. Each specialist is bounded by ``api.timeout``.
+    """
 
-    def __init__(self, llm_provider, specialist_count=1):
-        """Initialize the engine with a specified number of specialist agents
+    def __init__(self, llm_provider, specialist_count=1, specialist_types=None,
+                 max_concurrency=None, timeout=None, config_path=DEFAULT_CONFIG_PATH):
+        """Initialize the engine with a set of specialist agents
 
         Args:
-            llm_provider: The language model provider
-            specialist_count: Number of specialist agents to create
+            llm_provider: The language model provider, e.g. EnterpriseModelService
+            specialist_count: Number of diagram specialists to create when
+                specialist_types is not given
+            specialist_types: Specialist template names to run per request
+            max_concurrency: Maximum specialists running at once
+            timeout: Per-specialist timeout in seconds, defaults to api.timeout
+            config_path: Path to configuration file
         """
+        config = load_config(config_path)
+
         self.llm_provider = llm_provider
-        self.specialists = [ArchitectSpecialist(self.llm_provider)
-                            for _ in range(specialist_count)]
+        specialist_types = specialist_types or ["diagram_specialist"] * specialist_count
+        self.specialists = [
+            ArchitectSpecialist(self.llm_provider, specialist_type, name=self._unique_name(
+                specialist_type, specialist_types[:index]))
+            for index, specialist_type in enumerate(specialist_types)
+        ]
+        self.timeout = timeout if timeout is not None else config.get("api", {}).get("timeout", 30)
+        self.max_concurrency = max_concurrency or len(self.specialists)
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_concurrency,
+            thread_name_prefix="architect-specialist"
+        )
+
+    @staticmethod
+    def _unique_name(specialist_type, previous_types):
+        """Name duplicate specialist types diagram_specialist, diagram_specialist_2, ..."""
+        count = previous_types.count(specialist_type)
+        return specialist_type if count == 0 else f"{specialist_type}_{count + 1}"
 
-    def process_request(self):
-        """Process requests through all specialist agents"""
-        for specialist in self.specialists:
-            specialist.process()
+    def process_request(self, requirements, model_id=None) -> ClusterResult:
+        """Process a request through all specialist agents concurrently
+
+        Args:
+            requirements: The requirements text
+            model_id: Optional model ID override
+
+        Returns:
+            ClusterResult: Per-specialist results in specialist order
+        """
+        start = time.perf_counter()
+        cancel = threading.Event()
+
+        futures = [
+            self._executor.submit(specialist.process, requirements, model_id, self.timeout, cancel)
+            for specialist in self.specialists
+        ]
+
+        # Specialists queued behind the concurrency bound get their own full timeout
+        waves = -(-len(self.specialists) // self.max_concurrency)
+        done, _ = wait(futures, timeout=self.timeout * waves)
+
+        # Ask stragglers to stop at their next chunk
+        cancel.set()
+        waited = time.perf_counter() - start
+
+        results = []
+        for specialist, future in zip(self.specialists, futures):
+            if future in done:
+                results.append(future.result())
+            else:
+                logger.warning(f"Specialist {specialist.name} timed out after {waited:.2f}s")
+                results.append(SpecialistResult(
+                    specialist.name,
+                    specialist.specialist_type,
+                    error=f"Timed out after {waited:.2f}s",
+                    elapsed_seconds=waited,
+                    timed_out=True
+                ))
+
+        elapsed = time.perf_counter() - start
+        logger.info(f"Processed request through {len(results)} specialists in {elapsed:.2f}s")
+        return ClusterResult(results, elapsed)
+
+    def shutdown(self, wait_for_running=False):
+        """Release the worker threads
+
+        Args:
+            wait_for_running: Whether to block until running specialists finish
+        """
+        self._executor.shutdown(wait=wait_for_running)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.shutdown()
 
 
 class ArchitectSpecialist:
     """Individual specialist agent with domain expertise"""
 
-    def __init__(self, llm_provider):
+    def __init__(self, llm_provider, specialist_type="diagram_specialist", name=None):
+        """Initialize the specialist
+
+        Args:
+            llm_provider: Provider exposing generate_diagram(requirements,
+                specialist_type, model_id)
+            specialist_type: Specialist template name
+            name: Display name, defaults to the specialist type
+        """
         self.llm_provider = llm_provider
+        self.specialist_type = specialist_type
+        self.name = name or specialist_type
+
+    def process(self, requirements, model_id=None, timeout=None, cancel=None) -> SpecialistResult:
+        """Process a single request through this specialist
+
+        Args:
+            requirements: The requirements text
+            model_id: Optional model ID override
+            timeout: Optional timeout in seconds, measured from the start of this run
+            cancel: Optional threading.Event that aborts the stream when set
+
+        Returns:
+            SpecialistResult: Collected response or error
+        """
+        start = time.perf_counter()
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        buffer = ResponseBuffer()
+        stream = None
+
+        try:
+            stream = self.llm_provider.generate_diagram(
+                requirements,
+                specialist_type=self.specialist_type,
+                model_id=model_id
+            )
+            for response in stream:
+                if (cancel and cancel.is_set()) or (deadline and time.monotonic() > deadline):
+                    raise SpecialistTimeout(f"{self.name} exceeded its deadline")
+                if response.content:
+                    buffer.append(response.content)
+        except SpecialistTimeout as e:
+            return SpecialistResult(self.name, self.specialist_type, buffer.getvalue(),
+                                    error=str(e), elapsed_seconds=time.perf_counter() - start,
+                                    timed_out=True)
+        except Exception as e:
+            logger.error(f"Specialist {self.name} failed: {str(e)}")
+            return SpecialistResult(self.name, self.specialist_type, buffer.getvalue(),
+                                    error=str(e), elapsed_seconds=time.perf_counter() - start)
+        finally:
+            if stream is not None and hasattr(stream, "close"):
+                stream.close()
 
-    def process(self):
-        """Process a single request through this specialist"""
-        pass
\ No newline at end of file
+        return SpecialistResult(self.name, self.specialist_type, buffer.getvalue(),
+                                elapsed_seconds=time.perf_counter() - start)
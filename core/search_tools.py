@@ -0,0 +1,238 @@
+from typing import Dict, List, Optional
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
+import json
+import threading
+import time
+import logging
+from agno.tools import Toolkit
+from utils.metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+
+WEB = "web"
+NEWS = "news"
+
+
+def normalize_query(query: str) -> str:
+    """Normalize a search query so trivially different spellings share a cache entry"""
+    return " ".join(query.lower().split())
+
+
+class SearchResultCache:
+    """In-memory TTL cache of search results, shared by all agents of the process"""
+
+    def __init__(self, max_entries: int = 512, ttl_seconds: float = 86400):
+        """Initialize the cache
+
+        Args:
+            max_entries: Results kept; least recently used are evicted first
+            ttl_seconds: Time to live for a result
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._stats = {"hits": 0, "misses": 0}
+
+    def get(self, key: tuple) -> Optional[List[Dict]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.time() - entry[0] > self.ttl_seconds:
+                # Expired entries would otherwise hold their slot until LRU eviction
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return entry[1]
+
+    def put(self, key: tuple, results: List[Dict]):
+        with self._lock:
+            self._entries[key] = (time.time(), results)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_stats(self) -> Dict[str, float]:
+        """Get hit and miss statistics
+
+        Returns:
+            Dict: Hits, misses, hit rate and cached results
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+
+class CachedSearchTools(Toolkit):
+    """DuckDuckGo search for agents, cached, concurrent and time-bounded
+
+    Results are cached by normalized query, so repeated lookups such as
+    "API gateway patterns" cost no round trip. Every search runs on a shared
+    worker pool and is abandoned after the per-call timeout, returning an
+    error the model can work around instead of stalling generation.
+    multi_search runs several queries from one model turn concurrently, so
+    a turn costs one timeout at most. With a fixtures file, results come
+    from that file and nothing is sent over the network.
+    """
+
+    def __init__(self, cache: SearchResultCache, executor: ThreadPoolExecutor,
+                 timeout_seconds: float = 5.0, max_results: int = 5,
+                 fixtures: Optional[Dict[str, List[Dict]]] = None):
+        """Initialize the toolkit
+
+        Args:
+            cache: Shared result cache
+            executor: Shared worker pool for searches
+            timeout_seconds: Seconds to wait for one search
+            max_results: Upper bound on results per query
+            fixtures: Optional normalized query to results; disables network access
+        """
+        super().__init__(name="web_search")
+        self.cache = cache
+        self.executor = executor
+        self.timeout_seconds = timeout_seconds
+        self.max_results = max_results
+        self.fixtures = fixtures
+        self.register(self.web_search)
+        self.register(self.news_search)
+        self.register(self.multi_search)
+
+    def web_search(self, query: str, max_results: int = 5) -> str:
+        """Search the web with DuckDuckGo.
+
+        Args:
+            query: The query to search for.
+            max_results: The maximum number of results to return.
+
+        Returns:
+            str: JSON list of results with title, href and body.
+        """
+        return json.dumps(self._search_all(WEB, [query], max_results)[query], indent=2)
+
+    def news_search(self, query: str, max_results: int = 5) -> str:
+        """Search recent news with DuckDuckGo.
+
+        Args:
+            query: The query to search for.
+            max_results: The maximum number of results to return.
+
+        Returns:
+            str: JSON list of news results.
+        """
+        return json.dumps(self._search_all(NEWS, [query], max_results)[query], indent=2)
+
+    def multi_search(self, queries: List[str], max_results: int = 5) -> str:
+        """Search the web for several queries at once. Prefer this over calling
+        web_search repeatedly when you need more than one lookup.
+
+        Args:
+            queries: The queries to search for.
+            max_results: The maximum number of results per query.
+
+        Returns:
+            str: JSON object mapping each query to its list of results.
+        """
+        return json.dumps(self._search_all(WEB, list(dict.fromkeys(queries)), max_results), indent=2)
+
+    def _search_all(self, kind: str, queries: List[str], max_results: int) -> Dict[str, object]:
+        """Answer queries from the cache, and search the rest concurrently"""
+        max_results = max(1, min(max_results, self.max_results))
+        results: Dict[str, object] = {}
+        pending = {}
+        for query in queries:
+            key = (kind, normalize_query(query), max_results)
+            cached = self.cache.get(key)
+            if cached is not None:
+                results[query] = cached
+                get_metrics().increment("tool_cache_hits", labels={"tool": kind})
+            else:
+                pending[self.executor.submit(self._search, kind, query, max_results)] = (query, key)
+
+        # One deadline for the whole turn, however many queries it searches
+        done, not_done = wait(pending, timeout=self.timeout_seconds)
+        for future in not_done:
+            future.cancel()
+            query, _ = pending[future]
+            logger.warning(f"Search for '{query[:60]}' timed out after {self.timeout_seconds}s")
+            get_metrics().increment("tool_timeouts", labels={"tool": kind})
+            results[query] = {"error": f"Search timed out after {self.timeout_seconds:g} seconds"}
+        for future in done:
+            query, key = pending[future]
+            try:
+                results[query] = future.result()
+                self.cache.put(key, results[query])
+            except Exception as e:
+                logger.warning(f"Search for '{query[:60]}' failed: {str(e)}")
+                get_metrics().increment("tool_errors", labels={"tool": kind})
+                results[query] = {"error": f"Search failed: {str(e)}"}
+        return {query: results[query] for query in queries}
+
+    def _search(self, kind: str, query: str, max_results: int) -> List[Dict]:
+        """Run one search on a worker thread"""
+        start = time.perf_counter()
+        if self.fixtures is not None:
+            found = self.fixtures.get(normalize_query(query), [])[:max_results]
+        else:
+            # Imported on first use, like the other toolkits
+            from duckduckgo_search import DDGS
+
+            with DDGS(timeout=self.timeout_seconds) as ddgs:
+                search = ddgs.news if kind == NEWS else ddgs.text
+                found = list(search(query, max_results=max_results))
+        get_metrics().observe("tool_call_seconds", time.perf_counter() - start, labels={"tool": kind})
+        return found
+
+
+_cache: Optional[SearchResultCache] = None
+_executor: Optional[ThreadPoolExecutor] = None
+_fixtures: Dict[str, Dict[str, List[Dict]]] = {}
+_shared_lock = threading.Lock()
+
+
+def load_fixtures(path: str) -> Dict[str, List[Dict]]:
+    """Load a JSON file of query to results, keyed by normalized query"""
+    with _shared_lock:
+        if path not in _fixtures:
+            with open(path, encoding="utf-8") as f:
+                _fixtures[path] = {normalize_query(query): results for query, results in json.load(f).items()}
+        return _fixtures[path]
+
+
+def create_search_tools(config: Dict) -> CachedSearchTools:
+    """Create a search toolkit sharing the process-wide cache and worker pool
+
+    Args:
+        config: Parsed settings.yaml
+
+    Returns:
+        CachedSearchTools: Toolkit for one agent
+    """
+    global _cache, _executor
+    search_config = config.get("tools", {}).get("search", {})
+    if _cache is None:
+        with _shared_lock:
+            if _cache is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=search_config.get("workers", 8), thread_name_prefix="search"
+                )
+                _cache = SearchResultCache(
+                    max_entries=search_config.get("cache_entries", 512),
+                    ttl_seconds=search_config.get("cache_ttl_seconds", 86400)
+                )
+                logger.info("Initialized search result cache")
+
+    fixtures_path = search_config.get("fixtures")
+    return CachedSearchTools(
+        _cache,
+        _executor,
+        timeout_seconds=search_config.get("timeout_seconds", 5.0),
+        max_results=search_config.get("max_results", 5),
+        fixtures=load_fixtures(fixtures_path) if fixtures_path else None
+    )
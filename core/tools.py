@@ -0,0 +1,38 @@
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def _duckduckgo(config):
+    # Cached, concurrent and time-bounded; see core.search_tools
+    from core.search_tools import create_search_tools
+
+    return create_search_tools(config)
+
+
+# Tool name to factory taking the parsed config; each factory imports its toolkit only when called
+TOOL_FACTORIES = {
+    "duckduckgo": _duckduckgo,
+}
+
+
+def build_tools(config):
+    """Build the toolkits enabled in configuration
+
+    Toolkit modules (and their HTTP stacks) are imported here rather than at
+    module import time, so nothing is loaded for tools no agent enables.
+
+    Args:
+        config: Parsed settings.yaml
+
+    Returns:
+        List: Toolkit instances for the agent
+    """
+    tools = []
+    for name in config.get("tools", {}).get("enabled", ["duckduckgo"]):
+        factory = TOOL_FACTORIES.get(name)
+        if factory is None:
+            logger.warning(f"Unknown tool {name}, skipping")
+            continue
+        tools.append(factory(config))
+    return tools
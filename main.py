@@ -1,4 +1,3 @@
-from ui.dashboard import EnterpriseArchitectDashboard
 import os
 from dotenv import load_dotenv
 
@@ -18,6 +17,8 @@ def main():
         exit(1)
 
     # Initialize and render dashboard
+    from ui.dashboard import EnterpriseArchitectDashboard
+
     dashboard = EnterpriseArchitectDashboard()
     dashboard.render()
 
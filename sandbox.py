@@ -1,4 +1,5 @@
 from core.architect_agent import DiagramSpecialist
+from services.model_service import ModelProviderService
 from agno.playground import Playground, serve_playground_app
 from dotenv import load_dotenv
 import os
@@ -23,7 +24,8 @@ def initialize_sandbox():
         exit(1)
 
     # Create diagram specialist
-    diagram_specialist = DiagramSpecialist()
+    # Share the provider's scheduled clients so sandbox calls count against the same quota
+    diagram_specialist = DiagramSpecialist(models=ModelProviderService().providers.get("groq"))
 
     # Create and serve playground
     playground = Playground(agents=[diagram_specialist.agent])
@@ -0,0 +1,276 @@
+import asyncio
+import json
+import time
+from contextlib import asynccontextmanager
+from typing import Optional
+from dotenv import load_dotenv
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel
+from services.service_registry import get_service_registry
+from services.model_router import FirstTokenTimeout, is_rate_limit_error
+from services.request_scheduler import get_request_scheduler
+from services.response_cache import get_response_cache
+from utils.config_loader import load_config
+from utils.diagram_parser import (
+    MermaidStreamParser, DIAGRAM_STARTED, DIAGRAM_COMPLETE, EXPLANATION_TEXT, parse_mermaid_response
+)
+from utils.logger_config import setup_logging
+from utils.mermaid_ast import validate_and_repair
+from utils.metrics import get_metrics
+
+logger = setup_logging()
+
+_DONE = None
+
+
+class DiagramRequest(BaseModel):
+    """Request body for diagram generation"""
+
+    requirements: str
+    model: Optional[str] = None
+
+
+def format_sse(event, data):
+    """Format a Server-Sent Event
+
+    Args:
+        event: Event name
+        data: JSON-serializable payload
+
+    Returns:
+        str: Encoded event
+    """
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def produce_events(stream, events, start):
+    """Read a model stream and queue token and parsed diagram events
+
+    The queue is bounded, so a slow client pauses reading from the model
+    rather than buffering the whole response in memory.
+
+    Args:
+        stream: Async response stream from DiagramGenerationService.astream
+        events: Bounded asyncio.Queue of (event, data) tuples
+        start: perf_counter() timestamp of the request
+    """
+    parser = MermaidStreamParser()
+    try:
+        async for response in stream:
+            if not response.content:
+                continue
+            await events.put(("token", {"text": response.content}))
+            for event in parser.push(response.content):
+                await events.put(_parser_event(event))
+        for event in parser.close():
+            await events.put(_parser_event(event))
+        await events.put(("done", {
+            "model": getattr(stream, "served_model", None),
+            "elapsed_seconds": round(time.perf_counter() - start, 3)
+        }))
+    except Exception as e:
+        logger.error(f"Error streaming diagram: {str(e)}")
+        await events.put(("error", {"message": str(e)}))
+    finally:
+        aclose = getattr(stream, "aclose", None)
+        if aclose:
+            await aclose()
+    await events.put(_DONE)
+
+
+def http_error(error: Exception) -> Optional[HTTPException]:
+    """Map a generation error to the HTTP error a client can act on
+
+    Args:
+        error: Exception raised while generating
+
+    Returns:
+        HTTPException: 503 with Retry-After when the model is slow or rate
+        limited, or None for other errors
+    """
+    if isinstance(error, FirstTokenTimeout) or is_rate_limit_error(error):
+        # RateLimitQueueTimeout counts as a rate-limit error
+        return HTTPException(
+            status_code=503,
+            detail=f"Model unavailable, retry later: {str(error)}",
+            headers={"Retry-After": "10"}
+        )
+    return None
+
+
+def _parser_event(event):
+    """Map a MermaidStreamParser event to an SSE event"""
+    if event.kind == DIAGRAM_STARTED:
+        return "diagram_started", {}
+    if event.kind == DIAGRAM_COMPLETE:
+        # Auto-repair only; clients decide whether an invalid diagram is worth a re-prompt
+        code, diagram = validate_and_repair(event.text)
+        return "diagram", {"code": code, "valid": diagram.is_valid, "errors": diagram.errors}
+    if event.kind == EXPLANATION_TEXT:
+        return "explanation", {"text": event.text}
+    return event.kind, {"text": event.text}
+
+
+def create_app(config_path="config/settings.yaml"):
+    """Create the headless generation API
+
+    Args:
+        config_path: Path to configuration file
+
+    Returns:
+        FastAPI: Configured application
+    """
+    load_dotenv()
+    server_config = load_config(config_path).get("server", {})
+    max_concurrent = server_config.get("max_concurrent_requests", 16)
+    queue_timeout = server_config.get("queue_timeout_seconds", 5)
+    buffer_events = server_config.get("stream_buffer_events", 64)
+
+    registry = get_service_registry()
+
+    @asynccontextmanager
+    async def lifespan(app):
+        # Accept connections immediately; the service builds in the background
+        if server_config.get("prewarm", True):
+            registry.prewarm_diagram_service(config_path)
+        yield
+
+    app = FastAPI(title="Enterprise Architect AI API", lifespan=lifespan)
+    slots = asyncio.Semaphore(max_concurrent)
+    in_flight = {"requests": 0}
+
+    async def acquire_slot():
+        """Admit a request or reject it once the wait exceeds the queue timeout"""
+        try:
+            await asyncio.wait_for(slots.acquire(), timeout=queue_timeout)
+        except asyncio.TimeoutError:
+            raise HTTPException(
+                status_code=503,
+                detail="Server is at capacity, retry later",
+                headers={"Retry-After": str(max(1, int(queue_timeout)))}
+            )
+        in_flight["requests"] += 1
+
+    async def get_service():
+        """Get the shared service without blocking the loop while it is being built"""
+        return await asyncio.to_thread(registry.get_diagram_service, config_path)
+
+    def release_slot():
+        in_flight["requests"] -= 1
+        slots.release()
+
+    def check_model(service, model):
+        """Reject unknown models before any work is queued"""
+        if model:
+            try:
+                service.specialist.get_model(model)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+
+    @app.get("/healthz")
+    async def healthz():
+        return {"status": "ok"}
+
+    @app.get("/v1/stats")
+    async def stats():
+        service = await get_service()
+        response_cache = get_response_cache(config_path)
+        scheduler = get_request_scheduler(config_path)
+        return {
+            "in_flight": in_flight["requests"],
+            "max_concurrent_requests": max_concurrent,
+            "registry": registry.get_stats(),
+            "response_cache": response_cache.get_stats() if response_cache else None,
+            "semantic_cache": service.semantic_cache.get_stats() if service.semantic_cache else None,
+            "router": service.router.get_stats(),
+            "hedging": service.hedger.get_stats() if service.hedger else None,
+            "coalescing": service.coalescer.get_stats() if service.coalescer else None,
+            "scheduler": scheduler.get_stats() if scheduler else None,
+        }
+
+    @app.get("/metrics")
+    async def metrics():
+        """Prometheus scrape endpoint for the in-process histograms"""
+        backend = get_metrics()
+        text = backend.to_prometheus() if hasattr(backend, "to_prometheus") else ""
+        return PlainTextResponse(text, media_type="text/plain; version=0.0.4")
+
+    @app.post("/v1/diagrams")
+    async def generate_diagram(request: DiagramRequest):
+        await acquire_slot()
+        try:
+            service = await get_service()
+            check_model(service, request.model)
+            start = time.perf_counter()
+            response = await service.agenerate(request.requirements, request.model)
+            diagrams, explanation = parse_mermaid_response(response)
+            code, diagram = None, None
+            if diagrams:
+                code, diagram = await service.avalidate_diagram(diagrams[0], request.model)
+        except HTTPException:
+            raise
+        except Exception as e:
+            error = http_error(e)
+            if error is None:
+                raise
+            logger.warning(f"Diagram request failed with {error.status_code}: {str(e)}")
+            raise error
+        finally:
+            release_slot()
+
+        return {
+            "diagram": code,
+            "valid": diagram.is_valid if diagram else False,
+            "errors": diagram.errors if diagram else [],
+            "explanation": explanation,
+            "elapsed_seconds": round(time.perf_counter() - start, 3),
+        }
+
+    @app.post("/v1/diagrams/stream")
+    async def stream_diagram(request: DiagramRequest):
+        await acquire_slot()
+        try:
+            service = await get_service()
+            check_model(service, request.model)
+            start = time.perf_counter()
+            events = asyncio.Queue(maxsize=buffer_events)
+            producer = asyncio.create_task(
+                produce_events(service.astream(request.requirements, request.model), events, start)
+            )
+        except BaseException:
+            release_slot()
+            raise
+
+        async def event_stream():
+            try:
+                while True:
+                    item = await events.get()
+                    if item is _DONE:
+                        break
+                    yield format_sse(*item)
+            finally:
+                # Client disconnected or stream finished: stop the upstream request
+                producer.cancel()
+                release_slot()
+
+        return StreamingResponse(
+            event_stream(),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
+
+    return app
+
+
+app = create_app()
+
+if __name__ == "__main__":
+    import uvicorn
+
+    server_config = load_config().get("server", {})
+    uvicorn.run(
+        "server:app",
+        host=server_config.get("host", "0.0.0.0"),
+        port=server_config.get("port", 8000)
+    )
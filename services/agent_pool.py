@@ -0,0 +1,292 @@
+from typing import Callable, Dict, Hashable, Iterable, Optional
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+import asyncio
+import threading
+import time
+import logging
+from services.model_router import current_call
+from utils.metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+
+# Seconds between checks whether the router abandoned a waiting checkout
+ABANDON_POLL_SECONDS = 0.25
+
+
+class AgentPoolExhausted(Exception):
+    """Raised when no agent could be checked out before the timeout"""
+
+
+class AgentPool:
+    """Keyed pool of reusable agents with checkout/checkin semantics
+
+    Each checked-out agent is used by exactly one request at a time, so
+    concurrent requests never share conversation state. Idle agents are kept
+    per key up to ``max_size`` and dropped after ``idle_timeout`` seconds.
+
+    Sync checkouts wait while a key is at ``max_size``. Async checkouts never
+    wait: agents share their model clients, so when no agent is idle a new
+    one is built on a worker thread. Such overflow agents are dropped on
+    checkin until the key is back within ``max_size``.
+    """
+
+    def __init__(self, factory: Callable[[Hashable], object], max_size: int = 4,
+                 idle_timeout: float = 600):
+        """Initialize the pool
+
+        Args:
+            factory: Callable building a new agent for a key
+            max_size: Maximum agents (idle plus checked out) per key
+            idle_timeout: Seconds an idle agent is kept before eviction
+        """
+        self.factory = factory
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self._condition = threading.Condition()
+        self._idle: Dict[Hashable, deque] = {}
+        self._sizes: Dict[Hashable, int] = {}
+        self._stats = {
+            "checkouts": 0,
+            "reuses": 0,
+            "creations": 0,
+            "evictions": 0,
+            "waits": 0,
+            "create_seconds_total": 0.0,
+        }
+
+    def checkout(self, key: Hashable, timeout: Optional[float] = None):
+        """Take an agent for exclusive use
+
+        Time spent waiting for a free agent is reported to the routed call,
+        like scheduler queue time, so it does not count toward
+        time-to-first-token; a call the router has abandoned stops waiting.
+
+        Args:
+            key: Pool key, e.g. (specialist_type, model_id)
+            timeout: Seconds to wait when the key is at max_size, None waits forever
+
+        Returns:
+            The checked-out agent
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        call = current_call()
+        waited = False
+
+        with self._condition:
+            self._evict_idle_locked(time.monotonic())
+            try:
+                while True:
+                    idle = self._idle.get(key)
+                    if idle:
+                        agent, _ = idle.pop()
+                        self._stats["checkouts"] += 1
+                        self._stats["reuses"] += 1
+                        return agent
+                    if self._sizes.get(key, 0) < self.max_size:
+                        # Reserve a slot, then build outside the lock
+                        self._sizes[key] = self._sizes.get(key, 0) + 1
+                        break
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        raise AgentPoolExhausted(f"No agent available for {key}")
+                    if not waited:
+                        waited = True
+                        self._stats["waits"] += 1
+                        if call is not None:
+                            call.queue_started()
+                    if call is not None:
+                        if call.abandoned.is_set():
+                            raise AgentPoolExhausted(f"Checkout for {key} abandoned while waiting")
+                        remaining = ABANDON_POLL_SECONDS if remaining is None else min(
+                            remaining, ABANDON_POLL_SECONDS)
+                    self._condition.wait(remaining)
+            finally:
+                if waited and call is not None:
+                    call.queue_finished()
+
+        try:
+            agent = self._create(key)
+        except Exception:
+            with self._condition:
+                self._sizes[key] -= 1
+                self._condition.notify()
+            raise
+
+        with self._condition:
+            self._stats["checkouts"] += 1
+        return agent
+
+    def checkin(self, key: Hashable, agent):
+        """Return an agent to the pool
+
+        Args:
+            key: Pool key the agent was checked out with
+            agent: The agent
+        """
+        self._reset(agent)
+        with self._condition:
+            if self._sizes.get(key, 0) > self.max_size:
+                # Overflow agent from an async checkout
+                self._sizes[key] -= 1
+            else:
+                self._idle.setdefault(key, deque()).append((agent, time.monotonic()))
+            self._condition.notify()
+
+    def discard(self, key: Hashable):
+        """Release the slot of a checked-out agent that should not be reused
+
+        Args:
+            key: Pool key the agent was checked out with
+        """
+        with self._condition:
+            self._sizes[key] -= 1
+            self._condition.notify()
+
+    @contextmanager
+    def lease(self, key: Hashable, timeout: Optional[float] = None):
+        """Check out an agent for the duration of a with-block
+
+        Args:
+            key: Pool key
+            timeout: Checkout timeout in seconds
+
+        Yields:
+            The checked-out agent
+        """
+        agent = self.checkout(key, timeout)
+        try:
+            yield agent
+        except BaseException:
+            # The agent may be mid-run; do not hand it to another request
+            self.discard(key)
+            raise
+        else:
+            self.checkin(key, agent)
+
+    async def acheckout(self, key: Hashable):
+        """Take an agent for exclusive use without blocking the event loop
+
+        Reuses an idle agent if there is one, otherwise builds a new agent on
+        a worker thread, even when the key is at max_size.
+
+        Args:
+            key: Pool key
+
+        Returns:
+            The checked-out agent
+        """
+        with self._condition:
+            self._evict_idle_locked(time.monotonic())
+            idle = self._idle.get(key)
+            if idle:
+                agent, _ = idle.pop()
+                self._stats["checkouts"] += 1
+                self._stats["reuses"] += 1
+                return agent
+            self._sizes[key] = self._sizes.get(key, 0) + 1
+
+        task = asyncio.ensure_future(asyncio.to_thread(self._create, key))
+        try:
+            agent = await asyncio.shield(task)
+        except asyncio.CancelledError:
+            # Keep the agent if the abandoned build still succeeds
+            task.add_done_callback(
+                lambda done: self.checkin(key, done.result())
+                if not done.cancelled() and done.exception() is None else self.discard(key)
+            )
+            raise
+        except Exception:
+            self.discard(key)
+            raise
+
+        with self._condition:
+            self._stats["checkouts"] += 1
+        return agent
+
+    @asynccontextmanager
+    async def alease(self, key: Hashable):
+        """Async counterpart of lease()
+
+        Args:
+            key: Pool key
+
+        Yields:
+            The checked-out agent
+        """
+        agent = await self.acheckout(key)
+        try:
+            yield agent
+        except BaseException:
+            self.discard(key)
+            raise
+        else:
+            self.checkin(key, agent)
+
+    def warm_up(self, keys: Iterable[Hashable], count: int = 1):
+        """Pre-build idle agents so first requests skip construction
+
+        Args:
+            keys: Pool keys to warm
+            count: Idle agents to ensure per key
+        """
+        for key in keys:
+            with self._condition:
+                missing = min(count, self.max_size) - len(self._idle.get(key, ()))
+                missing = min(missing, self.max_size - self._sizes.get(key, 0))
+                if missing <= 0:
+                    continue
+                self._sizes[key] = self._sizes.get(key, 0) + missing
+            for _ in range(missing):
+                try:
+                    agent = self._create(key)
+                except Exception as e:
+                    logger.error(f"Failed to warm up agent {key}: {str(e)}")
+                    self.discard(key)
+                    continue
+                self.checkin(key, agent)
+            logger.info(f"Warmed up {missing} agent(s) for {key}")
+
+    def evict_idle(self):
+        """Drop agents that have been idle longer than idle_timeout"""
+        with self._condition:
+            self._evict_idle_locked(time.monotonic())
+
+    def _evict_idle_locked(self, now: float):
+        for key, idle in self._idle.items():
+            # Idle agents are appended on checkin, so the oldest are on the left
+            while idle and now - idle[0][1] > self.idle_timeout:
+                idle.popleft()
+                self._sizes[key] -= 1
+                self._stats["evictions"] += 1
+
+    def _create(self, key: Hashable):
+        start = time.perf_counter()
+        agent = self.factory(key)
+        elapsed = time.perf_counter() - start
+        with self._condition:
+            self._stats["creations"] += 1
+            self._stats["create_seconds_total"] += elapsed
+        get_metrics().observe("agent_create_seconds", elapsed)
+        logger.info(f"Created pooled agent {key} in {elapsed * 1000:.1f} ms")
+        return agent
+
+    @staticmethod
+    def _reset(agent):
+        """Clear per-run conversation state before the agent is reused"""
+        memory = getattr(agent, "memory", None)
+        if memory is not None and hasattr(memory, "clear"):
+            memory.clear()
+
+    def get_stats(self) -> Dict[str, float]:
+        """Get pool statistics
+
+        Returns:
+            Dict: Checkout, reuse, creation and eviction counts and pool sizes
+        """
+        with self._condition:
+            stats = dict(self._stats)
+            stats["idle"] = sum(len(idle) for idle in self._idle.values())
+            stats["size"] = sum(self._sizes.values())
+        stats["reuse_rate"] = stats["reuses"] / stats["checkouts"] if stats["checkouts"] else 0.0
+        return stats
@@ -0,0 +1,251 @@
+from typing import Dict, List, NamedTuple, Optional, Tuple
+import json
+import os
+import re
+import secrets
+import sqlite3
+import threading
+import time
+import logging
+from utils.config_loader import DEFAULT_CONFIG_PATH, load_config
+
+logger = logging.getLogger(__name__)
+
+# Characters of the prompt shown as the title of a history entry
+TITLE_LENGTH = 80
+
+_SEARCH_TERM = re.compile(r"\w+")
+
+_OWNER_TOKEN = re.compile(r"[A-Za-z0-9_-]{22,64}")
+
+
+def new_owner_token() -> str:
+    """Create a random owner key for a user who is not signed in
+
+    The token is the only credential of its history, so it is unguessable.
+
+    Returns:
+        str: URL-safe token
+    """
+    return secrets.token_urlsafe(24)
+
+
+def is_owner_token(token: Optional[str]) -> bool:
+    """Check that a token from a URL has the shape of new_owner_token()
+
+    Args:
+        token: Candidate token, or None
+
+    Returns:
+        bool: True for a well-formed token
+    """
+    return bool(token) and _OWNER_TOKEN.fullmatch(token) is not None
+
+
+class HistorySummary(NamedTuple):
+    """One row of a history page; the diagram body is not loaded"""
+    id: int
+    created_at: float
+    model: str
+    title: str
+
+
+class HistoryEntry(NamedTuple):
+    """A stored generation with its diagram and explanation"""
+    id: int
+    created_at: float
+    model: str
+    prompt: str
+    diagram: str
+    explanation: str
+    timings: Dict[str, float]
+
+
+class DiagramHistory:
+    """Persistent history of generated diagrams in SQLite
+
+    Every entry belongs to an owner key (a signed-in user or a browser
+    session), and listing, searching and loading only see that owner's
+    entries. Pages list summaries newest first with keyset pagination on the row id,
+    so every page costs one index range scan however deep the user goes.
+    Prompts and explanations are indexed with FTS5 when the SQLite build has
+    it; otherwise search falls back to LIKE. Diagram bodies are only read
+    when an entry is opened.
+    """
+
+    def __init__(self, db_path: str, max_entries: int = 10000):
+        """Open or create the history
+
+        Args:
+            db_path: SQLite file
+            max_entries: Entries kept per owner; an owner's oldest are deleted beyond this
+        """
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS diagrams ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " owner TEXT NOT NULL DEFAULT '',"
+            " created_at REAL NOT NULL,"
+            " model TEXT NOT NULL,"
+            " title TEXT NOT NULL,"
+            " prompt TEXT NOT NULL,"
+            " diagram TEXT NOT NULL,"
+            " explanation TEXT NOT NULL,"
+            " timings TEXT NOT NULL)"
+        )
+        # Files written before entries had owners; their rows stay hidden from everyone
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(diagrams)")]
+        if "owner" not in columns:
+            self._conn.execute("ALTER TABLE diagrams ADD COLUMN owner TEXT NOT NULL DEFAULT ''")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_diagrams_owner ON diagrams (owner, id)")
+        self.full_text = self._create_fts()
+        self._conn.commit()
+
+    def _create_fts(self) -> bool:
+        """Create the FTS5 index and its sync triggers, if FTS5 is available"""
+        try:
+            self._conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS diagrams_fts USING fts5("
+                " prompt, explanation, content='diagrams', content_rowid='id')"
+            )
+        except sqlite3.OperationalError as e:
+            logger.warning(f"SQLite has no FTS5, history search falls back to LIKE: {str(e)}")
+            return False
+
+        self._conn.execute(
+            "CREATE TRIGGER IF NOT EXISTS diagrams_fts_insert AFTER INSERT ON diagrams BEGIN"
+            " INSERT INTO diagrams_fts (rowid, prompt, explanation)"
+            " VALUES (new.id, new.prompt, new.explanation); END"
+        )
+        self._conn.execute(
+            "CREATE TRIGGER IF NOT EXISTS diagrams_fts_delete AFTER DELETE ON diagrams BEGIN"
+            " INSERT INTO diagrams_fts (diagrams_fts, rowid, prompt, explanation)"
+            " VALUES ('delete', old.id, old.prompt, old.explanation); END"
+        )
+        return True
+
+    def add(self, owner: str, prompt: str, model: str, diagram: str, explanation: str = "",
+            timings: Optional[Dict[str, float]] = None) -> int:
+        """Store a generated diagram
+
+        Args:
+            owner: Key of the user or session the entry belongs to
+            prompt: Requirement text
+            model: Model that generated the diagram
+            diagram: Validated Mermaid code
+            explanation: Explanation text
+            timings: Optional stage timings
+
+        Returns:
+            int: ID of the new entry
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO diagrams (owner, created_at, model, title, prompt, diagram, explanation, timings)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (owner, time.time(), model, " ".join(prompt.split())[:TITLE_LENGTH], prompt, diagram,
+                 explanation, json.dumps(timings or {}))
+            )
+            entry_id = cursor.lastrowid
+            # One owner's entries never push out another's; the delete
+            # trigger removes pruned rows from the FTS index as well
+            self._conn.execute(
+                "DELETE FROM diagrams WHERE owner = ? AND id <= ("
+                " SELECT id FROM diagrams WHERE owner = ? ORDER BY id DESC LIMIT 1 OFFSET ?)",
+                (owner, owner, self.max_entries)
+            )
+            self._conn.commit()
+        return entry_id
+
+    def list_page(self, owner: str, query: str = "", before: Optional[int] = None,
+                  limit: int = 10) -> Tuple[List[HistorySummary], Optional[int]]:
+        """List one page of an owner's entries, newest first
+
+        Args:
+            owner: Key of the user or session, as passed to add()
+            query: Optional search terms; every term must match the prompt or
+                explanation, the last one as a prefix
+            before: Cursor from the previous page; None for the first page
+            limit: Entries per page
+
+        Returns:
+            Tuple[List[HistorySummary], Optional[int]]: The page and the cursor
+            of the next page, or None if this is the last page
+        """
+        terms = _SEARCH_TERM.findall(query)
+        sql = "SELECT id, created_at, model, title FROM diagrams WHERE owner = ?"
+        params: list = [owner]
+        if terms and self.full_text:
+            match = " ".join(f'"{term}"' for term in terms) + "*"
+            sql += " AND id IN (SELECT rowid FROM diagrams_fts WHERE diagrams_fts MATCH ?)"
+            params.append(match)
+        elif terms:
+            sql += "".join([" AND (prompt LIKE ? OR explanation LIKE ?)"] * len(terms))
+            for term in terms:
+                params.extend([f"%{term}%"] * 2)
+        if before is not None:
+            sql += " AND id < ?"
+            params.append(before)
+        sql += " ORDER BY id DESC LIMIT ?"
+        # One extra row tells whether another page follows
+        params.append(limit + 1)
+
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        page = [HistorySummary(*row) for row in rows[:limit]]
+        return page, (page[-1].id if len(rows) > limit else None)
+
+    def get(self, owner: str, entry_id: int) -> Optional[HistoryEntry]:
+        """Load one of an owner's entries with its diagram
+
+        Args:
+            owner: Key of the user or session, as passed to add()
+            entry_id: ID of the entry
+
+        Returns:
+            HistoryEntry: The entry, or None if it no longer exists or
+            belongs to another owner
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, created_at, model, prompt, diagram, explanation, timings"
+                " FROM diagrams WHERE id = ? AND owner = ?", (entry_id, owner)
+            ).fetchone()
+        if row is None:
+            return None
+        return HistoryEntry(*row[:6], json.loads(row[6]))
+
+
+_history = None
+_history_lock = threading.Lock()
+
+
+def get_diagram_history(config_path: str = DEFAULT_CONFIG_PATH) -> Optional[DiagramHistory]:
+    """Get the process-wide diagram history configured in settings.yaml
+
+    Args:
+        config_path: Path to configuration file
+
+    Returns:
+        DiagramHistory: Shared history, or None if it is disabled
+    """
+    global _history
+    history_config = load_config(config_path).get("ui", {}).get("history", {})
+    if not history_config.get("enabled", False):
+        return None
+
+    if _history is None:
+        with _history_lock:
+            if _history is None:
+                _history = DiagramHistory(
+                    history_config.get("path", ".cache/history.db"),
+                    max_entries=history_config.get("max_entries", 10000)
+                )
+                logger.info("Initialized diagram history")
+    return _history
@@ -0,0 +1,302 @@
+from typing import Dict, Optional
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+import hashlib
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+import logging
+from utils.config_loader import DEFAULT_CONFIG_PATH, load_config
+from utils.metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+
+
+class DiagramRenderer:
+    """Server-side Mermaid to SVG renderer with a rendered-asset cache
+
+    Diagrams are laid out once by the Mermaid CLI (``mmdc``) and the SVG is
+    cached in memory and on disk, keyed by a hash of the code and theme.
+    Reruns of the dashboard serve the cached SVG instead of making the
+    browser run mermaid.js layout again.
+    """
+
+    def __init__(self, command: str = "mmdc", theme: str = "default", cache_dir: Optional[str] = None,
+                 memory_entries: int = 64, max_disk_bytes: int = 50 * 1024 * 1024,
+                 timeout_seconds: float = 30, workers: int = 2, puppeteer_config: Optional[str] = None):
+        """Initialize the renderer
+
+        Args:
+            command: Mermaid CLI executable name or path
+            theme: Default Mermaid theme
+            cache_dir: Optional directory for the on-disk SVG tier
+            memory_entries: Maximum SVGs in the in-memory tier
+            max_disk_bytes: Maximum total size of the on-disk tier
+            timeout_seconds: Time limit for one CLI render
+            workers: Concurrent background renders
+            puppeteer_config: Optional puppeteer config file for the CLI,
+                e.g. to disable the Chromium sandbox in containers
+        """
+        self.executable = shutil.which(command)
+        self.theme = theme
+        self.cache_dir = cache_dir
+        self.memory_entries = memory_entries
+        self.max_disk_bytes = max_disk_bytes
+        self.timeout_seconds = timeout_seconds
+        self.puppeteer_config = puppeteer_config
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, str]" = OrderedDict()
+        self._pending: Dict[str, Future] = {}
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="mermaid-render")
+        self._stats = {"hits": 0, "misses": 0, "renders": 0, "failures": 0, "render_seconds": 0.0}
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+        if not self.executable:
+            logger.info(f"Mermaid CLI '{command}' not found, diagrams render in the browser")
+
+    @property
+    def available(self) -> bool:
+        return self.executable is not None
+
+    @staticmethod
+    def make_key(code: str, theme: str) -> str:
+        """Build a cache key
+
+        Args:
+            code: Mermaid code
+            theme: Mermaid theme
+
+        Returns:
+            str: Hex digest identifying the rendered asset
+        """
+        return hashlib.sha256(f"{theme}\x1f{code.strip()}".encode("utf-8")).hexdigest()
+
+    def get(self, code: str, theme: Optional[str] = None) -> Optional[str]:
+        """Look up a rendered SVG without rendering
+
+        Args:
+            code: Mermaid code
+            theme: Mermaid theme, defaults to the renderer's theme
+
+        Returns:
+            str: Cached SVG, or None on a miss
+        """
+        key = self.make_key(code, theme or self.theme)
+        with self._lock:
+            svg = self._memory.get(key)
+            if svg is not None:
+                self._memory.move_to_end(key)
+                self._stats["hits"] += 1
+                return svg
+
+        svg = self._read_disk(key)
+        with self._lock:
+            if svg is None:
+                self._stats["misses"] += 1
+                return None
+            self._stats["hits"] += 1
+            self._put_memory(key, svg)
+        return svg
+
+    def prerender(self, code: str, theme: Optional[str] = None) -> Optional[Future]:
+        """Render a diagram in the background unless it is cached or already rendering
+
+        Args:
+            code: Mermaid code
+            theme: Mermaid theme, defaults to the renderer's theme
+
+        Returns:
+            Future: Resolves to the SVG or None; None if the CLI is not installed
+        """
+        if not self.available or not code:
+            return None
+        theme = theme or self.theme
+        key = self.make_key(code, theme)
+        with self._lock:
+            if key in self._memory:
+                future = Future()
+                future.set_result(self._memory[key])
+                return future
+            future = self._pending.get(key)
+            if future is None:
+                future = self._pending[key] = self._executor.submit(self._render, key, code, theme)
+        return future
+
+    def render(self, code: str, theme: Optional[str] = None) -> Optional[str]:
+        """Get the SVG for a diagram, rendering it now on a miss
+
+        Args:
+            code: Mermaid code
+            theme: Mermaid theme, defaults to the renderer's theme
+
+        Returns:
+            str: SVG, or None if the CLI is not installed or rendering failed
+        """
+        svg = self.get(code, theme)
+        if svg is not None:
+            return svg
+        future = self.prerender(code, theme)
+        return future.result() if future else None
+
+    def _render(self, key: str, code: str, theme: str) -> Optional[str]:
+        try:
+            svg = self._read_disk(key)
+            if svg is None:
+                svg = self._run_cli(code, theme)
+                if svg is not None:
+                    self._write_disk(key, svg)
+            if svg is not None:
+                with self._lock:
+                    self._put_memory(key, svg)
+            return svg
+        finally:
+            with self._lock:
+                self._pending.pop(key, None)
+
+    def _run_cli(self, code: str, theme: str) -> Optional[str]:
+        """Lay out a diagram with the Mermaid CLI"""
+        start = time.perf_counter()
+        with tempfile.TemporaryDirectory(prefix="mermaid-") as directory:
+            source = os.path.join(directory, "diagram.mmd")
+            target = os.path.join(directory, "diagram.svg")
+            with open(source, "w", encoding="utf-8") as f:
+                f.write(code)
+
+            command = [self.executable, "-i", source, "-o", target, "-t", theme, "-b", "transparent", "-q"]
+            if self.puppeteer_config:
+                command += ["-p", self.puppeteer_config]
+            try:
+                subprocess.run(command, check=True, capture_output=True, timeout=self.timeout_seconds)
+                with open(target, encoding="utf-8") as f:
+                    svg = f.read()
+            except (OSError, subprocess.SubprocessError) as e:
+                stderr = getattr(e, "stderr", None) or b""
+                logger.warning(f"Mermaid CLI render failed: {str(e)} {stderr.decode('utf-8', 'replace')[:200]}")
+                with self._lock:
+                    self._stats["failures"] += 1
+                return None
+
+        seconds = time.perf_counter() - start
+        get_metrics().observe("diagram_render_seconds", seconds)
+        with self._lock:
+            self._stats["renders"] += 1
+            self._stats["render_seconds"] += seconds
+        return svg
+
+    def _put_memory(self, key: str, svg: str):
+        """Insert into the memory tier; caller holds the lock"""
+        self._memory[key] = svg
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _disk_path(self, key: str) -> Optional[str]:
+        return os.path.join(self.cache_dir, f"{key}.svg") if self.cache_dir else None
+
+    def _read_disk(self, key: str) -> Optional[str]:
+        path = self._disk_path(key)
+        if not path:
+            return None
+        try:
+            with open(path, encoding="utf-8") as f:
+                svg = f.read()
+        except FileNotFoundError:
+            return None
+        # Another renderer may evict the file between the read and the touch
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return svg
+
+    def _write_disk(self, key: str, svg: str):
+        """Write atomically, then evict least recently used files over the size limit"""
+        path = self._disk_path(key)
+        if not path:
+            return
+        descriptor, temporary = tempfile.mkstemp(dir=self.cache_dir, prefix=f"{key}.", suffix=".tmp")
+        try:
+            with os.fdopen(descriptor, "w", encoding="utf-8") as f:
+                f.write(svg)
+            os.replace(temporary, path)
+        except OSError as e:
+            logger.warning(f"Could not cache rendered diagram: {str(e)}")
+            try:
+                os.remove(temporary)
+            except OSError:
+                pass
+            return
+
+        # Files may vanish while scanning when several processes share the directory
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".svg"):
+                try:
+                    stat = os.stat(os.path.join(self.cache_dir, name))
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, name))
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+            except OSError:
+                pass
+            total -= size
+
+    def get_stats(self) -> Dict[str, float]:
+        """Get cache and render statistics
+
+        Returns:
+            Dict: Hits, misses, renders, failures, hit rate and average render time
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["memory_entries"] = len(self._memory)
+            stats["pending"] = len(self._pending)
+
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        stats["avg_render_seconds"] = stats.pop("render_seconds") / stats["renders"] if stats["renders"] else 0.0
+        return stats
+
+
+_renderer = None
+_renderer_lock = threading.Lock()
+
+
+def get_diagram_renderer(config_path: str = DEFAULT_CONFIG_PATH) -> Optional[DiagramRenderer]:
+    """Get the process-wide diagram renderer configured in settings.yaml
+
+    Args:
+        config_path: Path to configuration file
+
+    Returns:
+        DiagramRenderer: Shared renderer, or None if pre-rendering is disabled
+        or the Mermaid CLI is not installed
+    """
+    global _renderer
+    render_config = load_config(config_path).get("ui", {}).get("prerender", {})
+    if not render_config.get("enabled", False):
+        return None
+
+    if _renderer is None:
+        with _renderer_lock:
+            if _renderer is None:
+                _renderer = DiagramRenderer(
+                    command=render_config.get("command", "mmdc"),
+                    theme=render_config.get("theme", "default"),
+                    cache_dir=render_config.get("cache_dir") or None,
+                    memory_entries=render_config.get("memory_entries", 64),
+                    max_disk_bytes=render_config.get("disk_max_bytes", 50 * 1024 * 1024),
+                    timeout_seconds=render_config.get("timeout_seconds", 30),
+                    workers=render_config.get("workers", 2),
+                    puppeteer_config=render_config.get("puppeteer_config") or None
+                )
+                logger.info("Initialized diagram renderer")
+    return _renderer if _renderer.available else None
@@ -1,32 +1,387 @@
 from core.architect_agent import DiagramSpecialist
+from services.model_service import ModelProviderService
+from services.hedging import HedgedGenerator
+from services.model_router import ModelRouter
+from services.request_scheduler import CHARS_PER_TOKEN
+from services.response_cache import ResponseCache, get_response_cache, replay_response, areplay_response
+from services.semantic_cache import get_semantic_cache
+from services.stream_coalescer import StreamCoalescer
+from utils.diagram_parser import extract_mermaid_code
+from utils.mermaid_ast import validate_and_repair
+from utils.metrics import StageTimer, get_metrics
+from utils.stream_buffer import ResponseBuffer
+import asyncio
+import time
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Targeted follow-up prompt for a diagram that fails validation after auto-repair
+REPROMPT_TEMPLATE = """The following Mermaid diagram has syntax errors:
+
+```mermaid
+{code}
+```
+
+Errors:
+{errors}
+
+Return only the corrected diagram in a ```mermaid block. Keep every node and
+connection; change only what is needed to fix the errors."""
+
+
+class ServedStream:
+    """Measured response stream that reports which model served it"""
+
+    def __init__(self, generator, source, model: str):
+        self.requested_model = model
+        self._generator = generator
+        self._source = source
+
+    @property
+    def served_model(self):
+        """Model that answered; cache hits were stored for the requested model"""
+        if self._source is None:
+            return self.requested_model
+        return getattr(self._source, "served_model", None)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._generator)
+
+    def close(self):
+        self._generator.close()
+
+
+class AsyncServedStream:
+    """Async counterpart of ServedStream
+
+    The caches are checked once iteration starts, so the routed stream
+    behind it is attached by the service when it is known.
+    """
+
+    def __init__(self, generator, source, model: str):
+        self.requested_model = model
+        self._generator = generator
+        self._source = source
+
+    served_model = ServedStream.served_model
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        return await self._generator.__anext__()
+
+    async def aclose(self):
+        await self._generator.aclose()
+
 
 class DiagramGenerationService:
     """Service for generating architecture diagrams"""
 
-    def __init__(self):
-        """Initialize the diagram generation service"""
-        self.specialist = DiagramSpecialist()
+    def __init__(self, config_path="config/settings.yaml"):
+        """Initialize the diagram generation service
 
-    def generate(self, requirements, model=None):
+        Args:
+            config_path: Path to configuration file
+        """
+        self.provider_service = ModelProviderService(config_path)
+        self.specialist = DiagramSpecialist(
+            config_path=config_path,
+            models=self.provider_service.providers.get("groq")
+        )
+        self.cache = get_response_cache(config_path)
+        self.semantic_cache = get_semantic_cache(config_path)
+
+        # Optional hedging of slow first tokens, beneath the router. The async
+        # path is not hedged; it relies on the router's first-token timeout
+        config = self.specialist.config
+        generate = self.specialist.generate_diagram
+        self.hedger = None
+        if config.get("hedging", {}).get("enabled", False):
+            self.hedger = HedgedGenerator.from_config(generate, config)
+            generate = self.hedger.stream
+
+        # Latency-aware retries and failover to the fallback model
+        self.router = ModelRouter.from_config(
+            generate,
+            config,
+            agenerate=self.specialist.agenerate_diagram
+        )
+        if self.hedger and self.router.first_token_timeout:
+            # Leave the hedge time to answer before the router gives up
+            self.hedger.max_delay = min(self.hedger.max_delay, self.router.first_token_timeout / 2)
+            self.hedger.default_delay = min(self.hedger.default_delay, self.hedger.max_delay)
+
+        # Identical requests in flight at the same time share one upstream stream
+        self.coalescer = StreamCoalescer() if config.get("coalescing", {}).get("enabled", True) else None
+
+        # Re-prompt the model when a diagram is still invalid after auto-repair
+        self.reprompt_invalid = config.get("validation", {}).get("reprompt", True)
+
+    def generate(self, requirements, model=None, timer=None, semantic=True):
         """Generate a diagram based on requirements
 
         Args:
             requirements: The requirements text
-            model: Optional model override
+            model: Optional model for this request only; the shared
+                service is never mutated, so concurrent requests may use
+                different models
+            timer: Optional StageTimer that receives time-to-first-token,
+                stream time and tokens/sec; the caller then finishes it
+            semantic: Whether a near-duplicate earlier request may answer
+                this one from the semantic cache
+
+        Returns:
+            ServedStream: Stream of diagram generation responses; its
+            served_model is set once a model answers
+        """
+        model = model or self.specialist.model_id
+        logger.info(f"Generating diagram with {model}, requirements: {requirements[:100]}...")
+        stream, source = self._generate(requirements, model, semantic)
+        return ServedStream(self._measure(stream, model, timer), source, model)
+
+    def _generate(self, requirements, model, semantic=True):
+        """Build the response stream from the caches or the router
+
+        Returns:
+            Tuple: Response stream, and the routed stream behind it or None
+            for a cache hit
+        """
+        instructions = self.specialist._get_instructions()
+        cached = self._lookup(requirements, model, instructions, semantic)
+        if cached is not None:
+            return replay_response(cached), None
+
+        cache_key = ResponseCache.make_key(requirements, model, instructions)
+        if self.coalescer:
+            stream = self.coalescer.stream(cache_key, lambda: self.router.stream(requirements, model))
+        else:
+            stream = self.router.stream(requirements, model)
+
+        # Responses served by the fallback model are not cached for the requested one
+        def should_store():
+            return stream.served_model == model
+
+        recorded = stream
+        if self.cache:
+            recorded = self.cache.record(cache_key, recorded, should_store=should_store)
+        if self.semantic_cache and semantic:
+            recorded = self.semantic_cache.record(requirements, model, instructions, recorded,
+                                                  should_store=should_store)
+        return recorded, stream
+
+    def astream(self, requirements, model=None, timer=None, semantic=True):
+        """Stream a diagram on the event loop
+
+        Closing the returned iterator (for example when the client
+        disconnects and its task is cancelled) cancels the upstream request.
+
+        Args:
+            requirements: The requirements text
+            model: Optional model for this request only
+            timer: Optional StageTimer, as in generate()
+            semantic: Whether the semantic cache may answer, as in generate()
+
+        Returns:
+            AsyncServedStream: Async stream of diagram generation responses
+        """
+        model = model or self.specialist.model_id
+        logger.info(f"Streaming diagram with {model}, requirements: {requirements[:100]}...")
+        served = AsyncServedStream(None, None, model)
+        served._generator = self._ameasure(self._astream(requirements, model, semantic, served), model, timer)
+        return served
+
+    async def _astream(self, requirements, model, semantic, served):
+        """Async counterpart of _generate
+
+        The cache lookup reads SQLite and may query pgvector, so it runs on
+        a worker thread instead of blocking the event loop.
+        """
+        instructions = self.specialist._get_instructions()
+        cached = await asyncio.to_thread(self._lookup, requirements, model, instructions, semantic)
+        if cached is not None:
+            stream = areplay_response(cached)
+        else:
+            stream, served._source = self._aroute(requirements, model, instructions, semantic)
+
+        try:
+            async for response in stream:
+                yield response
+        finally:
+            aclose = getattr(stream, "aclose", None)
+            if aclose:
+                await aclose()
+
+    def _aroute(self, requirements, model, instructions, semantic):
+        """Build the routed async stream for a cache miss, recording its response"""
+        cache_key = ResponseCache.make_key(requirements, model, instructions)
+        if self.coalescer:
+            stream = self.coalescer.astream(cache_key, lambda: self.router.astream(requirements, model))
+        else:
+            stream = self.router.astream(requirements, model)
+
+        def should_store():
+            return stream.served_model == model
+
+        recorded = stream
+        if self.cache:
+            recorded = self.cache.arecord(cache_key, recorded, should_store=should_store)
+        if self.semantic_cache and semantic:
+            recorded = self.semantic_cache.arecord(requirements, model, instructions, recorded,
+                                                   should_store=should_store)
+        return recorded, stream
+
+    def _lookup(self, requirements, model, instructions, semantic):
+        """Find a cached response, exact matches first, then near duplicates"""
+        if self.cache:
+            cached = self.cache.get(self.cache.make_key(requirements, model, instructions))
+            if cached is not None:
+                logger.info("Serving diagram from response cache")
+                get_metrics().increment("generation_cache_hits", labels={"model": model})
+                return cached
+
+        if self.semantic_cache and semantic:
+            cached = self.semantic_cache.lookup(requirements, model, instructions)
+            if cached is not None:
+                logger.info("Serving diagram from semantic cache")
+                get_metrics().increment("generation_semantic_cache_hits", labels={"model": model})
+                return cached
+        return None
+
+    def _measure(self, stream, model, timer):
+        """Record time-to-first-token, stream time and tokens/sec of a stream"""
+        owns_timer = timer is None
+        timer = timer or StageTimer({"model": model})
+        start = time.perf_counter()
+        first_token = None
+        chars = 0
+        try:
+            for response in stream:
+                if response.content:
+                    if first_token is None:
+                        first_token = time.perf_counter()
+                        timer.record("time_to_first_token", first_token - start)
+                    chars += len(response.content)
+                yield response
+        finally:
+            close = getattr(stream, "close", None)
+            if close:
+                close()
+            self._record_stream(timer, start, first_token, chars, owns_timer)
+
+    async def _ameasure(self, stream, model, timer):
+        """Async counterpart of _measure"""
+        owns_timer = timer is None
+        timer = timer or StageTimer({"model": model})
+        start = time.perf_counter()
+        first_token = None
+        chars = 0
+        try:
+            async for response in stream:
+                if response.content:
+                    if first_token is None:
+                        first_token = time.perf_counter()
+                        timer.record("time_to_first_token", first_token - start)
+                    chars += len(response.content)
+                yield response
+        finally:
+            aclose = getattr(stream, "aclose", None)
+            if aclose:
+                await aclose()
+            self._record_stream(timer, start, first_token, chars, owns_timer)
+
+    @staticmethod
+    def _record_stream(timer, start, first_token, chars, owns_timer):
+        end = time.perf_counter()
+        timer.record("stream", end - start)
+        if first_token is not None and end > first_token:
+            timer.set("tokens_per_second", chars / CHARS_PER_TOKEN / (end - first_token))
+        if owns_timer:
+            timer.finish()
+
+    def validate_diagram(self, code, model=None):
+        """Validate a diagram, repairing it cheaply or by re-prompting the model
+
+        Auto-repair is tried first. Only a diagram that is still invalid
+        costs a model call, a short prompt listing the errors; its answer is
+        used if it validates.
+
+        Args:
+            code: Extracted Mermaid code
+            model: Optional model for the re-prompt
+
+        Returns:
+            Tuple[str, MermaidDiagram]: The best code found and its AST
+        """
+        original = code
+        code, diagram = validate_and_repair(code)
+        if diagram.is_valid or not self.reprompt_invalid:
+            return code, diagram
+
+        prompt = self._reprompt(original, diagram, model)
+        buffer = ResponseBuffer()
+        # Re-prompts embed the diagram, so only exact repeats may be served from cache
+        for response in self.generate(prompt, model, semantic=False):
+            if response.content:
+                buffer.append(response.content)
+        return self._pick_repaired(code, diagram, buffer.getvalue(), model)
+
+    async def avalidate_diagram(self, code, model=None):
+        """Async counterpart of validate_diagram
+
+        Args:
+            code: Extracted Mermaid code
+            model: Optional model for the re-prompt
 
         Returns:
-            Iterator: Stream of diagram generation responses
+            Tuple[str, MermaidDiagram]: The best code found and its AST
         """
-        logger.info(f"Generating diagram with requirements: {requirements[:100]}...")
+        original = code
+        code, diagram = validate_and_repair(code)
+        if diagram.is_valid or not self.reprompt_invalid:
+            return code, diagram
 
-        # Update model if specified
-        if model and model != self.specialist.agent.model.id:
-            logger.info(f"Switching model to {model}")
-            self.specialist.agent.model.id = model
+        prompt = self._reprompt(original, diagram, model)
+        response = await self.agenerate(prompt, model, semantic=False)
+        return self._pick_repaired(code, diagram, response, model)
 
-        # Generate diagram
-        return self.specialist.generate_diagram(requirements)
\ No newline at end of file
+    def _reprompt(self, code, diagram, model):
+        model = model or self.specialist.model_id
+        logger.warning(f"Diagram failed validation, re-prompting {model}: {'; '.join(diagram.errors)}")
+        get_metrics().increment("diagram_reprompts", labels={"model": model})
+        # The model sees its own code, so issues are listed without the formatted line numbers
+        errors = "\n".join(f"- {issue.message}" for issue in diagram.issues)
+        return REPROMPT_TEMPLATE.format(code=code.strip(), errors=errors)
+
+    def _pick_repaired(self, code, diagram, response, model):
+        """Use the re-prompted diagram if it validates, else keep the original"""
+        repaired = extract_mermaid_code(response) if response else None
+        if repaired:
+            repaired_code, repaired_diagram = validate_and_repair(repaired)
+            if repaired_diagram.is_valid:
+                return repaired_code, repaired_diagram
+
+        get_metrics().increment("diagram_reprompt_failures", labels={"model": model or self.specialist.model_id})
+        logger.error("Re-prompted diagram is still invalid")
+        return code, diagram
+
+    async def agenerate(self, requirements, model=None, semantic=True):
+        """Generate a complete diagram response on the event loop
+
+        Args:
+            requirements: The requirements text
+            model: Optional model for this request only
+            semantic: Whether the semantic cache may answer, as in generate()
+
+        Returns:
+            str: Full response text
+        """
+        buffer = ResponseBuffer()
+        async for response in self.astream(requirements, model, semantic=semantic):
+            if response.content:
+                buffer.append(response.content)
+        return buffer.getvalue()
@@ -0,0 +1,290 @@
+from typing import Callable, Dict, Iterator, Optional
+from collections import deque
+import contextvars
+import queue
+import threading
+import time
+import logging
+from utils.metrics import percentile
+
+logger = logging.getLogger(__name__)
+
+PRIMARY = "primary"
+HEDGE = "hedge"
+
+_ITEM = "item"
+_END = "end"
+_ERROR = "error"
+
+
+class _Source:
+    """One upstream stream pumped into the shared event queue by a thread"""
+
+    def __init__(self, name: str, model: str, stream: Iterator, events: queue.Queue):
+        self.name = name
+        self.model = model
+        self.items = []
+        self.has_token = False
+        self.finished = False
+        self.error = None
+        self.cancelled = threading.Event()
+        self._stream = stream
+        self._events = events
+        context = contextvars.copy_context()
+        self._thread = threading.Thread(
+            target=context.run, args=(self._pump,), name=f"hedge-{name}", daemon=True
+        )
+        self._thread.start()
+
+    def _pump(self):
+        try:
+            for item in self._stream:
+                if self.cancelled.is_set():
+                    break
+                self._events.put((self, _ITEM, item))
+            else:
+                self._events.put((self, _END, None))
+        except Exception as e:
+            self._events.put((self, _ERROR, e))
+        finally:
+            close = getattr(self._stream, "close", None)
+            if close:
+                close()
+
+    def accept(self, item):
+        """Buffer an item and track whether the first token has arrived"""
+        self.items.append(item)
+        if item.content:
+            self.has_token = True
+
+    def cancel(self):
+        self.cancelled.set()
+
+
+class HedgedStream:
+    """Iterator over a hedged response that records which model won"""
+
+    def __init__(self, hedger: "HedgedGenerator", requirements: str, model: str):
+        self.requested_model = model
+        self.served_model = None
+        self._generator = hedger._stream(self, requirements, model)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._generator)
+
+    def close(self):
+        self._generator.close()
+
+
+class HedgedGenerator:
+    """Opt-in request hedging for tail-latency reduction
+
+    A request starts on the requested model. If it has produced no token
+    after a delay derived from the observed time-to-first-token percentile,
+    the same prompt is also sent to a hedge model. Once both streams run,
+    the first to produce a token wins. Its buffered output is replayed and
+    then streamed live, and the loser is cancelled. Deciding on the first
+    token keeps output incremental, so the router's first-token timeout
+    sees the hedged stream like any other.
+    """
+
+    def __init__(self, generate: Callable[[str, str], Iterator], hedge_model: Optional[str] = None,
+                 delay_percentile: float = 0.95, default_delay: float = 2.0,
+                 min_delay: float = 0.25, max_delay: float = 10.0,
+                 min_samples: int = 10, window_size: int = 100):
+        """Initialize the hedger
+
+        Args:
+            generate: Callable (requirements, model_id) returning a response stream
+            hedge_model: Model for the hedge request; None re-sends to the same model
+            delay_percentile: TTFT percentile used as the hedge delay
+            default_delay: Hedge delay in seconds until enough samples exist
+            min_delay: Lower bound for the hedge delay in seconds
+            max_delay: Upper bound for the hedge delay in seconds
+            min_samples: TTFT samples required before the percentile is used
+            window_size: Number of recent TTFT samples kept per model
+        """
+        self.generate = generate
+        self.hedge_model = hedge_model
+        self.delay_percentile = delay_percentile
+        self.default_delay = default_delay
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.min_samples = min_samples
+        self.window_size = window_size
+
+        self._lock = threading.Lock()
+        self._ttft: Dict[str, deque] = {}
+        self._stats = {
+            "requests": 0,
+            "hedges": 0,
+            "hedge_wins": 0,
+            "primary_wins": 0,
+        }
+
+    @classmethod
+    def from_config(cls, generate: Callable[[str, str], Iterator], config: Dict) -> "HedgedGenerator":
+        """Build a hedger from the hedging config section
+
+        Args:
+            generate: Callable (requirements, model_id) returning a response stream
+            config: Parsed settings.yaml
+
+        Returns:
+            HedgedGenerator: Configured hedger
+        """
+        hedging = config.get("hedging", {})
+        return cls(
+            generate,
+            hedge_model=hedging.get("hedge_model", config.get("models", {}).get("fallback")),
+            delay_percentile=hedging.get("delay_percentile", 0.95),
+            default_delay=hedging.get("default_delay_seconds", 2.0),
+            min_delay=hedging.get("min_delay_seconds", 0.25),
+            max_delay=hedging.get("max_delay_seconds", 10.0),
+            min_samples=hedging.get("min_samples", 10),
+        )
+
+    def hedge_delay(self, model: str) -> float:
+        """Get the current hedge delay for a model
+
+        Args:
+            model: Model ID
+
+        Returns:
+            float: Seconds to wait for a first token before hedging
+        """
+        with self._lock:
+            samples = list(self._ttft.get(model, ()))
+        if len(samples) < self.min_samples:
+            return self.default_delay
+        delay = percentile(samples, self.delay_percentile)
+        return min(self.max_delay, max(self.min_delay, delay))
+
+    def stream(self, requirements: str, model: str) -> HedgedStream:
+        """Stream a response, hedging when the first token is slow
+
+        Args:
+            requirements: The requirements text
+            model: Requested model ID
+
+        Returns:
+            HedgedStream: Stream of the winning response
+        """
+        return HedgedStream(self, requirements, model)
+
+    def _stream(self, hedged: HedgedStream, requirements: str, model: str):
+        with self._lock:
+            self._stats["requests"] += 1
+
+        delay = self.hedge_delay(model)
+        events = queue.Queue()
+        start = time.monotonic()
+        primary = _Source(PRIMARY, model, self.generate(requirements, model), events)
+        sources = [primary]
+
+        try:
+            # Empty items (e.g. run events) may precede the first token
+            while not primary.has_token:
+                remaining = delay - (time.monotonic() - start)
+                try:
+                    _, kind, payload = events.get(timeout=max(0.0, remaining))
+                except queue.Empty:
+                    break
+                if kind == _ERROR:
+                    raise payload
+                if kind == _END:
+                    hedged.served_model = model
+                    yield from primary.items
+                    return
+                primary.accept(payload)
+
+            if primary.has_token:
+                # The primary answered within the delay: no hedge
+                self._record_ttft(model, time.monotonic() - start)
+                hedged.served_model = model
+                yield from primary.items
+                yield from self._drain(primary, events)
+                return
+
+            hedge_model = self.hedge_model or model
+            logger.info(f"No token from {model} after {delay:.2f}s, hedging on {hedge_model}")
+            with self._lock:
+                self._stats["hedges"] += 1
+            hedge = _Source(HEDGE, hedge_model, self.generate(requirements, hedge_model), events)
+            sources.append(hedge)
+
+            winner = self._race(primary, hedge, events, start)
+            loser = hedge if winner is primary else primary
+            loser.cancel()
+            with self._lock:
+                self._stats["hedge_wins" if winner is hedge else "primary_wins"] += 1
+            logger.info(f"Hedged request won by {winner.name} ({winner.model})")
+            hedged.served_model = winner.model
+
+            yield from winner.items
+            if not winner.finished:
+                yield from self._drain(winner, events)
+        finally:
+            # Stop any stream still running, e.g. after a client disconnect
+            for running in sources:
+                running.cancel()
+
+    def _race(self, primary: _Source, hedge: _Source, events: queue.Queue, start: float) -> _Source:
+        """Consume both streams until one produces its first token"""
+        sources = (primary, hedge)
+        while True:
+            source, kind, payload = events.get()
+            if kind == _ITEM:
+                source.accept(payload)
+                if source.has_token:
+                    self._record_ttft(source.model, time.monotonic() - start)
+                    return source
+            elif kind == _END:
+                source.finished = True
+            else:
+                source.error = payload
+                source.finished = True
+                logger.warning(f"Hedged {source.name} stream failed: {str(payload)}")
+
+            if all(s.finished for s in sources):
+                # Neither produced a token: prefer a clean finish, primary first
+                for candidate in sources:
+                    if candidate.error is None:
+                        return candidate
+                raise primary.error
+
+    @staticmethod
+    def _drain(source: _Source, events: queue.Queue) -> Iterator:
+        """Yield the live remainder of the winning stream"""
+        while True:
+            event_source, kind, payload = events.get()
+            if event_source is not source:
+                continue
+            if kind == _ITEM:
+                yield payload
+            elif kind == _END:
+                return
+            else:
+                raise payload
+
+    def _record_ttft(self, model: str, ttft: float):
+        with self._lock:
+            samples = self._ttft.get(model)
+            if samples is None:
+                samples = self._ttft[model] = deque(maxlen=self.window_size)
+            samples.append(ttft)
+
+    def get_stats(self) -> Dict[str, float]:
+        """Get hedging counters
+
+        Returns:
+            Dict: Requests, hedges, wins per side and the hedge rate
+        """
+        with self._lock:
+            stats = dict(self._stats)
+        stats["hedge_rate"] = stats["hedges"] / stats["requests"] if stats["requests"] else 0.0
+        stats["hedge_win_rate"] = stats["hedge_wins"] / stats["hedges"] if stats["hedges"] else 0.0
+        return stats
@@ -0,0 +1,523 @@
+from typing import AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+import asyncio
+import contextvars
+import random
+import threading
+import time
+import logging
+from utils.metrics import percentile
+
+logger = logging.getLogger(__name__)
+
+
+class FirstTokenTimeout(Exception):
+    """Raised when a model produces no token within the first-token timeout"""
+
+
+class CallState:
+    """State of one routed attempt, shared with the request scheduler and agent pool
+
+    They report how long the attempt waited for rate-limit quota or a free
+    agent, which does not count toward time-to-first-token, and stop
+    waiting once the router has abandoned the attempt.
+    """
+
+    def __init__(self):
+        self.abandoned = threading.Event()
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._queued_since = 0.0
+        self._queued_total = 0.0
+
+    def queue_started(self):
+        with self._lock:
+            if not self._queued:
+                self._queued_since = time.monotonic()
+            self._queued += 1
+
+    def queue_finished(self):
+        with self._lock:
+            self._queued -= 1
+            if not self._queued:
+                self._queued_total += time.monotonic() - self._queued_since
+
+    def queued_seconds(self) -> float:
+        """Seconds spent waiting for quota or an agent, overlapping waits counted once"""
+        with self._lock:
+            if self._queued:
+                return self._queued_total + time.monotonic() - self._queued_since
+            return self._queued_total
+
+
+_call_state = contextvars.ContextVar("router_call_state", default=None)
+
+
+def current_call() -> Optional[CallState]:
+    """Get the state of the routed attempt making the current call, if any"""
+    return _call_state.get()
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """Check whether an exception is a provider rate-limit (HTTP 429) error
+
+    Args:
+        error: Exception raised by the model client
+
+    Returns:
+        bool: True for rate-limit errors
+    """
+    if "RateLimit" in type(error).__name__:
+        return True
+    if getattr(error, "status_code", None) == 429:
+        return True
+    message = str(error).lower()
+    return "429" in message or "rate limit" in message
+
+
+def read_first_token(stream: Iterator) -> Tuple[List, bool]:
+    """Read a stream up to its first item with content
+
+    Providers may open a stream with empty items (run events, role-only
+    deltas) before any text, so the first item is not the first token.
+
+    Args:
+        stream: Response stream
+
+    Returns:
+        Tuple[List, bool]: Items read, ending with the first token, and
+        whether the stream ended before producing one
+    """
+    items = []
+    for item in stream:
+        items.append(item)
+        if getattr(item, "content", None):
+            return items, False
+    return items, True
+
+
+async def aread_first_token(stream: AsyncIterator) -> Tuple[List, bool]:
+    """Async counterpart of read_first_token()"""
+    items = []
+    async for item in stream:
+        items.append(item)
+        if getattr(item, "content", None):
+            return items, False
+    return items, True
+
+
+class ModelHealth:
+    """Sliding-window time-to-first-token and error statistics for one model"""
+
+    def __init__(self, window_size: int = 50):
+        self.ttft_samples = deque(maxlen=window_size)
+        self.outcomes = deque(maxlen=window_size)
+        self.rate_limited_until = 0.0
+
+    def record_success(self, ttft: float):
+        self.ttft_samples.append(ttft)
+        self.outcomes.append(True)
+
+    def record_error(self):
+        self.outcomes.append(False)
+
+    def p95_ttft(self) -> Optional[float]:
+        return percentile(self.ttft_samples, 0.95)
+
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return self.outcomes.count(False) / len(self.outcomes)
+
+
+class RoutedStream:
+    """Iterator over a routed response that records which model served it"""
+
+    def __init__(self, router: "ModelRouter", requirements: str, model: str):
+        self.requested_model = model
+        self.served_model = None
+        self._generator = router._stream(self, requirements, model)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._generator)
+
+    def close(self):
+        self._generator.close()
+
+
+class AsyncRoutedStream:
+    """Async iterator over a routed response that records which model served it"""
+
+    def __init__(self, router: "ModelRouter", requirements: str, model: str):
+        self.requested_model = model
+        self.served_model = None
+        self._generator = router._astream(self, requirements, model)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        return await self._generator.__anext__()
+
+    async def aclose(self):
+        await self._generator.aclose()
+
+
+class ModelRouter:
+    """Latency-aware routing with retries and failover to a fallback model
+
+    The router watches time-to-first-token (TTFT) and the error rate of every
+    model it calls. A model is considered degraded while its p95 TTFT exceeds
+    the budget, its error rate exceeds the threshold, or it is cooling down
+    after a rate-limit error. Requests for a degraded model go to the fallback
+    model. Failed attempts are retried with jittered exponential backoff,
+    failing over to the fallback model. A stream is only retried before its
+    first token, so callers never see duplicated output.
+    """
+
+    def __init__(self, generate: Callable[[str, str], Iterator], primary: str,
+                 fallback: Optional[str] = None, retry_attempts: int = 3,
+                 ttft_budget: float = 5.0, first_token_timeout: Optional[float] = 10.0,
+                 error_rate_threshold: float = 0.5, min_samples: int = 5,
+                 window_size: int = 50, rate_limit_cooldown: float = 30.0,
+                 backoff_base: float = 0.5, backoff_max: float = 8.0,
+                 agenerate: Optional[Callable[[str, str], AsyncIterator]] = None,
+                 reader_threads: int = 32):
+        """Initialize the router
+
+        Args:
+            generate: Callable (requirements, model_id) returning a response stream
+            primary: Primary model ID
+            fallback: Fallback model ID
+            retry_attempts: Maximum attempts per request
+            ttft_budget: p95 TTFT budget in seconds before a model is degraded
+            first_token_timeout: Seconds to wait for a first token before failing over
+            error_rate_threshold: Error rate above which a model is degraded
+            min_samples: Samples required before p95 and error rate are trusted
+            window_size: Number of recent requests tracked per model
+            rate_limit_cooldown: Seconds a model is avoided after a rate-limit error
+            backoff_base: Base delay for exponential backoff in seconds
+            backoff_max: Maximum backoff delay in seconds
+            agenerate: Optional callable (requirements, model_id) returning an
+                async response stream, used by astream()
+            reader_threads: Threads reading first tokens of sync streams; a
+                read waiting for a thread is not timed
+        """
+        self.generate = generate
+        self.agenerate = agenerate
+        self.primary = primary
+        self.fallback = fallback
+        self.retry_attempts = max(1, retry_attempts)
+        self.ttft_budget = ttft_budget
+        self.first_token_timeout = first_token_timeout
+        self.error_rate_threshold = error_rate_threshold
+        self.min_samples = min_samples
+        self.window_size = window_size
+        self.rate_limit_cooldown = rate_limit_cooldown
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self._lock = threading.Lock()
+        self._health: Dict[str, ModelHealth] = {}
+        self._executor = ThreadPoolExecutor(max_workers=reader_threads, thread_name_prefix="model-router")
+        self._stats = {
+            "requests": 0,
+            "retries": 0,
+            "failovers": 0,
+            "first_token_timeouts": 0,
+            "rate_limit_errors": 0,
+        }
+
+    @classmethod
+    def from_config(cls, generate: Callable[[str, str], Iterator], config: Dict,
+                    agenerate: Optional[Callable[[str, str], AsyncIterator]] = None) -> "ModelRouter":
+        """Build a router from the models, api and routing config sections
+
+        Args:
+            generate: Callable (requirements, model_id) returning a response stream
+            config: Parsed settings.yaml
+            agenerate: Optional callable returning an async response stream
+
+        Returns:
+            ModelRouter: Configured router
+        """
+        models = config.get("models", {})
+        routing = config.get("routing", {})
+        return cls(
+            generate,
+            primary=models.get("primary", "llama-3.3-70b-versatile"),
+            fallback=models.get("fallback"),
+            retry_attempts=config.get("api", {}).get("retry_attempts", 3),
+            ttft_budget=routing.get("ttft_budget_p95_seconds", 5.0),
+            first_token_timeout=routing.get("first_token_timeout_seconds", 10.0),
+            error_rate_threshold=routing.get("error_rate_threshold", 0.5),
+            min_samples=routing.get("min_samples", 5),
+            window_size=routing.get("window_size", 50),
+            rate_limit_cooldown=routing.get("rate_limit_cooldown_seconds", 30.0),
+            backoff_base=routing.get("backoff_base_seconds", 0.5),
+            backoff_max=routing.get("backoff_max_seconds", 8.0),
+            agenerate=agenerate,
+            reader_threads=routing.get("reader_threads", 32),
+        )
+
+    def stream(self, requirements: str, model: Optional[str] = None) -> RoutedStream:
+        """Stream a response, routing around degraded models
+
+        Args:
+            requirements: The requirements text
+            model: Requested model, defaults to the primary model
+
+        Returns:
+            RoutedStream: Response stream; served_model is set once a model answers
+        """
+        return RoutedStream(self, requirements, model or self.primary)
+
+    def _stream(self, routed: RoutedStream, requirements: str, model: str):
+        with self._lock:
+            self._stats["requests"] += 1
+
+        last_error = None
+        failed_models: List[str] = []
+        for attempt in range(self.retry_attempts):
+            candidate, delay = self._begin_attempt(model, attempt, failed_models)
+            if delay:
+                time.sleep(delay)
+
+            start = time.monotonic()
+            state = CallState()
+            # Setup errors (an unknown model) are not the model's fault and are not retried
+            stream = iter(self.generate(requirements, candidate))
+            try:
+                first, finished = self._first_token(stream, state)
+            except Exception as e:
+                last_error = e
+                failed_models.append(candidate)
+                self._record_error(candidate, e)
+                logger.warning(f"Attempt {attempt + 1} on {candidate} failed: {str(e)}")
+                continue
+
+            self._record_success(candidate, start, state)
+            routed.served_model = candidate
+            try:
+                yield from first
+                if not finished:
+                    yield from stream
+            except Exception as e:
+                # Output has already been delivered, so this cannot be retried
+                self._record_error(candidate, e)
+                raise
+
+            # A wrapped stream (e.g. a hedged one) may have been served by another model
+            routed.served_model = getattr(stream, "served_model", None) or candidate
+            return
+
+        raise last_error
+
+    def astream(self, requirements: str, model: Optional[str] = None) -> "AsyncRoutedStream":
+        """Async counterpart of stream(), built on the agenerate callable
+
+        Args:
+            requirements: The requirements text
+            model: Requested model, defaults to the primary model
+
+        Returns:
+            AsyncRoutedStream: Async response stream
+        """
+        if self.agenerate is None:
+            raise RuntimeError("Router was created without an async generate callable")
+        return AsyncRoutedStream(self, requirements, model or self.primary)
+
+    async def _astream(self, routed: "AsyncRoutedStream", requirements: str, model: str):
+        with self._lock:
+            self._stats["requests"] += 1
+
+        last_error = None
+        failed_models: List[str] = []
+        for attempt in range(self.retry_attempts):
+            candidate, delay = self._begin_attempt(model, attempt, failed_models)
+            if delay:
+                await asyncio.sleep(delay)
+
+            start = time.monotonic()
+            state = CallState()
+            # Setup errors are raised as in _stream()
+            stream = self.agenerate(requirements, candidate)
+            try:
+                first, finished = await self._afirst_token(stream, state)
+            except Exception as e:
+                await stream.aclose()
+                last_error = e
+                failed_models.append(candidate)
+                self._record_error(candidate, e)
+                logger.warning(f"Attempt {attempt + 1} on {candidate} failed: {str(e)}")
+                continue
+
+            self._record_success(candidate, start, state)
+            routed.served_model = candidate
+            try:
+                for chunk in first:
+                    yield chunk
+                if not finished:
+                    async for chunk in stream:
+                        yield chunk
+            except Exception as e:
+                self._record_error(candidate, e)
+                raise
+            finally:
+                # Propagate cancellation or disconnects to the upstream request
+                await stream.aclose()
+            return
+
+        raise last_error
+
+    def _begin_attempt(self, model: str, attempt: int, failed_models: List[str]):
+        """Pick the model for an attempt and the backoff delay before it
+
+        Returns:
+            Tuple[str, float]: Candidate model and seconds to wait first
+        """
+        candidate = self._select_model(model, failed_models)
+        if not attempt:
+            if candidate != model:
+                with self._lock:
+                    self._stats["failovers"] += 1
+                logger.warning(f"Model {model} is degraded, routing to {candidate}")
+            return candidate, 0.0
+
+        with self._lock:
+            self._stats["retries"] += 1
+            if candidate != model:
+                self._stats["failovers"] += 1
+        return candidate, self._backoff(attempt)
+
+    def _select_model(self, requested: str, failed_models: List[str]) -> str:
+        """Pick the model for the next attempt"""
+        if not self.fallback or requested == self.fallback:
+            return requested
+        if requested in failed_models or self._is_degraded(requested):
+            return self.fallback
+        return requested
+
+    def _is_degraded(self, model: str) -> bool:
+        health = self._health_for(model)
+        with self._lock:
+            if time.monotonic() < health.rate_limited_until:
+                return True
+            if len(health.outcomes) < self.min_samples:
+                return False
+            p95 = health.p95_ttft()
+            if p95 is not None and p95 > self.ttft_budget:
+                return True
+            return health.error_rate() > self.error_rate_threshold
+
+    def _first_token(self, stream: Iterator, state: CallState) -> Tuple[List, bool]:
+        """Wait for the first token, bounded by the first-token timeout
+
+        Time the call spends queued in the request scheduler, waiting for
+        a pooled agent or waiting for a reader thread extends the timeout,
+        so none of them is a slow model.
+        """
+        # Run in the caller's context so context variables such as the
+        # scheduler priority apply to the upstream call
+        context = contextvars.copy_context()
+        context.run(_call_state.set, state)
+        if not self.first_token_timeout:
+            return context.run(read_first_token, stream)
+
+        started = threading.Event()
+
+        def read():
+            state.queue_finished()
+            started.set()
+            return read_first_token(stream)
+
+        # Until a reader thread picks the read up, it counts as queued; reads
+        # abandoned earlier may hold every thread, so that wait is bounded too
+        state.queue_started()
+        future = self._executor.submit(context.run, read)
+        submitted = time.monotonic()
+        deadline = submitted + self.first_token_timeout
+        while True:
+            try:
+                return future.result(timeout=max(0.0, deadline + state.queued_seconds() - time.monotonic()))
+            except FutureTimeout:
+                if not started.is_set() and time.monotonic() - submitted >= self.first_token_timeout:
+                    if future.cancel():
+                        raise FirstTokenTimeout(f"No reader thread within {self.first_token_timeout}s")
+                elif deadline + state.queued_seconds() > time.monotonic():
+                    continue
+                else:
+                    break
+        # Stop a queued call, and release the stream once its pending read completes
+        state.abandoned.set()
+        future.add_done_callback(lambda _: getattr(stream, "close", lambda: None)())
+        raise FirstTokenTimeout(f"No token within {self.first_token_timeout}s")
+
+    async def _afirst_token(self, stream: AsyncIterator, state: CallState) -> Tuple[List, bool]:
+        """Async counterpart of _first_token()"""
+        context = contextvars.copy_context()
+        context.run(_call_state.set, state)
+        task = asyncio.get_running_loop().create_task(aread_first_token(stream), context=context)
+        deadline = time.monotonic() + self.first_token_timeout if self.first_token_timeout else None
+        try:
+            while True:
+                timeout = None
+                if deadline is not None:
+                    timeout = max(0.0, deadline + state.queued_seconds() - time.monotonic())
+                done, _ = await asyncio.wait({task}, timeout=timeout)
+                if done:
+                    return task.result()
+                if deadline + state.queued_seconds() <= time.monotonic():
+                    raise FirstTokenTimeout(f"No token within {self.first_token_timeout}s")
+        except BaseException:
+            state.abandoned.set()
+            task.cancel()
+            await asyncio.wait({task})
+            raise
+
+    def _record_success(self, model: str, start: float, state: CallState):
+        """Record the TTFT of an attempt, excluding time queued for quota or an agent"""
+        self._health_for(model).record_success(time.monotonic() - start - state.queued_seconds())
+
+    def _record_error(self, model: str, error: Exception):
+        health = self._health_for(model)
+        with self._lock:
+            health.record_error()
+            if isinstance(error, FirstTokenTimeout):
+                self._stats["first_token_timeouts"] += 1
+            elif is_rate_limit_error(error):
+                self._stats["rate_limit_errors"] += 1
+                health.rate_limited_until = time.monotonic() + self.rate_limit_cooldown
+
+    def _backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff delay"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** (attempt - 1))))
+
+    def _health_for(self, model: str) -> ModelHealth:
+        with self._lock:
+            health = self._health.get(model)
+            if health is None:
+                health = self._health[model] = ModelHealth(self.window_size)
+            return health
+
+    def get_stats(self) -> Dict[str, object]:
+        """Get routing counters and per-model health
+
+        Returns:
+            Dict: Counters plus p95 TTFT and error rate per model
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["models"] = {
+                model: {
+                    "p95_ttft": health.p95_ttft(),
+                    "error_rate": health.error_rate(),
+                    "rate_limited": time.monotonic() < health.rate_limited_until,
+                }
+                for model, health in self._health.items()
+            }
+        return stats
@@ -1,10 +1,15 @@
-from typing import Dict, List, Iterator, Optional
+from typing import AsyncIterator, Dict, List, Iterator, Optional, Tuple
 import os
-import yaml
 import logging
 from agno.models.groq import Groq
-from agno.models.anthropic import Claude
 from agno.agent import Agent, RunResponse
+from core.tools import build_tools
+from services.response_cache import get_response_cache
+from services.agent_pool import AgentPool
+from services.request_scheduler import get_request_scheduler, schedule_client
+from utils.async_stream import astream_agent_run
+from utils.config_loader import load_config
+from utils.stream_buffer import ResponseBuffer
 
 logger = logging.getLogger(__name__)
 
@@ -19,8 +24,8 @@ class ModelProviderService:
             config_path: Path to configuration file
         """
         # Load configuration
-        with open(config_path, 'r') as file:
-            self.config = yaml.safe_load(file)
+        self.config_path = config_path
+        self.config = load_config(config_path)
 
         # Get API keys
         self.api_keys = self._load_api_keys()
@@ -55,10 +60,14 @@ class ModelProviderService:
                     api_key=self.api_keys["groq"]
                 )
             }
+            self._share_groq_clients(self.providers["groq"].values())
             logger.info("Initialized Groq provider")
 
         # Initialize Claude provider if API key is available
         if self.api_keys.get("claude"):
+            # Imported only when configured; it pulls in the Anthropic SDK
+            from agno.models.anthropic import Claude
+
             self.providers["claude"] = {
                 "claude-3-opus": Claude(
                     id="claude-3-opus",
@@ -71,6 +80,50 @@ class ModelProviderService:
             }
             logger.info("Initialized Claude provider")
 
+    def _share_groq_clients(self, models):
+        """Point all Groq models at one pair of connection-pooled clients
+
+        By default every model lazily creates its own SDK client and HTTP
+        connection pool. Sharing one sync and one async client keeps
+        connections to the provider alive and bounded across models and
+        requests.
+
+        Args:
+            models: Groq model instances
+        """
+        import httpx
+        from groq import Groq as GroqClient, AsyncGroq as AsyncGroqClient
+
+        api_config = self.config.get("api", {})
+        limits = httpx.Limits(
+            max_connections=api_config.get("max_connections", 100),
+            max_keepalive_connections=api_config.get("max_keepalive_connections", 20)
+        )
+        timeout = api_config.get("timeout", 30)
+
+        client = GroqClient(
+            api_key=self.api_keys["groq"],
+            timeout=timeout,
+            max_retries=0,  # Retries are handled by ModelRouter
+            http_client=httpx.Client(limits=limits, timeout=timeout)
+        )
+        async_client = AsyncGroqClient(
+            api_key=self.api_keys["groq"],
+            timeout=timeout,
+            max_retries=0,
+            http_client=httpx.AsyncClient(limits=limits, timeout=timeout)
+        )
+
+        # Admit every call through the shared per-model quota scheduler
+        scheduler = get_request_scheduler(self.config_path)
+        if scheduler:
+            schedule_client(client, scheduler)
+            schedule_client(async_client, scheduler)
+
+        for model in models:
+            model.client = client
+            model.async_client = async_client
+
     def get_model(self, provider: str, model_id: str):
         """Get model instance by provider and model ID
 
@@ -102,10 +155,28 @@ class ModelProviderService:
 class EnterpriseModelService:
     """Service for managing enterprise AI models and agents"""
 
-    def __init__(self):
-        """Initialize the enterprise model service"""
-        self.provider_service = ModelProviderService()
+    def __init__(self, config_path: str = "config/settings.yaml"):
+        """Initialize the enterprise model service
+
+        Args:
+            config_path: Path to configuration file
+        """
+        self.provider_service = ModelProviderService(config_path)
         self.specialist_templates = self._load_specialist_templates()
+        self.cache = get_response_cache(config_path)
+
+        # Pool of reusable agents keyed by (specialist_type, model_id)
+        pool_config = self.provider_service.config.get("agent_pool", {})
+        self.agent_pool = AgentPool(
+            lambda key: self.create_specialist(*key),
+            max_size=pool_config.get("max_size", 4),
+            idle_timeout=pool_config.get("idle_timeout_seconds", 600)
+        )
+        primary_model = self.provider_service.config.get("models", {}).get(
+            "primary", "llama-3.3-70b-versatile")
+        self.agent_pool.warm_up(
+            [(specialist_type, primary_model) for specialist_type in pool_config.get("warm_up", [])]
+        )
 
     def _load_specialist_templates(self) -> Dict[str, Dict]:
         """Load specialist templates from configuration
@@ -174,13 +245,11 @@ class EnterpriseModelService:
             raise ValueError(f"Model {model_id} not available")
 
         # Create agent
-        from agno.tools.duckduckgo import DuckDuckGoTools
-
         agent = Agent(
             name=template["name"],
             role=template["role"],
             model=model,
-            tools=[DuckDuckGoTools()],
+            tools=build_tools(self.provider_service.config),
             instructions=template["instructions"],
             markdown=True,
         )
@@ -200,9 +269,113 @@ class EnterpriseModelService:
         Returns:
             Iterator: Stream of diagram generation responses
         """
-        # Create specialist
-        specialist = self.create_specialist(specialist_type, model_id)
+        model_id, cache_key, cached = self._prepare_request(requirements, specialist_type, model_id)
+        if cached is not None:
+            return self.cache.replay(cached)
 
         # Generate diagram
-        logger.info(f"Generating diagram with {specialist_type} and model {model_id or 'default'}")
-        return specialist.run(requirements, stream=True)
\ No newline at end of file
+        logger.info(f"Generating diagram with {specialist_type} and model {model_id}")
+        stream = self._run_pooled(requirements, (specialist_type, model_id))
+        if cache_key:
+            return self.cache.record(cache_key, stream)
+        return stream
+
+    def astream(self, requirements: str, specialist_type: str = "diagram_specialist",
+                model_id: str = None) -> AsyncIterator[RunResponse]:
+        """Stream a diagram on the event loop
+
+        Closing the returned iterator (for example when the client
+        disconnects and its task is cancelled) cancels the upstream request.
+
+        Args:
+            requirements: The requirements text
+            specialist_type: Type of specialist to use
+            model_id: Optional model ID override
+
+        Returns:
+            AsyncIterator: Stream of diagram generation responses
+        """
+        model_id, cache_key, cached = self._prepare_request(requirements, specialist_type, model_id)
+        if cached is not None:
+            return self.cache.areplay(cached)
+
+        logger.info(f"Streaming diagram with {specialist_type} and model {model_id}")
+        stream = self._arun_pooled(requirements, (specialist_type, model_id))
+        if cache_key:
+            return self.cache.arecord(cache_key, stream)
+        return stream
+
+    async def agenerate(self, requirements: str, specialist_type: str = "diagram_specialist",
+                        model_id: str = None) -> str:
+        """Generate a complete diagram response on the event loop
+
+        Args:
+            requirements: The requirements text
+            specialist_type: Type of specialist to use
+            model_id: Optional model ID override
+
+        Returns:
+            str: Full response text
+        """
+        buffer = ResponseBuffer()
+        async for response in self.astream(requirements, specialist_type, model_id):
+            if response.content:
+                buffer.append(response.content)
+        return buffer.getvalue()
+
+    def _prepare_request(self, requirements: str, specialist_type: str,
+                         model_id: Optional[str]) -> Tuple[str, Optional[str], Optional[str]]:
+        """Validate a request and look it up in the response cache
+
+        Args:
+            requirements: The requirements text
+            specialist_type: Type of specialist to use
+            model_id: Optional model ID override
+
+        Returns:
+            Tuple: Resolved model ID, cache key (or None) and cached response (or None)
+        """
+        if specialist_type not in self.specialist_templates:
+            logger.error(f"Specialist template {specialist_type} not found")
+            raise ValueError(f"Unknown specialist type: {specialist_type}")
+        model_id = model_id or "llama-3.3-70b-versatile"  # Default model
+
+        # Serve identical requests from the response cache
+        if not self.cache:
+            return model_id, None, None
+        cache_key = self.cache.make_key(
+            requirements,
+            model_id,
+            self.specialist_templates[specialist_type]["instructions"]
+        )
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            logger.info(f"Serving {specialist_type} response from cache")
+        return model_id, cache_key, cached
+
+    def _run_pooled(self, requirements: str, key: tuple) -> Iterator[RunResponse]:
+        """Stream a run on a pooled agent, holding it until the stream ends
+
+        Args:
+            requirements: The requirements text
+            key: Pool key (specialist_type, model_id)
+
+        Returns:
+            Iterator: Stream of diagram generation responses
+        """
+        with self.agent_pool.lease(key) as specialist:
+            yield from specialist.run(requirements, stream=True)
+
+    async def _arun_pooled(self, requirements: str, key: tuple) -> AsyncIterator[RunResponse]:
+        """Async counterpart of _run_pooled
+
+        Args:
+            requirements: The requirements text
+            key: Pool key (specialist_type, model_id)
+
+        Returns:
+            AsyncIterator: Stream of diagram generation responses
+        """
+        async with self.agent_pool.alease(key) as specialist:
+            async for chunk in astream_agent_run(specialist, requirements):
+                yield chunk
@@ -0,0 +1,569 @@
+from typing import Dict, List, Optional
+from collections import deque
+from contextlib import contextmanager
+import asyncio
+import contextvars
+import functools
+import heapq
+import inspect
+import itertools
+import threading
+import time
+import logging
+from services.model_router import current_call
+from utils.config_loader import DEFAULT_CONFIG_PATH, load_config
+from utils.metrics import percentile
+from utils.rate_limiter import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+# Lower values are admitted first
+INTERACTIVE = 0
+BATCH = 10
+
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BATCH: "batch"}
+
+# Rough characters-per-token ratio used to estimate prompt size
+CHARS_PER_TOKEN = 4
+
+# Seconds between checks whether the router abandoned a queued call
+ABANDON_POLL_SECONDS = 0.25
+
+_priority = contextvars.ContextVar("request_priority", default=INTERACTIVE)
+
+
+@contextmanager
+def request_priority(priority: int):
+    """Run LLM calls made inside the with-block at a scheduler priority
+
+    Args:
+        priority: INTERACTIVE, BATCH or another integer; lower runs first
+    """
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the token count of a text
+
+    Args:
+        text: Input text
+
+    Returns:
+        int: Estimated tokens
+    """
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+
+def estimate_prompt_tokens(messages) -> int:
+    """Estimate the prompt tokens of a chat completion request
+
+    Args:
+        messages: Chat messages as dicts or message objects
+
+    Returns:
+        int: Estimated prompt tokens
+    """
+    total = 0
+    for message in messages or ():
+        content = message.get("content") if isinstance(message, dict) else getattr(message, "content", None)
+        # Per-message overhead for role and separators
+        total += 4 + (estimate_tokens(str(content)) if content else 0)
+    return max(1, total)
+
+
+class RateLimitQueueTimeout(Exception):
+    """Raised when a request waits in the scheduler longer than allowed"""
+
+
+class _ModelLimits:
+    """Request and token buckets for one model"""
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float, burst_seconds: float):
+        self.requests = TokenBucket(
+            requests_per_minute / 60.0, max(1.0, requests_per_minute * burst_seconds / 60.0)
+        )
+        self.tokens = TokenBucket(
+            tokens_per_minute / 60.0, max(1.0, tokens_per_minute * burst_seconds / 60.0)
+        )
+
+    def wait_time(self, tokens: int) -> float:
+        return max(self.requests.wait_time(1), self.tokens.wait_time(tokens))
+
+    def take(self, tokens: int):
+        self.requests.try_acquire(1)
+        self.tokens.try_acquire(tokens)
+
+
+class Reservation:
+    """Quota reserved for one model call, settled once actual usage is known"""
+
+    def __init__(self, scheduler: "RequestScheduler", model: str, prompt_tokens: int,
+                 completion_tokens: int, waited: float):
+        self.model = model
+        self.prompt_tokens = prompt_tokens
+        self.completion_tokens = completion_tokens
+        self.waited = waited
+        self.settled = False
+        self._scheduler = scheduler
+
+    @property
+    def reserved_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+    def settle(self, completion_tokens: Optional[int] = None, prompt_tokens: Optional[int] = None):
+        """Correct the token bucket with actual usage
+
+        Args:
+            completion_tokens: Completion tokens used; None keeps the estimate
+            prompt_tokens: Prompt tokens reported by the provider; None keeps the estimate
+        """
+        if self.settled:
+            return
+        self.settled = True
+        actual = (self.prompt_tokens if prompt_tokens is None else prompt_tokens) + \
+            (self.completion_tokens if completion_tokens is None else completion_tokens)
+        self._scheduler._settle(self, actual)
+
+    def cancel(self):
+        """Return the whole reservation, for calls that were never sent"""
+        if self.settled:
+            return
+        self.settled = True
+        self._scheduler._settle(self, 0, refund_request=True)
+
+
+class RequestScheduler:
+    """Process-wide admission control for LLM calls
+
+    Each model has a requests-per-minute and a tokens-per-minute bucket. A
+    call reserves one request plus its estimated prompt and completion
+    tokens before it is sent, and the token reservation is corrected once
+    the provider reports actual usage. Calls that cannot be admitted wait in
+    a per-model queue ordered by priority, then arrival, so interactive work
+    overtakes queued batch work instead of both hitting 429 errors.
+
+    Queue time is reported to the routed attempt making the call, so it is
+    not counted as time-to-first-token. A call the router has abandoned
+    leaves the queue without taking quota.
+    """
+
+    def __init__(self, limits: Dict[str, Dict], default_limits: Optional[Dict] = None,
+                 default_completion_tokens: int = 1024, max_wait: Optional[float] = 60,
+                 burst_seconds: float = 10, window_size: int = 200):
+        """Initialize the scheduler
+
+        Args:
+            limits: Mapping of model ID to requests_per_minute and tokens_per_minute
+            default_limits: Limits for models not listed, None leaves them unlimited
+            default_completion_tokens: Completion tokens reserved when a call sets no max_tokens
+            max_wait: Maximum seconds a call waits for admission, None waits forever
+            burst_seconds: Seconds of quota that may be spent in one burst
+            window_size: Number of recent wait times kept for percentiles
+        """
+        self.limits = limits
+        self.default_limits = default_limits
+        self.default_completion_tokens = default_completion_tokens
+        self.max_wait = max_wait
+        self.burst_seconds = burst_seconds
+
+        self._condition = threading.Condition()
+        self._buckets: Dict[str, Optional[_ModelLimits]] = {}
+        self._queues: Dict[str, List] = {}
+        self._sequence = itertools.count()
+        self._waits = deque(maxlen=window_size)
+        self._stats = {
+            "admitted": 0,
+            "queued": 0,
+            "timeouts": 0,
+            "max_queue_depth": 0,
+            "wait_seconds_total": 0.0,
+            "reserved_tokens": 0,
+            "used_tokens": 0,
+        }
+        self._by_priority: Dict[str, int] = {}
+
+    @classmethod
+    def from_config(cls, config: Dict) -> "RequestScheduler":
+        """Build a scheduler from the scheduler config section
+
+        Args:
+            config: Parsed settings.yaml
+
+        Returns:
+            RequestScheduler: Configured scheduler
+        """
+        scheduler = config.get("scheduler", {})
+        return cls(
+            limits=scheduler.get("limits", {}),
+            default_limits=scheduler.get("default_limits"),
+            default_completion_tokens=scheduler.get("default_completion_tokens", 1024),
+            max_wait=scheduler.get("max_wait_seconds", 60),
+            burst_seconds=scheduler.get("burst_seconds", 10),
+        )
+
+    def _limits_for(self, model: str) -> Optional[_ModelLimits]:
+        """Get the buckets for a model; caller holds the lock"""
+        if model not in self._buckets:
+            limits = self.limits.get(model, self.default_limits)
+            self._buckets[model] = _ModelLimits(
+                limits.get("requests_per_minute", 30),
+                limits.get("tokens_per_minute", 6000),
+                self.burst_seconds
+            ) if limits else None
+        return self._buckets[model]
+
+    def reserve(self, model: str, prompt_tokens: int, completion_tokens: Optional[int] = None,
+                priority: Optional[int] = None, timeout: Optional[float] = -1) -> Reservation:
+        """Wait until a call to a model fits its quota and reserve it
+
+        Args:
+            model: Model ID
+            prompt_tokens: Estimated prompt tokens
+            completion_tokens: Maximum completion tokens, defaults to default_completion_tokens
+            priority: Queue priority, defaults to the request_priority() context
+            timeout: Maximum seconds to wait; defaults to max_wait, None waits forever
+
+        Returns:
+            Reservation: Reserved quota, to be settled after the call
+        """
+        completion_tokens = completion_tokens or self.default_completion_tokens
+        priority = _priority.get() if priority is None else priority
+        timeout = self.max_wait if timeout == -1 else timeout
+        tokens = prompt_tokens + completion_tokens
+        start = time.monotonic()
+        deadline = None if timeout is None else start + timeout
+        call = current_call()
+
+        with self._condition:
+            limits = self._limits_for(model)
+            if limits is None:
+                return self._admit(model, prompt_tokens, completion_tokens, priority, start)
+
+            queue = self._queues.setdefault(model, [])
+            entry = (priority, next(self._sequence))
+            heapq.heappush(queue, entry)
+            self._stats["max_queue_depth"] = max(self._stats["max_queue_depth"], len(queue))
+            queued = False
+            try:
+                while True:
+                    wait = None
+                    if queue[0] == entry:
+                        wait = limits.wait_time(tokens)
+                        if wait == 0:
+                            limits.take(tokens)
+                            heapq.heappop(queue)
+                            self._condition.notify_all()
+                            return self._admit(model, prompt_tokens, completion_tokens, priority, start)
+
+                    if not queued:
+                        queued = True
+                        self._stats["queued"] += 1
+                        if call is not None:
+                            call.queue_started()
+                    if call is not None:
+                        if call.abandoned.is_set():
+                            raise RateLimitQueueTimeout(f"Call to {model} abandoned while queued")
+                        wait = ABANDON_POLL_SECONDS if wait is None else min(wait, ABANDON_POLL_SECONDS)
+                    if deadline is not None:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self._stats["timeouts"] += 1
+                            raise RateLimitQueueTimeout(
+                                f"Waited {time.monotonic() - start:.1f}s for {model} quota"
+                            )
+                        wait = remaining if wait is None else min(wait, remaining)
+                    self._condition.wait(wait)
+            except BaseException:
+                if entry in queue:
+                    queue.remove(entry)
+                    heapq.heapify(queue)
+                    self._condition.notify_all()
+                raise
+            finally:
+                if queued and call is not None:
+                    call.queue_finished()
+
+    def try_reserve(self, model: str, prompt_tokens: int, completion_tokens: Optional[int] = None,
+                    priority: Optional[int] = None) -> Optional[Reservation]:
+        """Reserve a call only if it can be admitted without waiting
+
+        Args:
+            model: Model ID
+            prompt_tokens: Estimated prompt tokens
+            completion_tokens: Maximum completion tokens
+            priority: Queue priority, defaults to the request_priority() context
+
+        Returns:
+            Reservation: Reserved quota, or None if the call would have to queue
+        """
+        completion_tokens = completion_tokens or self.default_completion_tokens
+        priority = _priority.get() if priority is None else priority
+        tokens = prompt_tokens + completion_tokens
+        start = time.monotonic()
+        with self._condition:
+            limits = self._limits_for(model)
+            if limits is not None:
+                if self._queues.get(model) or limits.wait_time(tokens) > 0:
+                    return None
+                limits.take(tokens)
+            return self._admit(model, prompt_tokens, completion_tokens, priority, start)
+
+    async def areserve(self, model: str, prompt_tokens: int, completion_tokens: Optional[int] = None,
+                       priority: Optional[int] = None) -> Reservation:
+        """Async counterpart of reserve() that does not block the event loop
+
+        Args:
+            model: Model ID
+            prompt_tokens: Estimated prompt tokens
+            completion_tokens: Maximum completion tokens
+            priority: Queue priority, defaults to the request_priority() context
+
+        Returns:
+            Reservation: Reserved quota
+        """
+        priority = _priority.get() if priority is None else priority
+        reservation = self.try_reserve(model, prompt_tokens, completion_tokens, priority)
+        if reservation is not None:
+            return reservation
+        # Wait for quota on a worker thread rather than on the loop, in this
+        # context so the routed attempt sees the queue time
+        future = asyncio.get_running_loop().run_in_executor(
+            None, functools.partial(contextvars.copy_context().run, self.reserve,
+                                    model, prompt_tokens, completion_tokens, priority)
+        )
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            # Hand the quota back if the abandoned wait still succeeds
+            future.add_done_callback(
+                lambda done: done.result().cancel()
+                if not done.cancelled() and done.exception() is None else None
+            )
+            raise
+
+    def _admit(self, model: str, prompt_tokens: int, completion_tokens: int,
+               priority: int, start: float) -> Reservation:
+        """Record an admitted call; caller holds the lock"""
+        waited = time.monotonic() - start
+        self._stats["admitted"] += 1
+        self._stats["wait_seconds_total"] += waited
+        self._waits.append(waited)
+        name = PRIORITY_NAMES.get(priority, str(priority))
+        self._by_priority[name] = self._by_priority.get(name, 0) + 1
+        if waited > 0.05:
+            logger.info(f"Admitted {name} call to {model} "
+                        f"after {waited:.2f}s in queue")
+        return Reservation(self, model, prompt_tokens, completion_tokens, waited)
+
+    def _settle(self, reservation: Reservation, actual_tokens: int, refund_request: bool = False):
+        with self._condition:
+            limits = self._buckets.get(reservation.model)
+            if limits is not None:
+                limits.tokens.credit(reservation.reserved_tokens - actual_tokens)
+                if refund_request:
+                    limits.requests.credit(1)
+            self._stats["reserved_tokens"] += reservation.reserved_tokens
+            self._stats["used_tokens"] += actual_tokens
+            # Returned tokens may let the head of the queue in early
+            self._condition.notify_all()
+
+    def get_stats(self) -> Dict[str, float]:
+        """Get queue and wait statistics
+
+        Returns:
+            Dict: Admission counts, queue depth per model and wait percentiles
+        """
+        with self._condition:
+            stats = dict(self._stats)
+            waits = list(self._waits)
+            stats["queue_depth"] = {model: len(queue) for model, queue in self._queues.items() if queue}
+            stats["admitted_by_priority"] = dict(self._by_priority)
+        stats["avg_wait_seconds"] = stats["wait_seconds_total"] / stats["admitted"] if stats["admitted"] else 0.0
+        stats["p95_wait_seconds"] = percentile(waits, 0.95) or 0.0
+        return stats
+
+
+class _ScheduledStream:
+    """Streaming completion that settles its reservation when it ends"""
+
+    def __init__(self, stream, reservation: Reservation):
+        self._stream = stream
+        self._reservation = reservation
+        self._usage = _UsageCounter()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        try:
+            chunk = next(self._stream)
+        except BaseException:
+            self._usage.settle(self._reservation)
+            raise
+        self._usage.observe(chunk)
+        return chunk
+
+    def close(self):
+        self._usage.settle(self._reservation)
+        close = getattr(self._stream, "close", None)
+        if close:
+            close()
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+
+class _AsyncScheduledStream:
+    """Async counterpart of _ScheduledStream"""
+
+    def __init__(self, stream, reservation: Reservation):
+        self._stream = stream
+        self._reservation = reservation
+        self._usage = _UsageCounter()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            chunk = await self._stream.__anext__()
+        except BaseException:
+            self._usage.settle(self._reservation)
+            raise
+        self._usage.observe(chunk)
+        return chunk
+
+    async def close(self):
+        self._usage.settle(self._reservation)
+        close = getattr(self._stream, "close", None)
+        if close:
+            await close()
+
+    aclose = close
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+
+class _UsageCounter:
+    """Track completion usage from streamed chunks"""
+
+    def __init__(self):
+        self.chars = 0
+        self.usage = None
+
+    def observe(self, chunk):
+        for choice in getattr(chunk, "choices", None) or ():
+            content = getattr(getattr(choice, "delta", None), "content", None)
+            if content:
+                self.chars += len(content)
+        # Groq reports usage on the final chunk, under x_groq
+        usage = getattr(chunk, "usage", None) or getattr(getattr(chunk, "x_groq", None), "usage", None)
+        if usage is not None:
+            self.usage = usage
+
+    def settle(self, reservation: Reservation):
+        if self.usage is not None:
+            reservation.settle(
+                completion_tokens=getattr(self.usage, "completion_tokens", None),
+                prompt_tokens=getattr(self.usage, "prompt_tokens", None)
+            )
+        else:
+            reservation.settle(completion_tokens=self.chars // CHARS_PER_TOKEN)
+
+
+def schedule_client(client, scheduler: RequestScheduler):
+    """Route a chat completion client's calls through the scheduler
+
+    Works with both sync and async OpenAI-compatible SDK clients, such as
+    groq.Groq and groq.AsyncGroq.
+
+    Args:
+        client: SDK client exposing chat.completions.create
+        scheduler: Scheduler to admit calls through
+    """
+    completions = client.chat.completions
+    create = completions.create
+
+    def reserve_args(kwargs):
+        return (
+            kwargs.get("model"),
+            estimate_prompt_tokens(kwargs.get("messages")),
+            kwargs.get("max_completion_tokens") or kwargs.get("max_tokens"),
+        )
+
+    def check_abandoned(reservation):
+        """Hand back quota admitted after the router gave up on the call"""
+        call = current_call()
+        if call is not None and call.abandoned.is_set():
+            reservation.cancel()
+            raise RateLimitQueueTimeout(f"Call to {reservation.model} abandoned while queued")
+
+    if inspect.iscoroutinefunction(create):
+        @functools.wraps(create)
+        async def scheduled_create(*args, **kwargs):
+            reservation = await scheduler.areserve(*reserve_args(kwargs))
+            check_abandoned(reservation)
+            try:
+                response = await create(*args, **kwargs)
+            except BaseException:
+                reservation.settle(completion_tokens=0)
+                raise
+            if kwargs.get("stream"):
+                return _AsyncScheduledStream(response, reservation)
+            _settle_response(reservation, response)
+            return response
+    else:
+        @functools.wraps(create)
+        def scheduled_create(*args, **kwargs):
+            reservation = scheduler.reserve(*reserve_args(kwargs))
+            check_abandoned(reservation)
+            try:
+                response = create(*args, **kwargs)
+            except BaseException:
+                reservation.settle(completion_tokens=0)
+                raise
+            if kwargs.get("stream"):
+                return _ScheduledStream(response, reservation)
+            _settle_response(reservation, response)
+            return response
+
+    completions.create = scheduled_create
+
+
+def _settle_response(reservation: Reservation, response):
+    usage = getattr(response, "usage", None)
+    reservation.settle(
+        completion_tokens=getattr(usage, "completion_tokens", None),
+        prompt_tokens=getattr(usage, "prompt_tokens", None)
+    )
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_request_scheduler(config_path: str = DEFAULT_CONFIG_PATH) -> Optional[RequestScheduler]:
+    """Get the process-wide request scheduler configured in settings.yaml
+
+    Args:
+        config_path: Path to configuration file
+
+    Returns:
+        RequestScheduler: Shared scheduler, or None if scheduling is disabled
+    """
+    global _scheduler
+    config = load_config(config_path)
+    if not config.get("scheduler", {}).get("enabled", False):
+        return None
+
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = RequestScheduler.from_config(config)
+                logger.info("Initialized request scheduler")
+    return _scheduler
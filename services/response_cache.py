@@ -0,0 +1,366 @@
+from typing import AsyncIterator, Callable, Dict, Iterator, Optional, Tuple
+from collections import OrderedDict
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import logging
+from utils.config_loader import DEFAULT_CONFIG_PATH, load_config
+from utils.diagram_parser import parse_mermaid_response
+
+logger = logging.getLogger(__name__)
+
+# Characters per synthetic chunk when replaying a cached response
+REPLAY_CHUNK_SIZE = 64
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Normalize requirement text for cache keying
+
+    Args:
+        prompt: Raw requirement text
+
+    Returns:
+        str: Case-folded text with collapsed whitespace
+    """
+    return " ".join(prompt.split()).casefold()
+
+
+def replay_response(response: str) -> Iterator:
+    """Replay a cached response as a synthetic stream
+
+    Args:
+        response: Cached response text
+
+    Returns:
+        Iterator[RunResponse]: Stream of response chunks
+    """
+    from agno.agent import RunResponse
+
+    for start in range(0, len(response), REPLAY_CHUNK_SIZE):
+        yield RunResponse(content=response[start:start + REPLAY_CHUNK_SIZE])
+
+
+async def areplay_response(response: str) -> AsyncIterator:
+    """Async counterpart of replay_response()
+
+    Args:
+        response: Cached response text
+
+    Returns:
+        AsyncIterator[RunResponse]: Stream of response chunks
+    """
+    for chunk in replay_response(response):
+        yield chunk
+
+
+class _DiskTier:
+    """SQLite-backed cache tier with TTL and size-bounded LRU eviction"""
+
+    def __init__(self, db_path: str, ttl_seconds: float, max_bytes: int):
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " response TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses (accessed_at)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[Tuple[str, float]]:
+        """Look up a response as (response, created_at)"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if now - row[1] > self.ttl_seconds:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute(
+                "UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key)
+            )
+            self._conn.commit()
+            return row[0], row[1]
+
+    def put(self, key: str, response: str) -> int:
+        """Store a response and return the number of evicted entries"""
+        now = time.time()
+        size = len(response.encode("utf-8"))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, response, size, created_at, accessed_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (key, response, size, now, now)
+            )
+            evicted = self._evict(now)
+            self._conn.commit()
+        return evicted
+
+    def _evict(self, now: float) -> int:
+        evicted = self._conn.execute(
+            "DELETE FROM responses WHERE created_at < ?", (now - self.ttl_seconds,)
+        ).rowcount
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return evicted
+
+        # Drop least recently used entries until the tier fits its budget
+        for key, size in self._conn.execute(
+                "SELECT key, size FROM responses ORDER BY accessed_at").fetchall():
+            if total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+            evicted += 1
+        return evicted
+
+
+class ResponseCache:
+    """Content-addressed cache of complete model responses
+
+    Entries are keyed on the normalized prompt, model ID and a hash of the
+    agent instructions. Lookups go through an in-memory LRU tier first and an
+    optional SQLite tier second. Hits are replayed as a synthetic stream so
+    callers consume them exactly like a live ``agent.run(..., stream=True)``.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl_seconds: float = 86400,
+                 db_path: Optional[str] = None, max_disk_bytes: int = 50 * 1024 * 1024):
+        """Initialize the cache
+
+        Args:
+            max_entries: Maximum entries in the in-memory tier
+            ttl_seconds: Time to live for cached responses
+            db_path: Optional SQLite file for the on-disk tier
+            max_disk_bytes: Maximum total response size in the on-disk tier
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._disk = _DiskTier(db_path, ttl_seconds, max_disk_bytes) if db_path else None
+        self._stats = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "evictions": 0,
+        }
+
+    @staticmethod
+    def make_key(prompt: str, model_id: str, instructions: str = "") -> str:
+        """Build a cache key
+
+        Args:
+            prompt: Requirement text
+            model_id: Model ID
+            instructions: Agent instructions
+
+        Returns:
+            str: Hex digest identifying the request
+        """
+        instructions_hash = hashlib.sha256(instructions.encode("utf-8")).hexdigest()
+        material = "\x1f".join([normalize_prompt(prompt), model_id or "", instructions_hash])
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Look up a cached response
+
+        Args:
+            key: Cache key from make_key
+
+        Returns:
+            str: Cached response text, or None on a miss
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry and now - entry[1] <= self.ttl_seconds:
+                self._memory.move_to_end(key)
+                self._stats["memory_hits"] += 1
+                return entry[0]
+            if entry:
+                del self._memory[key]
+
+        row = self._disk.get(key) if self._disk else None
+
+        with self._lock:
+            if row is None:
+                self._stats["misses"] += 1
+                return None
+            self._stats["disk_hits"] += 1
+            # Promote with the disk row's age, so the entry still expires on time
+            response, created_at = row
+            self._put_memory(key, response, created_at)
+        return response
+
+    def put(self, key: str, response: str):
+        """Store a complete response
+
+        Responses without a Mermaid diagram are failed or garbled
+        generations and are not stored, so they are never replayed.
+
+        Args:
+            key: Cache key from make_key
+            response: Full response text
+        """
+        if not response or not parse_mermaid_response(response)[0]:
+            logger.info("Not caching a response without a Mermaid diagram")
+            return
+        with self._lock:
+            self._put_memory(key, response, time.time())
+            self._stats["stores"] += 1
+
+        if self._disk:
+            evicted = self._disk.put(key, response)
+            if evicted:
+                with self._lock:
+                    self._stats["evictions"] += evicted
+
+    def _put_memory(self, key: str, response: str, created_at: float):
+        """Insert into the memory tier; caller holds the lock"""
+        self._memory[key] = (response, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def replay(self, response: str) -> Iterator:
+        """Replay a cached response as a synthetic stream
+
+        Args:
+            response: Cached response text
+
+        Returns:
+            Iterator[RunResponse]: Stream of response chunks
+        """
+        return replay_response(response)
+
+    def record(self, key: str, stream: Iterator,
+               should_store: Optional[Callable[[], bool]] = None) -> Iterator:
+        """Pass a live stream through, caching it once it completes
+
+        Partial streams (errors or early disconnects) and responses without
+        a Mermaid diagram are not cached.
+
+        Args:
+            key: Cache key from make_key
+            stream: Live response stream
+            should_store: Optional check, evaluated after completion, that
+                decides whether the response belongs under this key
+
+        Returns:
+            Iterator: The same stream items
+        """
+        chunks = []
+        for response in stream:
+            if response.content:
+                chunks.append(response.content)
+            yield response
+        if should_store is None or should_store():
+            self.put(key, "".join(chunks))
+
+    def areplay(self, response: str) -> AsyncIterator:
+        """Async counterpart of replay()
+
+        Args:
+            response: Cached response text
+
+        Returns:
+            AsyncIterator[RunResponse]: Stream of response chunks
+        """
+        return areplay_response(response)
+
+    async def arecord(self, key: str, stream: AsyncIterator,
+                      should_store: Optional[Callable[[], bool]] = None) -> AsyncIterator:
+        """Async counterpart of record()
+
+        Args:
+            key: Cache key from make_key
+            stream: Live async response stream
+            should_store: Optional check evaluated after completion
+
+        Returns:
+            AsyncIterator: The same stream items
+        """
+        chunks = []
+        async for response in stream:
+            if response.content:
+                chunks.append(response.content)
+            yield response
+        if should_store is None or should_store():
+            self.put(key, "".join(chunks))
+
+    def get_stats(self) -> Dict[str, float]:
+        """Get hit/miss statistics
+
+        Returns:
+            Dict: Tier hits, misses, stores, evictions and hit rate
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["memory_entries"] = len(self._memory)
+
+        hits = stats["memory_hits"] + stats["disk_hits"]
+        lookups = hits + stats["misses"]
+        stats["hit_rate"] = hits / lookups if lookups else 0.0
+        return stats
+
+
+_caches: Dict[tuple, ResponseCache] = {}
+_cache_lock = threading.Lock()
+
+
+def get_response_cache(config_path: str = DEFAULT_CONFIG_PATH) -> Optional[ResponseCache]:
+    """Get the process-wide response cache configured in settings.yaml
+
+    Caches are shared per cache settings, so editing them in settings.yaml
+    takes effect on the next call while unchanged settings keep their
+    warm cache.
+
+    Args:
+        config_path: Path to configuration file
+
+    Returns:
+        ResponseCache: Shared cache, or None if caching is disabled
+    """
+    cache_config = load_config(config_path).get("cache", {})
+    if not cache_config.get("enabled", False):
+        return None
+
+    key = (
+        cache_config.get("memory_entries", 256),
+        cache_config.get("ttl_seconds", 86400),
+        cache_config.get("disk_path") or None,
+        cache_config.get("disk_max_bytes", 50 * 1024 * 1024),
+    )
+    cache = _caches.get(key)
+    if cache is None:
+        with _cache_lock:
+            cache = _caches.get(key)
+            if cache is None:
+                cache = _caches[key] = ResponseCache(
+                    max_entries=key[0],
+                    ttl_seconds=key[1],
+                    db_path=key[2],
+                    max_disk_bytes=key[3]
+                )
+                logger.info("Initialized response cache")
+    return cache
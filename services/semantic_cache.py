@@ -0,0 +1,593 @@
+from typing import AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple
+import hashlib
+import os
+import re
+import threading
+import time
+import logging
+import numpy as np
+from services.response_cache import normalize_prompt
+from utils.diagram_parser import response_spans
+from utils.config_loader import DEFAULT_CONFIG_PATH, load_config
+from utils.metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+
+# Words that carry no meaning when comparing requirements; negations are kept.
+# Matched before and after stemming
+STOP_WORDS = frozenset(
+    "a an the and or of for to in on at by with from into onto toward towards via using use that this these "
+    "those is are be it its as i we you our my me please create design build make show draw generate give "
+    "need want diagram architecture system flow each every built based made composed consisting consist "
+    "include including contain containing featuring having has have".split()
+)
+
+# Words that give a requirement a direction: the nearest content words on
+# each side form an ordered relation, so "Oracle to PostgreSQL" never
+# answers "PostgreSQL to Oracle". Matched before stemming
+DIRECTION_WORDS = frozenset(
+    "to into onto toward towards call calls calling send sends sending sent publish publishes publishing "
+    "write writes writing push pushes pushing forward forwards forwarding notify notifies notifying "
+    "invoke invokes invoking".split()
+)
+
+# Architecture vocabulary that paraphrases use interchangeably, mapped to one word
+SYNONYMS = {
+    "step": "stage", "phase": "stage",
+    "etl": "data", "elt": "data",
+    "db": "database", "datastore": "database",
+    "microservice": "service", "app": "application",
+    "k8s": "kubernetes", "auth": "authentication", "authn": "authentication",
+    "ecommerce": "commerce", "ecom": "commerce", "shop": "store", "storefront": "store",
+    "mq": "queue", "broker": "queue",
+    "fulfilment": "fulfillment", "catalogue": "catalog",
+}
+
+# Prefixes written both hyphenated and as a separate word; "multi region",
+# "multi-region" and "multiregion" become one word
+COMPOUND_PREFIXES = frozenset("multi real event e micro cross single".split())
+
+# Lookups whose best match is this far below the threshold count as near misses
+NEAR_MISS_MARGIN = 0.1
+
+# A stored entry at least this similar is treated as the same request
+DUPLICATE_SIMILARITY = 0.999
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_HYPHEN = re.compile(r"(?<=[a-z])-(?=[a-z])")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+
+
+def _stem(word: str) -> str:
+    """Strip common English inflections so plural, tense and noun forms match
+
+    "validation", "validates" and "validating" all become "valid".
+    """
+    word = SYNONYMS.get(word, word)
+    if len(word) > 4 and word.endswith("ies"):
+        word = word[:-3] + "y"
+    elif len(word) > 4 and word.endswith("sses"):
+        word = word[:-2]
+    elif len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        word = word[:-1]
+    elif len(word) > 7 and word.endswith("ating"):
+        word = word[:-5]
+    elif len(word) > 5 and word.endswith("ing"):
+        word = word[:-3]
+    elif len(word) > 6 and word.endswith("ated"):
+        word = word[:-4]
+    elif len(word) > 4 and word.endswith("ed"):
+        word = word[:-2]
+    if len(word) > 8 and word.endswith("ation"):
+        word = word[:-5]
+    elif len(word) > 6 and word.endswith("ate"):
+        word = word[:-3]
+    return SYNONYMS.get(word, word)
+
+
+def _analyze(text: str) -> Tuple[List[str], List[str]]:
+    """Content words and direction relations of a text, in order"""
+    # "e-commerce" and "ecommerce", "real-time" and "realtime" become one word
+    text = _HYPHEN.sub("", normalize_prompt(text))
+    raw = _TOKEN.findall(text)
+    tokens: List[str] = []
+    index = 0
+    while index < len(raw):
+        word = raw[index]
+        following = raw[index + 1] if index + 1 < len(raw) else None
+        if word in COMPOUND_PREFIXES and following and following not in STOP_WORDS:
+            word += following
+            index += 1
+        tokens.append(word)
+        index += 1
+
+    # Direction verbs are content words too, but never an end of a relation
+    words: List[str] = []
+    sequence: List[str] = []
+    for word in tokens:
+        stem = _stem(word)
+        content = word not in STOP_WORDS and stem not in STOP_WORDS
+        if content:
+            words.append(stem)
+        if word in DIRECTION_WORDS:
+            sequence.append(">")
+        elif content:
+            sequence.append(stem)
+
+    relations = []
+    for index, item in enumerate(sequence):
+        if item != ">":
+            continue
+        before = next((w for w in reversed(sequence[:index]) if w != ">"), None)
+        after = next((w for w in sequence[index + 1:] if w != ">" and w != before), None)
+        if before and after:
+            relations.append(f"{before}>{after}")
+    return words, relations
+
+
+def content_words(text: str) -> List[str]:
+    """Stemmed words of a text that carry meaning, in order
+
+    Args:
+        text: Requirement text
+
+    Returns:
+        List[str]: Words with stop words dropped and synonyms folded
+    """
+    return _analyze(text)[0]
+
+
+def direction_relations(text: str) -> List[str]:
+    """Ordered relations a text states, such as "oracle>postgresql"
+
+    Args:
+        text: Requirement text
+
+    Returns:
+        List[str]: "source>target" pairs around each direction word
+    """
+    return _analyze(text)[1]
+
+
+class HashingEmbedder:
+    """Local, CPU-only text embedding using the hashing trick
+
+    Content words (stemmed, with synonyms folded), word bigrams and character
+    trigrams are hashed into a fixed number of signed buckets and the vector
+    is L2-normalized, so cosine similarity is a single dot product. There is
+    no model to download, and requirements that share most of their
+    vocabulary land close together.
+    """
+
+    def __init__(self, dimensions: int = 1024, bigram_weight: float = 0.5, trigram_weight: float = 0.25):
+        """Initialize the embedder
+
+        Args:
+            dimensions: Length of the embedding vectors
+            bigram_weight: Weight of word bigrams relative to single words
+            trigram_weight: Weight of character trigrams, which match
+                spelling variants and compound words
+        """
+        self.dimensions = dimensions
+        self.bigram_weight = bigram_weight
+        self.trigram_weight = trigram_weight
+
+    def features(self, text: str) -> Dict[str, float]:
+        """Extract weighted features of a text
+
+        Args:
+            text: Requirement text
+
+        Returns:
+            Dict[str, float]: Feature to weight
+        """
+        words = content_words(text)
+        features: Dict[str, float] = {}
+        for word in words:
+            features["w:" + word] = features.get("w:" + word, 0.0) + 1.0
+            padded = f"^{word}$"
+            for i in range(len(padded) - 2):
+                trigram = "c:" + padded[i:i + 3]
+                features[trigram] = features.get(trigram, 0.0) + self.trigram_weight
+        for first, second in zip(words, words[1:]):
+            bigram = f"b:{first} {second}"
+            features[bigram] = features.get(bigram, 0.0) + self.bigram_weight
+        return features
+
+    def embed(self, text: str) -> np.ndarray:
+        """Embed a text
+
+        Args:
+            text: Requirement text
+
+        Returns:
+            np.ndarray: Unit-length float32 vector, all zeros for empty text
+        """
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        for feature, weight in self.features(text).items():
+            # A stable hash, so vectors stored by one process match lookups from another
+            digest = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+            sign = 1.0 if digest & 1 else -1.0
+            vector[(digest >> 1) % self.dimensions] += sign * weight
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm else vector
+
+
+class NumpyVectorIndex:
+    """In-process vector index with exact cosine search
+
+    Vectors live in one preallocated matrix, so a lookup is a single
+    matrix-vector product over the entries of the namespace. Expired entries
+    are reused first when the index is full, then the least recently used.
+    """
+
+    def __init__(self, dimensions: int, max_entries: int = 1024, ttl_seconds: float = 86400):
+        """Initialize the index
+
+        Args:
+            dimensions: Embedding length
+            max_entries: Maximum stored entries
+            ttl_seconds: Time to live for entries
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._vectors = np.zeros((max_entries, dimensions), dtype=np.float32)
+        self._namespaces = np.full(max_entries, -1, dtype=np.int64)
+        self._created = np.zeros(max_entries)
+        self._accessed = np.zeros(max_entries)
+        self._responses: List[Optional[str]] = [None] * max_entries
+        self._namespace_ids: Dict[str, int] = {}
+
+    def search(self, namespace: str, vector: np.ndarray) -> Optional[Tuple[int, float, str]]:
+        """Find the nearest live entry in a namespace
+
+        Args:
+            namespace: Namespace from SemanticCache.make_namespace
+            vector: Unit-length query vector
+
+        Returns:
+            Tuple[int, float, str]: Entry ID, cosine similarity and response,
+            or None if the namespace has no live entries
+        """
+        now = time.time()
+        with self._lock:
+            namespace_id = self._namespace_ids.get(namespace)
+            if namespace_id is None:
+                return None
+            rows = np.flatnonzero((self._namespaces == namespace_id) & (self._created >= now - self.ttl_seconds))
+            if not rows.size:
+                return None
+            scores = self._vectors[rows] @ vector
+            best = int(np.argmax(scores))
+            return int(rows[best]), float(scores[best]), self._responses[rows[best]]
+
+    def touch(self, entry_id: int):
+        """Mark an entry as recently used"""
+        with self._lock:
+            self._accessed[entry_id] = time.time()
+
+    def add(self, namespace: str, vector: np.ndarray, response: str) -> int:
+        """Store an entry
+
+        Args:
+            namespace: Namespace from SemanticCache.make_namespace
+            vector: Unit-length vector
+            response: Response text
+
+        Returns:
+            int: Number of entries evicted to make room
+        """
+        now = time.time()
+        with self._lock:
+            namespace_id = self._namespace_ids.setdefault(namespace, len(self._namespace_ids))
+            free = np.flatnonzero(self._namespaces == -1)
+            evicted = 0
+            if free.size:
+                row = int(free[0])
+            else:
+                expired = np.flatnonzero(self._created < now - self.ttl_seconds)
+                row = int(expired[0]) if expired.size else int(np.argmin(self._accessed))
+                evicted = 1
+
+            self._vectors[row] = vector
+            self._namespaces[row] = namespace_id
+            self._created[row] = now
+            self._accessed[row] = now
+            self._responses[row] = response
+        return evicted
+
+    def __len__(self):
+        with self._lock:
+            return int(np.count_nonzero(self._namespaces != -1))
+
+
+class PgVectorIndex:
+    """Vector index in PostgreSQL with the pgvector extension
+
+    Entries are shared by every worker and survive restarts. Search uses
+    the cosine distance operator with an HNSW index.
+    """
+
+    def __init__(self, dsn: str, dimensions: int, max_entries: int = 100000,
+                 ttl_seconds: float = 86400, table: str = "semantic_cache"):
+        """Connect and create the table if needed
+
+        Args:
+            dsn: PostgreSQL connection string
+            dimensions: Embedding length
+            max_entries: Maximum stored entries
+            ttl_seconds: Time to live for entries
+            table: Table name
+        """
+        # Optional dependencies, only needed for this backend
+        import psycopg
+        from pgvector.psycopg import register_vector
+
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.table = table
+        self._lock = threading.Lock()
+        self._conn = psycopg.connect(dsn, autocommit=True)
+        self._conn.execute("CREATE EXTENSION IF NOT EXISTS vector")
+        register_vector(self._conn)
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            " id BIGSERIAL PRIMARY KEY,"
+            " namespace TEXT NOT NULL,"
+            f" embedding vector({dimensions}) NOT NULL,"
+            " response TEXT NOT NULL,"
+            " created_at DOUBLE PRECISION NOT NULL,"
+            " accessed_at DOUBLE PRECISION NOT NULL)"
+        )
+        self._conn.execute(
+            f"CREATE INDEX IF NOT EXISTS idx_{table}_embedding ON {table}"
+            " USING hnsw (embedding vector_cosine_ops)"
+        )
+        self._conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_accessed ON {table} (accessed_at)")
+
+    def search(self, namespace: str, vector: np.ndarray) -> Optional[Tuple[int, float, str]]:
+        """Find the nearest live entry in a namespace, as NumpyVectorIndex.search"""
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT id, 1 - (embedding <=> %s) AS similarity, response FROM {self.table}"
+                " WHERE namespace = %s AND created_at >= %s"
+                " ORDER BY embedding <=> %s LIMIT 1",
+                (vector, namespace, time.time() - self.ttl_seconds, vector)
+            ).fetchone()
+        return (row[0], float(row[1]), row[2]) if row else None
+
+    def touch(self, entry_id: int):
+        """Mark an entry as recently used"""
+        with self._lock:
+            self._conn.execute(f"UPDATE {self.table} SET accessed_at = %s WHERE id = %s", (time.time(), entry_id))
+
+    def add(self, namespace: str, vector: np.ndarray, response: str) -> int:
+        """Store an entry and return the number of evicted entries"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                f"INSERT INTO {self.table} (namespace, embedding, response, created_at, accessed_at)"
+                " VALUES (%s, %s, %s, %s, %s)",
+                (namespace, vector, response, now, now)
+            )
+            evicted = self._conn.execute(
+                f"DELETE FROM {self.table} WHERE created_at < %s", (now - self.ttl_seconds,)
+            ).rowcount
+            evicted += self._conn.execute(
+                f"DELETE FROM {self.table} WHERE id IN ("
+                f" SELECT id FROM {self.table} ORDER BY accessed_at DESC OFFSET %s)",
+                (self.max_entries,)
+            ).rowcount
+        return evicted
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+
+
+class SemanticCache:
+    """Cache of model responses for near-duplicate requirements
+
+    The exact-match ResponseCache misses paraphrases such as "ETL pipeline
+    with validation stages" and "data pipeline with validation steps". This
+    cache embeds the requirement text and serves the stored response of the
+    nearest previous request when the cosine similarity reaches the
+    threshold. Entries are partitioned by model, instructions, the numbers
+    in the text, its set of content words and the direction of the relations
+    it states, so "3 regions" never matches "5 regions", a long prompt with
+    one word swapped ("AWS" for "Azure") is a miss however similar the
+    vectors are, and so is "Oracle to PostgreSQL" for "PostgreSQL to Oracle".
+    """
+
+    def __init__(self, index, embedder: HashingEmbedder, threshold: float = 0.9):
+        """Initialize the cache
+
+        Args:
+            index: NumpyVectorIndex or PgVectorIndex
+            embedder: Text embedder matching the index dimensions
+            threshold: Minimum cosine similarity for a hit
+        """
+        self.index = index
+        self.embedder = embedder
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "near_misses": 0, "stores": 0, "evictions": 0}
+        self._hit_similarity = 0.0
+        # Best similarity of each lookup in 0.05 buckets, for tuning the threshold
+        self._histogram = [0] * 20
+
+    @staticmethod
+    def make_namespace(prompt: str, model_id: str, instructions: str = "") -> str:
+        """Build the partition key of a request
+
+        Args:
+            prompt: Requirement text
+            model_id: Model ID
+            instructions: Agent instructions
+
+        Returns:
+            str: Hex digest shared by requests that may answer each other
+        """
+        numbers = " ".join(sorted(_NUMBER.findall(prompt)))
+        words, relations = _analyze(prompt)
+        words = " ".join(sorted(set(words)))
+        relations = " ".join(sorted(set(relations)))
+        instructions_hash = hashlib.sha256(instructions.encode("utf-8")).hexdigest()
+        material = "\x1f".join([model_id or "", instructions_hash, numbers, words, relations])
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def lookup(self, prompt: str, model_id: str, instructions: str = "") -> Optional[str]:
+        """Find the response of a near-duplicate request
+
+        Args:
+            prompt: Requirement text
+            model_id: Model ID
+            instructions: Agent instructions
+
+        Returns:
+            str: Cached response text, or None on a miss
+        """
+        vector = self.embedder.embed(prompt)
+        if not vector.any():
+            return None
+        match = self.index.search(self.make_namespace(prompt, model_id, instructions), vector)
+        similarity = match[1] if match else 0.0
+        get_metrics().observe("semantic_cache_similarity", similarity, labels={"model": model_id})
+
+        with self._lock:
+            self._histogram[min(int(max(similarity, 0.0) * 20), 19)] += 1
+            if match is None or similarity < self.threshold:
+                self._stats["misses"] += 1
+                if similarity >= self.threshold - NEAR_MISS_MARGIN:
+                    self._stats["near_misses"] += 1
+                return None
+            self._stats["hits"] += 1
+            self._hit_similarity += similarity
+
+        self.index.touch(match[0])
+        logger.info(f"Semantic cache hit with similarity {similarity:.3f}")
+        return match[2]
+
+    def store(self, prompt: str, model_id: str, instructions: str, response: str):
+        """Store a complete response that contains a diagram
+
+        A response without one (a refusal, a question back to the user) is
+        not worth serving to other requests.
+
+        Args:
+            prompt: Requirement text
+            model_id: Model ID
+            instructions: Agent instructions
+            response: Full response text
+        """
+        if not response or not any(response[start:end].strip() for start, end in response_spans(response)[0]):
+            return
+        vector = self.embedder.embed(prompt)
+        if not vector.any():
+            return
+        namespace = self.make_namespace(prompt, model_id, instructions)
+        # Concurrent misses on the same request should not fill the index with copies
+        match = self.index.search(namespace, vector)
+        if match and match[1] >= DUPLICATE_SIMILARITY:
+            return
+        evicted = self.index.add(namespace, vector, response)
+        with self._lock:
+            self._stats["stores"] += 1
+            self._stats["evictions"] += evicted
+
+    def record(self, prompt: str, model_id: str, instructions: str, stream: Iterator,
+               should_store: Optional[Callable[[], bool]] = None) -> Iterator:
+        """Pass a live stream through, storing it once it completes
+
+        Args:
+            prompt: Requirement text
+            model_id: Model ID
+            instructions: Agent instructions
+            stream: Live response stream
+            should_store: Optional check evaluated after completion
+
+        Returns:
+            Iterator: The same stream items
+        """
+        chunks = []
+        for response in stream:
+            if response.content:
+                chunks.append(response.content)
+            yield response
+        if should_store is None or should_store():
+            self.store(prompt, model_id, instructions, "".join(chunks))
+
+    async def arecord(self, prompt: str, model_id: str, instructions: str, stream: AsyncIterator,
+                      should_store: Optional[Callable[[], bool]] = None) -> AsyncIterator:
+        """Async counterpart of record()"""
+        chunks = []
+        async for response in stream:
+            if response.content:
+                chunks.append(response.content)
+            yield response
+        if should_store is None or should_store():
+            self.store(prompt, model_id, instructions, "".join(chunks))
+
+    def get_stats(self) -> Dict[str, float]:
+        """Get hit/miss statistics
+
+        Returns:
+            Dict: Hits, misses, near misses, stores, evictions, hit rate,
+            average hit similarity, threshold and the similarity histogram
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["avg_hit_similarity"] = self._hit_similarity / stats["hits"] if stats["hits"] else 0.0
+            stats["similarity_histogram"] = {f"{i / 20:.2f}": count for i, count in enumerate(self._histogram) if count}
+
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        stats["threshold"] = self.threshold
+        stats["entries"] = len(self.index)
+        return stats
+
+
+_semantic_cache = None
+_semantic_cache_lock = threading.Lock()
+
+
+def get_semantic_cache(config_path: str = DEFAULT_CONFIG_PATH) -> Optional[SemanticCache]:
+    """Get the process-wide semantic cache configured in settings.yaml
+
+    The pgvector backend is used when configured and reachable; otherwise
+    the cache falls back to the in-process NumPy index.
+
+    Args:
+        config_path: Path to configuration file
+
+    Returns:
+        SemanticCache: Shared cache, or None if semantic caching is disabled
+    """
+    global _semantic_cache
+    cache_config = load_config(config_path).get("cache", {})
+    semantic_config = cache_config.get("semantic", {})
+    if not cache_config.get("enabled", False) or not semantic_config.get("enabled", False):
+        return None
+
+    if _semantic_cache is None:
+        with _semantic_cache_lock:
+            if _semantic_cache is None:
+                embedder = HashingEmbedder(dimensions=semantic_config.get("dimensions", 1024))
+                ttl_seconds = semantic_config.get("ttl_seconds", cache_config.get("ttl_seconds", 86400))
+                index = None
+                dsn = semantic_config.get("pgvector_dsn") or os.getenv("SEMANTIC_CACHE_DSN")
+                if semantic_config.get("backend", "numpy") == "pgvector" and dsn:
+                    try:
+                        index = PgVectorIndex(dsn, embedder.dimensions,
+                                              max_entries=semantic_config.get("max_entries", 1024),
+                                              ttl_seconds=ttl_seconds)
+                    except Exception as e:
+                        logger.warning(f"pgvector index unavailable, using the in-process index: {str(e)}")
+                if index is None:
+                    index = NumpyVectorIndex(embedder.dimensions,
+                                             max_entries=semantic_config.get("max_entries", 1024),
+                                             ttl_seconds=ttl_seconds)
+                _semantic_cache = SemanticCache(index, embedder, threshold=semantic_config.get("threshold", 0.9))
+                logger.info(f"Initialized semantic cache with {type(index).__name__}")
+    return _semantic_cache
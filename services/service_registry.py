@@ -0,0 +1,180 @@
+from typing import Dict, Optional
+import threading
+import time
+import logging
+from utils.config_loader import DEFAULT_CONFIG_PATH, get_config_mtime
+from utils.metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+
+
+class _RegistryEntry:
+    """A constructed service together with the config version it was built from"""
+
+    __slots__ = ("service", "config_mtime", "build_seconds")
+
+    def __init__(self, service, config_mtime: float, build_seconds: float):
+        self.service = service
+        self.config_mtime = config_mtime
+        self.build_seconds = build_seconds
+
+
+class ServiceRegistry:
+    """Process-wide, thread-safe registry of long-lived generation services
+
+    Services (and the agents, HTTP clients and parsed configuration they hold)
+    are shared across Streamlit reruns and sessions. An entry is rebuilt only
+    when the configuration file changes on disk. Model selection is a
+    per-request parameter of the service, so one entry serves every model.
+    """
+
+    def __init__(self):
+        """Initialize an empty registry"""
+        self._lock = threading.Lock()
+        self._build_locks: Dict[tuple, threading.Lock] = {}
+        self._entries: Dict[tuple, _RegistryEntry] = {}
+        self._prewarming: Dict[tuple, threading.Thread] = {}
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "invalidations": 0,
+            "build_seconds_total": 0.0,
+            "last_build_seconds": 0.0,
+        }
+
+    def get_diagram_service(self, config_path: str = DEFAULT_CONFIG_PATH):
+        """Get a shared diagram generation service
+
+        Args:
+            config_path: Path to configuration file
+
+        Returns:
+            DiagramGenerationService: Shared service instance
+        """
+        from services.diagram_service import DiagramGenerationService
+
+        return self._get_or_build(
+            ("diagram", config_path),
+            config_path,
+            lambda: DiagramGenerationService(config_path=config_path)
+        )
+
+    def prewarm_diagram_service(self, config_path: str = DEFAULT_CONFIG_PATH) -> Optional[threading.Thread]:
+        """Build the diagram service on a background thread
+
+        Lets a UI paint or a server start accepting connections before the
+        heavy model, agent and tool imports have run. Later calls to
+        get_diagram_service() wait for the build in progress instead of
+        starting another one.
+
+        Args:
+            config_path: Path to configuration file
+
+        Returns:
+            threading.Thread: The prewarm thread, or None if one already ran
+        """
+        key = ("diagram", config_path)
+        with self._lock:
+            if key in self._prewarming or key in self._entries:
+                return None
+            thread = threading.Thread(
+                target=self._prewarm,
+                args=(config_path,),
+                name="service-prewarm",
+                daemon=True
+            )
+            self._prewarming[key] = thread
+        thread.start()
+        return thread
+
+    def _prewarm(self, config_path: str):
+        try:
+            self.get_diagram_service(config_path)
+        except Exception as e:
+            # The first request will retry the build and surface the error
+            logger.warning(f"Prewarming diagram service failed: {str(e)}")
+
+    def _get_or_build(self, key: tuple, config_path: str, factory):
+        """Return the cached service for key, building it if missing or stale
+
+        Args:
+            key: Registry key
+            config_path: Configuration file the service depends on
+            factory: Callable constructing the service
+
+        Returns:
+            The cached or newly constructed service
+        """
+        config_mtime = get_config_mtime(config_path)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry.config_mtime == config_mtime:
+                self._stats["hits"] += 1
+                return entry.service
+            build_lock = self._build_locks.setdefault(key, threading.Lock())
+
+        # Serialize construction per key so concurrent sessions build only once
+        with build_lock:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry and entry.config_mtime == config_mtime:
+                    self._stats["hits"] += 1
+                    return entry.service
+                if entry:
+                    self._stats["invalidations"] += 1
+                    logger.info(f"Configuration changed, rebuilding service {key}")
+
+            start = time.perf_counter()
+            service = factory()
+            build_seconds = time.perf_counter() - start
+
+            with self._lock:
+                self._entries[key] = _RegistryEntry(service, config_mtime, build_seconds)
+                self._stats["misses"] += 1
+                self._stats["build_seconds_total"] += build_seconds
+                self._stats["last_build_seconds"] = build_seconds
+
+        get_metrics().observe("service_build_seconds", build_seconds, {"service": key[0]})
+        logger.info(f"Built service {key} in {build_seconds * 1000:.1f} ms")
+        return service
+
+    def clear(self):
+        """Drop all cached services"""
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict[str, float]:
+        """Get registry hit and construction statistics
+
+        Returns:
+            Dict: Hits, misses, invalidations, hit rate and build timings
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        stats["avg_build_seconds"] = (
+            stats["build_seconds_total"] / stats["misses"] if stats["misses"] else 0.0
+        )
+        return stats
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_service_registry() -> ServiceRegistry:
+    """Get the process-wide service registry
+
+    Returns:
+        ServiceRegistry: Shared registry instance
+    """
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ServiceRegistry()
+    return _registry
@@ -0,0 +1,331 @@
+from typing import Dict, List, Optional, Tuple
+from collections import OrderedDict
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+import logging
+from utils.config_loader import DEFAULT_CONFIG_PATH, load_config
+from utils.diagram_parser import response_spans
+
+logger = logging.getLogger(__name__)
+
+# Characters of the prompt kept uncompressed as the title of a generation
+TITLE_LENGTH = 80
+
+
+class Generation:
+    """Read-only view of one stored generation
+
+    The prompt and response are decompressed once per view; the diagram and
+    explanation are sliced from the response by their stored offsets.
+    """
+
+    def __init__(self, generation_id: int, created_at: float, blob: bytes, meta: Dict):
+        self.id = generation_id
+        self.created_at = created_at
+        self.title = meta["title"]
+        self.timings = meta.get("timings") or {}
+        self._blob = blob
+        self._meta = meta
+        self._text: Optional[str] = None
+
+    @property
+    def text(self) -> str:
+        if self._text is None:
+            self._text = zlib.decompress(self._blob).decode("utf-8")
+        return self._text
+
+    @property
+    def prompt(self) -> str:
+        return self.text[:self._meta["prompt_length"]]
+
+    @property
+    def response(self) -> str:
+        start = self._meta["prompt_length"]
+        return self.text[start:start + self._meta["response_length"]]
+
+    @property
+    def diagram(self) -> Optional[str]:
+        """The validated diagram: a span of the response, or the repaired code"""
+        if self._meta.get("repaired"):
+            return self.text[self._meta["prompt_length"] + self._meta["response_length"]:]
+        span = self._meta.get("diagram")
+        return self.response[span[0]:span[1]].strip() if span else None
+
+    @property
+    def explanation(self) -> str:
+        response = self.response
+        return "".join(response[start:end] for start, end in self._meta["explanation"]).strip()
+
+
+class SessionSpillStore:
+    """SQLite store for generations spilled out of session memory
+
+    Shared by all sessions of the process. Entries expire after a TTL and
+    the oldest are dropped when the file exceeds its size budget.
+    """
+
+    def __init__(self, db_path: str, ttl_seconds: float = 86400, max_bytes: int = 50 * 1024 * 1024):
+        """Open or create the store
+
+        Args:
+            db_path: SQLite file
+            ttl_seconds: Time to live for spilled generations
+            max_bytes: Maximum total size of stored generations
+        """
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS generations ("
+            " session_id TEXT NOT NULL,"
+            " id INTEGER NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " blob BLOB NOT NULL,"
+            " meta TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " PRIMARY KEY (session_id, id))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_generations_created ON generations (created_at)")
+        self._conn.commit()
+
+    def put(self, session_id: str, generation_id: int, created_at: float, blob: bytes, meta: str) -> int:
+        """Store a generation and return the number of evicted entries"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO generations (session_id, id, created_at, blob, meta, size)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (session_id, generation_id, created_at, blob, meta, len(blob) + len(meta))
+            )
+            evicted = self._evict()
+            self._conn.commit()
+        return evicted
+
+    def get(self, session_id: str, generation_id: int) -> Optional[Tuple[float, bytes, str]]:
+        """Load a generation as (created_at, blob, meta)"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT created_at, blob, meta FROM generations WHERE session_id = ? AND id = ?",
+                (session_id, generation_id)
+            ).fetchone()
+
+    def list(self, session_id: str) -> List[Tuple[int, float, str]]:
+        """List a session's generations as (id, created_at, meta), newest first"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT id, created_at, meta FROM generations WHERE session_id = ? ORDER BY id DESC",
+                (session_id,)
+            ).fetchall()
+
+    def _evict(self) -> int:
+        evicted = self._conn.execute(
+            "DELETE FROM generations WHERE created_at < ?", (time.time() - self.ttl_seconds,)
+        ).rowcount
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM generations").fetchone()[0]
+        if total <= self.max_bytes:
+            return evicted
+
+        # Drop the oldest generations until the store fits its budget
+        for session_id, generation_id, size in self._conn.execute(
+                "SELECT session_id, id, size FROM generations ORDER BY created_at").fetchall():
+            if total <= self.max_bytes:
+                break
+            self._conn.execute(
+                "DELETE FROM generations WHERE session_id = ? AND id = ?", (session_id, generation_id)
+            )
+            total -= size
+            evicted += 1
+        return evicted
+
+
+class SessionStore:
+    """Compact, bounded store of one session's generations
+
+    Each generation keeps one canonical copy of its text: the prompt and
+    the response, zlib-compressed together. The diagram and explanation are
+    offsets into the response, so they cost no extra copies; only a diagram
+    changed by repair is stored alongside. The current generation is also
+    held decompressed for reruns. When the compressed history exceeds the
+    memory cap, the oldest generations move to the spill store, or are
+    dropped if there is none.
+    """
+
+    def __init__(self, session_id: str, spill: Optional[SessionSpillStore] = None,
+                 max_memory_bytes: int = 256 * 1024, compression_level: int = 6):
+        """Initialize the store
+
+        Args:
+            session_id: Unique ID of the session
+            spill: Optional shared store for generations over the memory cap
+            max_memory_bytes: Compressed bytes of history kept in memory
+            compression_level: zlib compression level
+        """
+        self.session_id = session_id
+        self.spill = spill
+        self.max_memory_bytes = max_memory_bytes
+        self.compression_level = compression_level
+        self._entries: "OrderedDict[int, Tuple[float, bytes, str]]" = OrderedDict()
+        self._memory_bytes = 0
+        self._next_id = 1
+        self._current: Optional[Generation] = None
+        self._stats = {"generations": 0, "spilled": 0, "dropped": 0, "raw_bytes": 0, "stored_bytes": 0}
+
+    @property
+    def current(self) -> Optional[Generation]:
+        """The latest generation, or None before the first"""
+        return self._current
+
+    def add(self, prompt: str, response: str, diagram_code: Optional[str] = None,
+            timings: Optional[Dict[str, float]] = None) -> Generation:
+        """Store a completed generation and make it current
+
+        Args:
+            prompt: Requirement text
+            response: Full model response
+            diagram_code: Validated diagram shown to the user, if any
+            timings: Optional stage timings
+
+        Returns:
+            Generation: View of the stored generation
+        """
+        code_spans, explanation_spans = response_spans(response)
+        diagram_span = code_spans[0] if code_spans else None
+        meta = {
+            "title": " ".join(prompt.split())[:TITLE_LENGTH],
+            "prompt_length": len(prompt),
+            "response_length": len(response),
+            "diagram": diagram_span,
+            "explanation": explanation_spans,
+            "timings": timings or {},
+        }
+
+        # Repair may change the diagram; only then is it stored next to the response
+        text = prompt + response
+        if diagram_code is not None and (
+                diagram_span is None or response[diagram_span[0]:diagram_span[1]].strip() != diagram_code):
+            meta["repaired"] = True
+            text += diagram_code
+        elif diagram_code is None:
+            meta["diagram"] = None
+
+        encoded = text.encode("utf-8")
+        blob = zlib.compress(encoded, self.compression_level)
+        meta_json = json.dumps(meta, separators=(",", ":"))
+        generation_id = self._next_id
+        self._next_id += 1
+        created_at = time.time()
+
+        self._entries[generation_id] = (created_at, blob, meta_json)
+        self._memory_bytes += len(blob) + len(meta_json)
+        self._stats["generations"] += 1
+        self._stats["raw_bytes"] += len(encoded)
+        self._stats["stored_bytes"] += len(blob)
+        self._enforce_cap()
+
+        self._current = Generation(generation_id, created_at, blob, meta)
+        self._current.text  # Decompress once now; reruns reuse it
+        return self._current
+
+    def get(self, generation_id: int) -> Optional[Generation]:
+        """Load a generation from memory or the spill store
+
+        Args:
+            generation_id: ID of the generation
+
+        Returns:
+            Generation: View of the generation, or None if it is gone
+        """
+        if self._current and self._current.id == generation_id:
+            return self._current
+        entry = self._entries.get(generation_id)
+        if entry is None and self.spill:
+            entry = self.spill.get(self.session_id, generation_id)
+        if entry is None:
+            return None
+        created_at, blob, meta_json = entry
+        return Generation(generation_id, created_at, blob, json.loads(meta_json))
+
+    def list_generations(self) -> List[Tuple[int, float, str]]:
+        """List the session's generations without decompressing them
+
+        Returns:
+            List[Tuple[int, float, str]]: (id, created_at, title), newest first
+        """
+        listed = {generation_id: (created_at, json.loads(meta)["title"])
+                  for generation_id, (created_at, _, meta) in self._entries.items()}
+        if self.spill:
+            for generation_id, created_at, meta in self.spill.list(self.session_id):
+                listed.setdefault(generation_id, (created_at, json.loads(meta)["title"]))
+        return [(generation_id, created_at, title)
+                for generation_id, (created_at, title) in sorted(listed.items(), reverse=True)]
+
+    def _enforce_cap(self):
+        """Move the oldest generations out of memory until history fits the cap"""
+        while self._memory_bytes > self.max_memory_bytes and len(self._entries) > 1:
+            generation_id, (created_at, blob, meta_json) = self._entries.popitem(last=False)
+            self._memory_bytes -= len(blob) + len(meta_json)
+            if self.spill:
+                self.spill.put(self.session_id, generation_id, created_at, blob, meta_json)
+                self._stats["spilled"] += 1
+            else:
+                self._stats["dropped"] += 1
+
+    def get_stats(self) -> Dict[str, float]:
+        """Get memory and compression statistics
+
+        Returns:
+            Dict: Generations stored, spilled and dropped, generations and
+            bytes held in memory, and the compression ratio
+        """
+        stats = dict(self._stats)
+        stats["memory_entries"] = len(self._entries)
+        stats["memory_bytes"] = self._memory_bytes
+        stats["compression_ratio"] = stats["raw_bytes"] / stats["stored_bytes"] if stats["stored_bytes"] else 0.0
+        return stats
+
+
+_spill_store = None
+_spill_store_lock = threading.Lock()
+
+
+def create_session_store(session_id: str, config_path: str = DEFAULT_CONFIG_PATH) -> SessionStore:
+    """Create a session store configured in settings.yaml
+
+    Sessions share one process-wide spill store; without a spill path,
+    generations over the memory cap are dropped.
+
+    Args:
+        session_id: Unique ID of the session
+        config_path: Path to configuration file
+
+    Returns:
+        SessionStore: Store for the session
+    """
+    global _spill_store
+    store_config = load_config(config_path).get("ui", {}).get("session_store", {})
+    spill_path = store_config.get("spill_path")
+
+    if spill_path and _spill_store is None:
+        with _spill_store_lock:
+            if _spill_store is None:
+                _spill_store = SessionSpillStore(
+                    spill_path,
+                    ttl_seconds=store_config.get("spill_ttl_seconds", 86400),
+                    max_bytes=store_config.get("spill_max_bytes", 50 * 1024 * 1024)
+                )
+                logger.info("Initialized session spill store")
+
+    return SessionStore(
+        session_id,
+        spill=_spill_store if spill_path else None,
+        max_memory_bytes=store_config.get("max_memory_bytes", 256 * 1024),
+        compression_level=store_config.get("compression_level", 6)
+    )
@@ -0,0 +1,262 @@
+from typing import AsyncIterator, Callable, Dict, Iterator, Optional
+import asyncio
+import contextvars
+import threading
+import logging
+from utils.metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+
+
+class _Flight:
+    """One upstream response shared by every identical in-flight request"""
+
+    def __init__(self, key: str, upstream):
+        self.key = key
+        self.upstream = upstream
+        self.items = []
+        self.finished = False
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+        self.cancelled = False
+        # Sync flights wait on the condition; async flights on an event renewed per item
+        self.condition = threading.Condition()
+        self.changed: Optional[asyncio.Event] = None
+        self.task: Optional[asyncio.Task] = None
+
+
+class CoalescedStream:
+    """Iterator over a shared flight that records which model served it"""
+
+    def __init__(self, generator: Iterator, flight: _Flight, leader: bool):
+        self.leader = leader
+        self._flight = flight
+        self._generator = generator
+
+    @property
+    def served_model(self) -> Optional[str]:
+        return getattr(self._flight.upstream, "served_model", None)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._generator)
+
+    def close(self):
+        self._generator.close()
+
+
+class AsyncCoalescedStream:
+    """Async counterpart of CoalescedStream"""
+
+    def __init__(self, generator: AsyncIterator, flight: _Flight, leader: bool):
+        self.leader = leader
+        self._flight = flight
+        self._generator = generator
+
+    @property
+    def served_model(self) -> Optional[str]:
+        return getattr(self._flight.upstream, "served_model", None)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        return await self._generator.__anext__()
+
+    async def aclose(self):
+        await self._generator.aclose()
+
+
+class StreamCoalescer:
+    """Single-flight coalescing of identical in-flight generation requests
+
+    The first request for a key starts the upstream stream, which a pump
+    thread (or, for async callers, a task on the event loop) reads into a
+    shared buffer. Identical requests arriving while it runs attach as
+    subscribers: they receive the buffered prefix, then the live items, so N
+    concurrent identical requests cost one upstream call. The upstream is
+    cancelled once every subscriber has gone, and a finished flight is
+    forgotten, leaving later repeats to the response cache.
+    """
+
+    def __init__(self):
+        """Initialize the coalescer"""
+        self._lock = threading.Lock()
+        self._flights: Dict[str, _Flight] = {}
+        self._aflights: Dict[tuple, _Flight] = {}
+        self._stats = {"flights": 0, "joins": 0, "cancelled": 0, "max_subscribers": 0}
+
+    def stream(self, key: str, start: Callable[[], Iterator]) -> CoalescedStream:
+        """Attach to the in-flight response for a key, starting it if needed
+
+        Args:
+            key: Request key, e.g. ResponseCache.make_key of prompt, model and instructions
+            start: Callable returning the upstream stream; only called by the first request
+
+        Returns:
+            CoalescedStream: Stream of the shared response items
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight(key, start())
+                self._stats["flights"] += 1
+            self._attach(flight, leader)
+
+        if leader:
+            # Copy the context, so request priority and metrics labels reach the upstream
+            context = contextvars.copy_context()
+            threading.Thread(
+                target=context.run, args=(self._pump, flight), name="coalesce-pump", daemon=True
+            ).start()
+        return CoalescedStream(self._subscribe(flight), flight, leader)
+
+    def astream(self, key: str, start: Callable[[], AsyncIterator]) -> AsyncCoalescedStream:
+        """Async counterpart of stream(); must be called on the event loop
+
+        Args:
+            key: Request key
+            start: Callable returning the upstream async stream
+
+        Returns:
+            AsyncCoalescedStream: Async stream of the shared response items
+        """
+        loop_key = (id(asyncio.get_running_loop()), key)
+        with self._lock:
+            flight = self._aflights.get(loop_key)
+            leader = flight is None
+            if leader:
+                flight = self._aflights[loop_key] = _Flight(loop_key, start())
+                flight.changed = asyncio.Event()
+                self._stats["flights"] += 1
+            self._attach(flight, leader)
+
+        if leader:
+            flight.task = asyncio.get_running_loop().create_task(self._apump(flight))
+        return AsyncCoalescedStream(self._asubscribe(flight), flight, leader)
+
+    def _attach(self, flight: _Flight, leader: bool):
+        """Count a subscriber; caller holds the lock"""
+        flight.subscribers += 1
+        self._stats["max_subscribers"] = max(self._stats["max_subscribers"], flight.subscribers)
+        if not leader:
+            self._stats["joins"] += 1
+            get_metrics().increment("generation_coalesced")
+            logger.info(f"Joined in-flight generation with {flight.subscribers - 1} other requests")
+
+    def _detach(self, flight: _Flight, flights: Dict) -> bool:
+        """Drop a subscriber and return True if the flight should be cancelled"""
+        with self._lock:
+            flight.subscribers -= 1
+            if flight.subscribers or flight.finished:
+                return False
+            flight.cancelled = True
+            if flights.get(flight.key) is flight:
+                del flights[flight.key]
+            self._stats["cancelled"] += 1
+        return True
+
+    def _finish(self, flight: _Flight, flights: Dict):
+        # Forget the flight before marking it finished, so new requests start their own
+        with self._lock:
+            if flights.get(flight.key) is flight:
+                del flights[flight.key]
+
+    def _pump(self, flight: _Flight):
+        """Read the upstream into the flight buffer on a background thread"""
+        try:
+            for item in flight.upstream:
+                with flight.condition:
+                    if flight.cancelled:
+                        break
+                    flight.items.append(item)
+                    flight.condition.notify_all()
+        except Exception as e:
+            flight.error = e
+        finally:
+            close = getattr(flight.upstream, "close", None)
+            if close:
+                close()
+            self._finish(flight, self._flights)
+            with flight.condition:
+                flight.finished = True
+                flight.condition.notify_all()
+
+    def _subscribe(self, flight: _Flight) -> Iterator:
+        """Yield the buffered prefix, then live items, of a flight"""
+        index = 0
+        try:
+            while True:
+                with flight.condition:
+                    while index >= len(flight.items) and not flight.finished:
+                        flight.condition.wait()
+                    items = flight.items[index:]
+                    finished = flight.finished
+                index += len(items)
+                yield from items
+                if finished:
+                    break
+            if flight.error is not None:
+                raise flight.error
+        finally:
+            self._detach(flight, self._flights)
+
+    async def _apump(self, flight: _Flight):
+        """Async counterpart of _pump, run as a task on the event loop"""
+        try:
+            async for item in flight.upstream:
+                flight.items.append(item)
+                self._notify(flight)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            flight.error = e
+        finally:
+            aclose = getattr(flight.upstream, "aclose", None)
+            if aclose:
+                await aclose()
+            self._finish(flight, self._aflights)
+            flight.finished = True
+            self._notify(flight)
+
+    @staticmethod
+    def _notify(flight: _Flight):
+        changed, flight.changed = flight.changed, asyncio.Event()
+        changed.set()
+
+    async def _asubscribe(self, flight: _Flight) -> AsyncIterator:
+        """Async counterpart of _subscribe"""
+        index = 0
+        try:
+            while True:
+                while index >= len(flight.items) and not flight.finished:
+                    await flight.changed.wait()
+                items = flight.items[index:]
+                finished = flight.finished
+                index += len(items)
+                for item in items:
+                    yield item
+                if finished:
+                    break
+            if flight.error is not None:
+                raise flight.error
+        finally:
+            if self._detach(flight, self._aflights) and flight.task:
+                flight.task.cancel()
+
+    def get_stats(self) -> Dict[str, int]:
+        """Get coalescing statistics
+
+        Returns:
+            Dict: Upstream flights, joined requests, cancelled flights,
+            the largest subscriber count and the flights now running
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["active"] = len(self._flights) + len(self._aflights)
+        requests = stats["flights"] + stats["joins"]
+        stats["coalesced_rate"] = stats["joins"] / requests if requests else 0.0
+        return stats
@@ -0,0 +1,129 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from services.agent_pool import AgentPool, AgentPoolExhausted
+
+
+class FakeAgent:
+    def __init__(self, key):
+        self.key = key
+        self.thread = threading.current_thread()
+
+
+def test_sync_checkout_waits_at_max_size():
+    pool = AgentPool(FakeAgent, max_size=1)
+    pool.checkout("k")
+    with pytest.raises(AgentPoolExhausted):
+        pool.checkout("k", timeout=0.05)
+
+
+def test_async_checkouts_are_not_bounded_by_max_size():
+    pool = AgentPool(FakeAgent, max_size=2)
+
+    async def run(hold):
+        async with pool.alease("k") as agent:
+            await asyncio.sleep(hold)
+            return agent
+
+    async def main():
+        return await asyncio.wait_for(asyncio.gather(*(run(0.1) for _ in range(6))), timeout=2)
+
+    agents = asyncio.run(main())
+    assert len({id(agent) for agent in agents}) == 6
+    # Overflow agents are dropped on checkin, so the pool shrinks back to max_size
+    stats = pool.get_stats()
+    assert stats["size"] == 2
+    assert stats["idle"] == 2
+
+
+def test_async_checkout_builds_agents_off_the_event_loop():
+    pool = AgentPool(FakeAgent, max_size=1)
+
+    async def main():
+        loop_thread = threading.current_thread()
+        agent = await pool.acheckout("k")
+        return agent, loop_thread
+
+    agent, loop_thread = asyncio.run(main())
+    assert agent.thread is not loop_thread
+
+
+def test_async_checkout_reuses_idle_agents():
+    pool = AgentPool(FakeAgent, max_size=1)
+    pool.warm_up(["k"])
+
+    async def main():
+        async with pool.alease("k") as agent:
+            return agent
+
+    asyncio.run(main())
+    assert pool.get_stats()["reuses"] == 1
+
+
+def test_cancelled_async_checkout_returns_the_agent():
+    def slow_factory(key):
+        time.sleep(0.1)
+        return FakeAgent(key)
+
+    pool = AgentPool(slow_factory, max_size=1)
+
+    async def main():
+        task = asyncio.ensure_future(pool.acheckout("k"))
+        await asyncio.sleep(0.02)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        await asyncio.sleep(0.2)
+
+    asyncio.run(main())
+    stats = pool.get_stats()
+    assert stats["size"] == 1
+    assert stats["idle"] == 1
+
+
+def test_waiting_for_a_pooled_agent_is_not_time_to_first_token():
+    from types import SimpleNamespace
+    from services.model_router import ModelRouter
+
+    pool = AgentPool(FakeAgent, max_size=2)
+
+    def generate(requirements, model):
+        with pool.lease(model):
+            yield SimpleNamespace(content="graph TD")
+            time.sleep(0.4)
+            yield SimpleNamespace(content="\n    A --> B")
+
+    router = ModelRouter(generate, primary="big", retry_attempts=1, first_token_timeout=0.3)
+    results = []
+
+    def run():
+        results.append("".join(item.content for item in router.stream("req")))
+
+    threads = [threading.Thread(target=run) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == ["graph TD\n    A --> B"] * 5
+    assert router.get_stats()["first_token_timeouts"] == 0
+    assert max(router._health["big"].ttft_samples) < 0.3
+
+
+def test_abandoned_checkout_stops_waiting():
+    import contextvars
+    from services.model_router import CallState, _call_state
+
+    pool = AgentPool(FakeAgent, max_size=1)
+    pool.checkout("k")
+    state = CallState()
+    state.abandoned.set()
+    context = contextvars.copy_context()
+    context.run(_call_state.set, state)
+    start = time.monotonic()
+    with pytest.raises(AgentPoolExhausted):
+        context.run(pool.checkout, "k")
+    assert time.monotonic() - start < 0.5
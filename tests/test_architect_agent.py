@@ -0,0 +1,16 @@
+import pytest
+
+pytest.importorskip("agno")
+pytest.importorskip("groq")
+
+from core.architect_agent import DiagramSpecialist
+
+
+def test_standalone_agent_is_created_on_first_access(monkeypatch):
+    monkeypatch.setenv("GROQ_API_KEY", "test")
+    specialist = DiagramSpecialist()
+    assert specialist._agent is None
+
+    agent = specialist.agent
+    assert agent is specialist.agent
+    assert specialist.agent_pool.get_stats()["creations"] == 0
@@ -0,0 +1,46 @@
+import json
+import logging
+
+import pytest
+
+pytest.importorskip("dotenv")
+
+from batch import load_checkpoint, read_jobs
+
+
+def test_read_jobs_skips_lines_that_are_not_objects(tmp_path, caplog):
+    source = tmp_path / "jobs.jsonl"
+    lines = [
+        json.dumps({"id": "etl", "requirements": "ETL pipeline"}),
+        json.dumps(["not", "an", "object"]),
+        json.dumps("just a string"),
+        "42",
+        "null",
+        json.dumps({"requirements": 7}),
+        json.dumps({"requirements": "Order processing"}),
+    ]
+    source.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+    with caplog.at_level(logging.WARNING):
+        jobs = list(read_jobs(str(source)))
+
+    assert jobs == [("etl", "ETL pipeline"), ("7", "Order processing")]
+    skipped = [record for record in caplog.records if "expected a JSON object" in record.getMessage()]
+    assert len(skipped) == 4
+    assert all(record.levelno == logging.WARNING for record in caplog.records)
+
+
+def test_load_checkpoint_skips_lines_that_are_not_objects(tmp_path):
+    output = tmp_path / "results.jsonl"
+    lines = [
+        json.dumps({"id": "etl", "status": "ok"}),
+        json.dumps({"id": "crm", "status": "error"}),
+        json.dumps(["etl", "ok"]),
+        "42",
+        "null",
+        json.dumps({"id": 7, "status": "ok"}),
+        '{"id": "torn", "sta',
+    ]
+    output.write_text("\n".join(lines), encoding="utf-8")
+
+    assert load_checkpoint(str(output)) == {"etl", "7"}
@@ -0,0 +1,67 @@
+import sqlite3
+
+from services.diagram_history import DiagramHistory
+
+
+def test_entries_are_scoped_to_their_owner(tmp_path):
+    history = DiagramHistory(str(tmp_path / "history.db"))
+    alice = history.add("user:alice", "Kafka pipeline for orders", "model", "graph TD\n    A --> B")
+    history.add("user:bob", "Kafka pipeline for payments", "model", "graph TD\n    C --> D")
+
+    page, _ = history.list_page("user:alice")
+    assert [summary.id for summary in page] == [alice]
+    page, _ = history.list_page("user:bob", "kafka")
+    assert [summary.title for summary in page] == ["Kafka pipeline for payments"]
+
+    assert history.get("user:alice", alice).diagram == "graph TD\n    A --> B"
+    assert history.get("user:bob", alice) is None
+
+
+def test_search_without_full_text_is_scoped_too(tmp_path):
+    history = DiagramHistory(str(tmp_path / "history.db"))
+    history.full_text = False
+    history.add("session:1", "Kafka pipeline", "model", "graph TD")
+    assert history.list_page("session:2", "kafka")[0] == []
+    assert len(history.list_page("session:1", "kafka")[0]) == 1
+
+
+def test_entries_from_before_owners_are_hidden(tmp_path):
+    path = str(tmp_path / "history.db")
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE diagrams (id INTEGER PRIMARY KEY AUTOINCREMENT, created_at REAL NOT NULL,"
+        " model TEXT NOT NULL, title TEXT NOT NULL, prompt TEXT NOT NULL, diagram TEXT NOT NULL,"
+        " explanation TEXT NOT NULL, timings TEXT NOT NULL)"
+    )
+    conn.execute("INSERT INTO diagrams (created_at, model, title, prompt, diagram, explanation, timings)"
+                 " VALUES (0, 'model', 'old', 'old', 'graph TD', '', '{}')")
+    conn.commit()
+    conn.close()
+
+    history = DiagramHistory(path)
+    assert history.list_page("user:alice")[0] == []
+    history.add("user:alice", "new", "model", "graph TD")
+    assert [summary.title for summary in history.list_page("user:alice")[0]] == ["new"]
+
+
+def test_owner_tokens_are_random_and_validated():
+    from services.diagram_history import is_owner_token, new_owner_token
+
+    token = new_owner_token()
+    assert is_owner_token(token)
+    assert token != new_owner_token()
+    assert not is_owner_token(None)
+    assert not is_owner_token("short")
+    assert not is_owner_token("x" * 30 + "'; DROP TABLE")
+
+
+def test_entries_are_capped_per_owner(tmp_path):
+    history = DiagramHistory(str(tmp_path / "history.db"), max_entries=3)
+    history.add("user:bob", "bob's design", "model", "graph TD")
+    for index in range(10):
+        history.add("user:alice", f"design {index}", "model", "graph TD")
+
+    assert [summary.title for summary in history.list_page("user:alice")[0]] == [
+        "design 9", "design 8", "design 7"]
+    assert len(history.list_page("user:bob")[0]) == 1
+    assert history.list_page("user:alice", "design")[0][-1].title == "design 7"
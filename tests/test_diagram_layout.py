@@ -0,0 +1,53 @@
+from utils import diagram_layout
+from utils.diagram_layout import LAYOUT_CACHE_ENTRIES, get_diagram_layout
+
+
+def flowchart(nodes, prefix="S"):
+    return "graph LR\n" + "\n".join(f"    {prefix}{i - 1} --> {prefix}{i}" for i in range(1, nodes))
+
+
+def test_layout_is_shared_and_reused():
+    code = flowchart(60)
+    layout = get_diagram_layout(code, 10)
+    assert layout is not None
+    assert get_diagram_layout(code, 10) is layout
+    assert get_diagram_layout(code, 20) is not layout
+
+
+def test_small_diagram_has_no_layout():
+    assert get_diagram_layout(flowchart(3), 10) is None
+
+
+def test_layout_cache_is_bounded():
+    for index in range(LAYOUT_CACHE_ENTRIES + 5):
+        get_diagram_layout(flowchart(30, prefix=f"N{index}_"), 10)
+    assert len(diagram_layout._layouts) == LAYOUT_CACHE_ENTRIES
+    # Keys hold a digest, not the code
+    assert all(len(key[0]) == 64 for key in diagram_layout._layouts)
+
+
+def test_empty_subgraphs_are_not_listed():
+    code = "\n".join([
+        "graph LR",
+        "    subgraph Empty",
+        "    end",
+        "    subgraph Core",
+        "        subgraph Nothing",
+        "        end",
+        *(f"        C{i} --> C{i + 1}" for i in range(12)),
+        "    end",
+        "    subgraph Edge",
+        *(f"        E{i} --> E{i + 1}" for i in range(12)),
+        "    end",
+        "    C0 --> E0",
+    ])
+    layout = get_diagram_layout(code, 10)
+    clusters = layout.list_clusters()
+    assert [(cluster_id, title) for cluster_id, title, _, depth in clusters if depth == 0] == [
+        ("1", "Core"), ("2", "Edge")
+    ]
+    assert "Nothing" not in [title for _, title, _, _ in clusters]
+    assert len({cluster_id for cluster_id, _, _, _ in clusters}) == len(clusters)
+    for cluster_id, _, size, _ in clusters:
+        assert size > 0
+        assert layout.detail(cluster_id)
@@ -0,0 +1,88 @@
+import pytest
+
+from utils.diagram_parser import (
+    DIAGRAM_COMPLETE, DIAGRAM_STARTED, EXPLANATION_TEXT, MermaidStreamParser, parse_mermaid_response,
+    response_spans
+)
+
+RESPONSES = [
+    "Intro\n```mermaid\ngraph LR\n  A --> B\n```\nThe gateway fronts the services.",
+    "```mermaid\nsequenceDiagram\n  A->>B: call\n```",
+    "First\n```mermaid\ngraph TD\n  A --> B\n```\nthen\n```mermaid\ngraph TD\n  C --> D\n```\nend",
+    "Config:\n```yaml\nkey: `value`\n```\nand\n```mermaid\ngraph LR\n  X --> Y\n```\n",
+    "Short fence ```mer and ``` more text",
+    "Inline `code` and `` double `` ticks, trailing ``",
+    "Before\n```mermaid\ngraph LR\n  A --> B\n",
+    "Before\n```python\nprint('no close')\n",
+    "No diagram at all.",
+]
+
+
+def stream(text, size):
+    parser = MermaidStreamParser()
+    events = []
+    for start in range(0, len(text), size):
+        events.extend(parser.push(text[start:start + size]))
+    return events + parser.close(), parser
+
+
+def collect(events):
+    diagrams = [event.text for event in events if event.kind == DIAGRAM_COMPLETE]
+    explanation = "".join(event.text for event in events if event.kind == EXPLANATION_TEXT).strip()
+    return diagrams, explanation
+
+
+@pytest.mark.parametrize("text", RESPONSES)
+def test_any_chunking_matches_parse_mermaid_response(text):
+    expected = parse_mermaid_response(text)
+    for size in range(1, len(text) + 1):
+        events, _ = stream(text, size)
+        assert collect(events) == expected, f"chunk size {size}"
+
+
+@pytest.mark.parametrize("text", RESPONSES)
+def test_response_spans_match_parse_mermaid_response(text):
+    diagrams, explanation = parse_mermaid_response(text)
+    code_spans, text_spans = response_spans(text)
+    assert [text[start:end].strip() for start, end in code_spans] == diagrams
+    assert "".join(text[start:end] for start, end in text_spans).strip() == explanation
+
+
+def test_fence_split_across_chunks():
+    parser = MermaidStreamParser()
+    events = parser.push("Intro\n`")
+    events += parser.push("``mer")
+    assert [event.kind for event in events] == [EXPLANATION_TEXT]
+    assert events[0].text == "Intro\n"
+
+    events = parser.push("maid\ngraph LR\n  A --> B\n``")
+    assert [event.kind for event in events] == [DIAGRAM_STARTED]
+    events = parser.push("`\ndone")
+    assert events == [(DIAGRAM_COMPLETE, "graph LR\n  A --> B"), (EXPLANATION_TEXT, "\ndone")]
+    assert parser.close() == []
+    assert parser.diagram_count == 1
+
+
+def test_diagram_completes_as_soon_as_its_fence_closes():
+    parser = MermaidStreamParser()
+    parser.push("```mermaid\ngraph LR\n  A --> B")
+    events = parser.push("\n```")
+    assert events == [(DIAGRAM_COMPLETE, "graph LR\n  A --> B")]
+
+
+def test_unterminated_mermaid_block_is_discarded():
+    events, parser = stream("Before\n```mermaid\ngraph LR\n  A --> B\n", 4)
+    assert [event.kind for event in events if event.kind != EXPLANATION_TEXT] == [DIAGRAM_STARTED]
+    assert collect(events) == ([], "Before")
+    assert parser.diagram_count == 1
+
+
+def test_unterminated_other_fence_stays_explanation():
+    events, _ = stream("Before\n```python\nprint('no close')\n", 3)
+    assert collect(events) == ([], "Before\n```python\nprint('no close')")
+
+
+def test_trailing_backticks_are_flushed_on_close():
+    parser = MermaidStreamParser()
+    assert parser.push("text ``") == [(EXPLANATION_TEXT, "text ")]
+    assert parser.close() == [(EXPLANATION_TEXT, "``")]
@@ -0,0 +1,136 @@
+import os
+import stat
+import sys
+
+import pytest
+
+from services.diagram_renderer import DiagramRenderer
+
+# Stands in for mmdc: writes an SVG of the input to the -o path and logs each call
+STUB_CLI = """#!{python}
+import sys
+args = sys.argv[1:]
+source, target = args[args.index("-i") + 1], args[args.index("-o") + 1]
+with open(source) as f:
+    code = f.read()
+with open({calls!r}, "a") as f:
+    f.write("call\\n")
+if "fail" in code:
+    sys.exit(1)
+with open(target, "w") as f:
+    f.write("<svg>" + code + "</svg>")
+"""
+
+
+@pytest.fixture
+def stub_cli(tmp_path):
+    if os.name != "posix":
+        pytest.skip("stub executable needs a POSIX shebang")
+    calls = tmp_path / "calls.log"
+    path = tmp_path / "mmdc-stub"
+    path.write_text(STUB_CLI.format(python=sys.executable, calls=str(calls)))
+    path.chmod(path.stat().st_mode | stat.S_IXUSR)
+    return str(path), calls
+
+
+def call_count(calls):
+    return len(calls.read_text().splitlines()) if calls.exists() else 0
+
+
+def test_make_key_depends_on_theme_and_ignores_outer_whitespace():
+    key = DiagramRenderer.make_key("graph LR\n  A --> B", "default")
+    assert key == DiagramRenderer.make_key("\ngraph LR\n  A --> B  \n", "default")
+    assert key != DiagramRenderer.make_key("graph LR\n  A --> B", "dark")
+    assert key != DiagramRenderer.make_key("graph LR\n  A --> C", "default")
+    assert len(key) == 64
+
+
+def test_missing_cli_renders_nothing(tmp_path):
+    renderer = DiagramRenderer(command=str(tmp_path / "missing"))
+    assert not renderer.available
+    assert renderer.render("graph LR\n  A --> B") is None
+    assert renderer.prerender("graph LR\n  A --> B") is None
+
+
+def test_memory_tier_serves_repeat_renders(stub_cli):
+    command, calls = stub_cli
+    renderer = DiagramRenderer(command=command)
+    code = "graph LR\n  A --> B"
+
+    assert renderer.get(code) is None
+    svg = renderer.render(code)
+    assert svg == f"<svg>{code}</svg>"
+    assert renderer.render(code) == svg
+    assert call_count(calls) == 1
+
+    stats = renderer.get_stats()
+    assert stats["renders"] == 1
+    assert stats["hits"] == 1
+    assert stats["pending"] == 0
+
+
+def test_memory_tier_is_bounded(stub_cli):
+    command, _ = stub_cli
+    renderer = DiagramRenderer(command=command, memory_entries=2)
+    for index in range(4):
+        renderer.render(f"graph LR\n  A --> N{index}")
+    assert renderer.get_stats()["memory_entries"] == 2
+    assert renderer.get("graph LR\n  A --> N0") is None
+
+
+def test_disk_tier_survives_a_new_renderer(stub_cli, tmp_path):
+    command, calls = stub_cli
+    cache_dir = str(tmp_path / "svg")
+    code = "graph LR\n  A --> B"
+
+    svg = DiagramRenderer(command=command, cache_dir=cache_dir).render(code)
+    assert call_count(calls) == 1
+
+    renderer = DiagramRenderer(command=command, cache_dir=cache_dir)
+    assert renderer.get(code) == svg
+    assert renderer.render(code) == svg
+    assert call_count(calls) == 1
+    # No temporary files are left behind
+    assert all(name.endswith(".svg") for name in os.listdir(cache_dir))
+
+
+def test_disk_tier_evicts_least_recently_used(stub_cli, tmp_path):
+    command, _ = stub_cli
+    cache_dir = tmp_path / "svg"
+    codes = [f"graph LR\n  A --> N{index}" for index in range(3)]
+    size = len(f"<svg>{codes[0]}</svg>")
+    renderer = DiagramRenderer(command=command, cache_dir=str(cache_dir), max_disk_bytes=2 * size)
+
+    for index, code in enumerate(codes[:2]):
+        renderer.render(code)
+        os.utime(cache_dir / f"{renderer.make_key(code, 'default')}.svg", (index, index))
+    renderer.render(codes[2])
+
+    names = set(os.listdir(cache_dir))
+    assert f"{renderer.make_key(codes[0], 'default')}.svg" not in names
+    assert {f"{renderer.make_key(code, 'default')}.svg" for code in codes[1:]} == names
+
+
+def test_read_tolerates_file_evicted_after_read(stub_cli, tmp_path, monkeypatch):
+    command, _ = stub_cli
+    cache_dir = str(tmp_path / "svg")
+    code = "graph LR\n  A --> B"
+    svg = DiagramRenderer(command=command, cache_dir=cache_dir).render(code)
+
+    def evicted(path, *args, **kwargs):
+        raise FileNotFoundError(path)
+
+    monkeypatch.setattr(os, "utime", evicted)
+    assert DiagramRenderer(command=command, cache_dir=cache_dir).get(code) == svg
+
+
+def test_failed_render_is_not_cached(stub_cli, tmp_path):
+    command, calls = stub_cli
+    cache_dir = tmp_path / "svg"
+    renderer = DiagramRenderer(command=command, cache_dir=str(cache_dir))
+
+    assert renderer.render("graph LR\n  fail --> B") is None
+    assert renderer.render("graph LR\n  fail --> B") is None
+    assert call_count(calls) == 2
+    assert renderer.get_stats()["failures"] == 2
+    assert os.listdir(cache_dir) == []
@@ -0,0 +1,73 @@
+import asyncio
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("agno")
+
+from services.diagram_service import DiagramGenerationService
+from services.model_router import ModelRouter
+
+RESPONSE = "```mermaid\ngraph TD\n    A --> B\n```\nDone."
+
+
+def make_service(fail_models=()):
+    """Service wired to fake streams; models in fail_models raise before any token"""
+    def generate(requirements, model):
+        if model in fail_models:
+            raise RuntimeError(f"{model} is down")
+        yield SimpleNamespace(content=RESPONSE)
+
+    async def agenerate(requirements, model):
+        if model in fail_models:
+            raise RuntimeError(f"{model} is down")
+        yield SimpleNamespace(content=RESPONSE)
+
+    service = DiagramGenerationService.__new__(DiagramGenerationService)
+    service.specialist = SimpleNamespace(model_id="big", _get_instructions=lambda: "")
+    service.cache = None
+    service.semantic_cache = None
+    service.coalescer = None
+    service.hedger = None
+    service.router = ModelRouter(generate, primary="big", fallback="small",
+                                 backoff_base=0, agenerate=agenerate)
+    return service
+
+
+def test_stream_reports_the_serving_model():
+    stream = make_service().generate("ETL pipeline")
+    assert "".join(item.content for item in stream) == RESPONSE
+    assert stream.served_model == "big"
+
+
+def test_async_stream_reports_the_fallback_model():
+    stream = make_service(fail_models=("big",)).astream("ETL pipeline")
+
+    async def consume():
+        return [item async for item in stream]
+
+    assert asyncio.run(consume())[0].content == RESPONSE
+    assert stream.served_model == "small"
+
+
+def test_async_cache_lookup_runs_off_the_event_loop():
+    lookups = []
+
+    class Cache:
+        make_key = staticmethod(lambda *parts: "key")
+
+        def get(self, key):
+            lookups.append(threading.current_thread())
+            return RESPONSE
+
+    service = make_service(fail_models=("big", "small"))
+    service.cache = Cache()
+    stream = service.astream("ETL pipeline")
+
+    async def consume():
+        return "".join([item.content async for item in stream])
+
+    assert asyncio.run(consume()) == RESPONSE
+    assert lookups and lookups[0] is not threading.main_thread()
+    assert stream.served_model == "big"
@@ -0,0 +1,46 @@
+import time
+from types import SimpleNamespace
+
+from core.engine import ArchitectEngineCluster
+
+RESPONSE = "```mermaid\ngraph TD\n    A --> B\n```\nDone."
+
+
+class FakeProvider:
+    """Streams RESPONSE in chunks, pausing delay seconds before each"""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+
+    def generate_diagram(self, requirements, specialist_type="diagram_specialist", model_id=None):
+        for start in range(0, len(RESPONSE), 8):
+            time.sleep(self.delay)
+            yield SimpleNamespace(content=RESPONSE[start:start + 8])
+
+
+def test_fast_specialists_succeed():
+    with ArchitectEngineCluster(FakeProvider(), specialist_count=2, timeout=5) as cluster:
+        result = cluster.process_request("ETL pipeline")
+    assert [r.ok for r in result.results] == [True, True]
+    assert result.results[0].diagram == "graph TD\n    A --> B"
+
+
+def test_timeout_reports_the_time_actually_waited():
+    # Two waves of one specialist each: the cluster waits up to twice the timeout
+    with ArchitectEngineCluster(FakeProvider(delay=0.2), specialist_count=2,
+                                max_concurrency=1, timeout=0.1) as cluster:
+        result = cluster.process_request("ETL pipeline")
+    timed_out = [r for r in result.results if r.timed_out]
+    assert timed_out
+    for r in timed_out:
+        assert 0.15 < r.elapsed_seconds < 1.0
+        assert r.elapsed_seconds != cluster.timeout
+
+
+def test_zero_timeout_is_not_replaced_by_the_default():
+    with ArchitectEngineCluster(FakeProvider(delay=0.05), timeout=0) as cluster:
+        assert cluster.timeout == 0
+        start = time.perf_counter()
+        result = cluster.process_request("ETL pipeline")
+    assert time.perf_counter() - start < 1.0
+    assert result.results[0].timed_out
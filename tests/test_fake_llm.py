@@ -0,0 +1,16 @@
+from types import SimpleNamespace
+
+from benchmarks.fake_llm import install_fake_clients
+
+RESPONSES = [("", "```mermaid\ngraph TD\n    A --> B\n```")]
+
+
+def test_fake_clients_report_that_they_are_open():
+    model = SimpleNamespace(client=None, async_client=None)
+    install_fake_clients([model], responses=RESPONSES, ttft=0, tokens_per_second=1e6)
+    # agno rebuilds a client whose is_closed() is missing or true
+    assert model.client.is_closed() is False
+    assert model.async_client.is_closed() is False
+
+    completion = model.client.chat.completions.create(model="big", messages=[{"role": "user", "content": "ETL"}])
+    assert completion.choices[0].message.content == RESPONSES[0][1]
@@ -0,0 +1,53 @@
+import time
+from types import SimpleNamespace
+
+from services.hedging import HedgedGenerator
+from services.model_router import ModelRouter
+
+RESPONSE = "```mermaid\ngraph TD\n    A --> B\n```\nDone."
+
+
+def fake_generate(ttft, chunk_delay):
+    """Per-model streams: first token after ttft[model], then chunk_delay between chunks"""
+    def generate(requirements, model):
+        yield SimpleNamespace(content=None)
+        time.sleep(ttft[model])
+        for start in range(0, len(RESPONSE), 8):
+            yield SimpleNamespace(content=RESPONSE[start:start + 8])
+            time.sleep(chunk_delay)
+    return generate
+
+
+def test_hedged_stream_yields_before_the_diagram_completes():
+    # The diagram takes ~1s to finish, well past the router's first-token timeout
+    hedger = HedgedGenerator(fake_generate({"big": 0.05, "small": 0.05}, chunk_delay=0.15),
+                             hedge_model="small", default_delay=0.2)
+    router = ModelRouter(hedger.stream, primary="big", fallback="small",
+                         first_token_timeout=0.5)
+    stream = router.stream("ETL pipeline")
+    assert "".join(item.content or "" for item in stream) == RESPONSE
+    stats = router.get_stats()
+    assert stats["first_token_timeouts"] == 0
+    assert stats["retries"] == 0
+    assert hedger.get_stats()["hedges"] == 0
+
+
+def test_hedge_wins_on_first_token():
+    hedger = HedgedGenerator(fake_generate({"big": 2.0, "small": 0.05}, chunk_delay=0.15),
+                             hedge_model="small", default_delay=0.1)
+    router = ModelRouter(hedger.stream, primary="big", fallback="small",
+                         first_token_timeout=0.5)
+    stream = router.stream("ETL pipeline")
+    assert "".join(item.content or "" for item in stream) == RESPONSE
+    assert stream.served_model == "small"
+    assert router.get_stats()["first_token_timeouts"] == 0
+    assert hedger.get_stats()["hedge_wins"] == 1
+
+
+def test_primary_keeps_the_race_once_it_streams():
+    hedger = HedgedGenerator(fake_generate({"big": 0.3, "small": 0.6}, chunk_delay=0.1),
+                             hedge_model="small", default_delay=0.1)
+    stream = hedger.stream("ETL pipeline", "big")
+    assert "".join(item.content or "" for item in stream) == RESPONSE
+    assert stream.served_model == "big"
+    assert hedger.get_stats()["primary_wins"] == 1
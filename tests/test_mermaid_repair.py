@@ -0,0 +1,47 @@
+import pytest
+
+from benchmarks.check_mermaid_repair import load_corpus
+from utils.mermaid_ast import validate_and_repair
+from utils.mermaid_lexer import repair_mermaid, split_statements
+
+CORPUS = load_corpus()
+
+
+@pytest.mark.parametrize("case", CORPUS, ids=[case["name"] for case in CORPUS])
+def test_corpus_case(case):
+    assert repair_mermaid(case["input"]) == case["expected"]
+    _, diagram = validate_and_repair(case["input"])
+    assert diagram.is_valid == case.get("valid", True), diagram.errors
+
+
+def test_hyphenated_participant_is_one_statement():
+    _, statements = split_statements("sequenceDiagram\nparticipant API-Gateway\nClient->>API-Gateway: request")
+    assert [text for text, _ in statements[1:]] == ["participant API-Gateway", "Client->>API-Gateway: request"]
+
+
+@pytest.mark.parametrize("arrow", ["o--o", "x--x", "<-->", "<-.->", "<==>"])
+def test_bidirectional_arrow_keeps_the_edge(arrow):
+    assert repair_mermaid(f"graph LR\n    A {arrow} B\n    C --> D") == f"graph LR\n    A {arrow} B\n    C --> D"
+
+
+@pytest.mark.parametrize("code", [
+    "sequenceDiagram\n    create participant Carl\n    Alice->>Carl: Hi\n    destroy Carl",
+    "sequenceDiagram\n    link Alice: Dashboard @ https://example.com\n    Alice->>Bob: hi",
+    "classDiagram\n    namespace Shapes {\n        class Triangle\n    }\n    Triangle <|-- Square",
+    "classDiagram\n    bar ()-- foo",
+])
+def test_statements_outside_the_model_are_accepted(code):
+    _, diagram = validate_and_repair(code)
+    assert diagram.is_valid, diagram.errors
+
+
+def test_namespace_classes_are_nodes():
+    _, diagram = validate_and_repair("classDiagram\n    namespace Shapes {\n        class Triangle\n    }")
+    assert "Triangle" in diagram.nodes
+    assert "Shapes" not in diagram.nodes
+
+
+def test_unbalanced_unknown_statement_is_reported():
+    _, diagram = validate_and_repair('sequenceDiagram\n    create participant "Carl')
+    assert not diagram.is_valid
+    assert "unbalanced" in diagram.errors[0]
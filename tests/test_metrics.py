@@ -0,0 +1,81 @@
+from utils.metrics import HistogramMetrics, StageTimer, percentile
+
+
+def test_percentile_is_nearest_rank():
+    samples = list(range(1, 21))
+    assert percentile(samples, 0.95) == 19
+    assert percentile(samples, 0.50) == 10
+    assert percentile(samples, 1.0) == 20
+    assert percentile(samples, 0.0) == 1
+    assert percentile([], 0.95) is None
+
+
+def test_summary_uses_shared_percentile():
+    metrics = HistogramMetrics()
+    for value in range(1, 21):
+        metrics.observe("ttft_seconds", value, {"model": "m"})
+
+    summary = metrics.summary("ttft_seconds")["model=m"]
+    assert summary["count"] == 20
+    assert summary["avg"] == 10.5
+    assert summary["p50"] == percentile(range(1, 21), 0.50)
+    assert summary["p95"] == percentile(range(1, 21), 0.95)
+
+
+def test_prometheus_buckets_are_cumulative():
+    metrics = HistogramMetrics(buckets=(0.1, 1, 10))
+    for value in (0.05, 0.1, 0.5, 5, 50):
+        metrics.observe("stage_seconds", value)
+
+    lines = metrics.to_prometheus().splitlines()
+    assert "# TYPE architect_stage_seconds histogram" in lines
+    assert 'architect_stage_seconds_bucket{le="0.1"} 2' in lines
+    assert 'architect_stage_seconds_bucket{le="1.0"} 3' in lines
+    assert 'architect_stage_seconds_bucket{le="10.0"} 4' in lines
+    assert 'architect_stage_seconds_bucket{le="+Inf"} 5' in lines
+    assert "architect_stage_seconds_count 5" in lines
+    assert "architect_stage_seconds_sum 55.65" in lines
+
+
+def test_prometheus_escapes_label_values():
+    metrics = HistogramMetrics(buckets=(1,))
+    labels = {"model": 'llama "big"\\v2\nnext'}
+    metrics.increment("requests", labels=labels)
+    metrics.observe("latency_seconds", 0.5, labels)
+
+    text = metrics.to_prometheus()
+    escaped = 'model="llama \\"big\\"\\\\v2\\nnext"'
+    assert "# TYPE architect_requests_total counter" in text
+    assert f"architect_requests_total{{{escaped}}} 1" in text
+    assert f'architect_latency_seconds_bucket{{{escaped},le="1.0"}} 1' in text
+    # Every sample stays on one line
+    assert all(line.startswith(("#", "architect_")) for line in text.splitlines())
+
+
+def test_rate_metrics_use_rate_buckets():
+    metrics = HistogramMetrics()
+    metrics.observe("generation_tokens_per_second", 120)
+    assert 'architect_generation_tokens_per_second_bucket{le="200.0"} 1' in metrics.to_prometheus()
+
+
+def test_stage_timer_breakdown_accumulates_and_records_once():
+    metrics = HistogramMetrics()
+    timer = StageTimer({"model": "m"}, metrics=metrics)
+    timer.record("parse", 0.25)
+    timer.record("parse", 0.5)
+    with timer.stage("first_token"):
+        pass
+    timer.set("tokens_per_second", 42)
+
+    breakdown = timer.as_dict()
+    assert breakdown["parse"] == 0.75
+    assert breakdown["first_token"] >= 0
+    assert breakdown["tokens_per_second"] == 42
+
+    timer.finish()
+    timer.finish()
+    stages = metrics.summary("generation_stage_seconds")
+    assert stages["model=m,stage=parse"]["count"] == 1
+    assert stages["model=m,stage=parse"]["avg"] == 0.75
+    assert stages["model=m,stage=first_token"]["count"] == 1
+    assert metrics.summary("generation_tokens_per_second")["model=m"]["count"] == 1
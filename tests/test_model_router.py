@@ -0,0 +1,111 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from services.model_router import FirstTokenTimeout, ModelRouter
+
+RESPONSE = "```mermaid\ngraph TD\n    A --> B\n```\nDone."
+
+
+def slow_start(delay, empty_items=2):
+    """Stream that opens with empty items and sends its first token after delay seconds"""
+    def generate(requirements, model):
+        for _ in range(empty_items):
+            yield SimpleNamespace(content=None)
+        time.sleep(delay)
+        for start in range(0, len(RESPONSE), 8):
+            yield SimpleNamespace(content=RESPONSE[start:start + 8])
+    return generate
+
+
+def aslow_start(delay, empty_items=2):
+    async def agenerate(requirements, model):
+        for _ in range(empty_items):
+            yield SimpleNamespace(content=None)
+        await asyncio.sleep(delay)
+        for start in range(0, len(RESPONSE), 8):
+            yield SimpleNamespace(content=RESPONSE[start:start + 8])
+    return agenerate
+
+
+def text(items):
+    return "".join(item.content or "" for item in items)
+
+
+def test_ttft_is_measured_at_the_first_content_item():
+    router = ModelRouter(slow_start(0.2), primary="big", first_token_timeout=5)
+    stream = router.stream("ETL pipeline")
+    assert text(stream) == RESPONSE
+    assert stream.served_model == "big"
+    assert router._health["big"].ttft_samples[0] >= 0.2
+
+
+def test_empty_items_do_not_satisfy_the_first_token_timeout():
+    router = ModelRouter(slow_start(0.5), primary="big", fallback="small",
+                         retry_attempts=1, first_token_timeout=0.1)
+    with pytest.raises(FirstTokenTimeout):
+        list(router.stream("ETL pipeline"))
+    assert router.get_stats()["first_token_timeouts"] == 1
+
+
+def test_stream_without_content_ends_cleanly():
+    empty = [SimpleNamespace(content=None)] * 3
+    router = ModelRouter(lambda requirements, model: iter(empty), primary="big",
+                         first_token_timeout=1)
+    assert len(list(router.stream("ETL pipeline"))) == 3
+
+
+def test_async_ttft_is_measured_at_the_first_content_item():
+    router = ModelRouter(slow_start(0.0), primary="big", first_token_timeout=5,
+                         agenerate=aslow_start(0.2))
+
+    async def consume():
+        return [item async for item in router.astream("ETL pipeline")]
+
+    assert text(asyncio.run(consume())) == RESPONSE
+    assert router._health["big"].ttft_samples[0] >= 0.2
+
+
+def test_waiting_for_a_reader_thread_is_not_time_to_first_token():
+    import threading
+
+    def generate(requirements, model):
+        time.sleep(0.2)
+        yield SimpleNamespace(content="graph TD")
+
+    router = ModelRouter(generate, primary="big", retry_attempts=1, first_token_timeout=0.3,
+                         reader_threads=1)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append([item.content for item in router.stream("r")]))
+               for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == [["graph TD"]] * 2
+    assert router.get_stats()["first_token_timeouts"] == 0
+    assert max(router._health["big"].ttft_samples) < 0.3
+
+
+def test_setup_errors_are_raised_without_counting_against_the_model():
+    def generate(requirements, model):
+        raise ValueError(f"Model {model} not available")
+
+    def agenerate(requirements, model):
+        raise ValueError(f"Model {model} not available")
+
+    router = ModelRouter(generate, primary="big", fallback="small", agenerate=agenerate)
+    with pytest.raises(ValueError):
+        list(router.stream("r"))
+
+    async def run():
+        return [item async for item in router.astream("r")]
+
+    with pytest.raises(ValueError):
+        asyncio.run(run())
+    stats = router.get_stats()
+    assert stats["retries"] == 0
+    assert stats["models"]["big"]["error_rate"] == 0.0
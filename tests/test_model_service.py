@@ -0,0 +1,25 @@
+import pytest
+
+pytest.importorskip("agno")
+pytest.importorskip("groq")
+
+import yaml
+
+from services.model_service import EnterpriseModelService
+from utils.config_loader import DEFAULT_CONFIG_PATH
+
+
+def test_enterprise_model_service_uses_the_given_config(tmp_path):
+    with open(DEFAULT_CONFIG_PATH, encoding="utf-8") as f:
+        config = yaml.safe_load(f)
+    config["cache"]["enabled"] = False
+    config["scheduler"]["enabled"] = False
+    config["agent_pool"]["max_size"] = 7
+    config["agent_pool"]["warm_up"] = []
+    path = tmp_path / "settings.yaml"
+    path.write_text(yaml.safe_dump(config), encoding="utf-8")
+
+    service = EnterpriseModelService(str(path))
+    assert service.provider_service.config_path == str(path)
+    assert service.agent_pool.max_size == 7
+    assert service.cache is None
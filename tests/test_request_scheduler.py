@@ -0,0 +1,98 @@
+import asyncio
+import contextvars
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from services.model_router import CallState, ModelRouter, _call_state
+from services.request_scheduler import RateLimitQueueTimeout, RequestScheduler, schedule_client
+
+# One request per second, no burst
+LIMITS = {"big": {"requests_per_minute": 60, "tokens_per_minute": 1000000}}
+
+
+def make_scheduler():
+    return RequestScheduler(LIMITS, max_wait=5, burst_seconds=1)
+
+
+def make_client(scheduler):
+    """Fake chat completion client routed through the scheduler"""
+    def create(**kwargs):
+        return iter([SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content="graph TD"))])])
+
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    schedule_client(client, scheduler)
+    return client
+
+
+def make_generate(client):
+    def generate(requirements, model):
+        for chunk in client.chat.completions.create(model=model, messages=[{"content": requirements}],
+                                                    stream=True):
+            yield SimpleNamespace(content=chunk.choices[0].delta.content)
+    return generate
+
+
+def test_queue_time_does_not_count_toward_the_first_token_timeout():
+    scheduler = make_scheduler()
+    router = ModelRouter(make_generate(make_client(scheduler)), primary="big",
+                         retry_attempts=1, first_token_timeout=0.3)
+    assert [item.content for item in router.stream("first")] == ["graph TD"]
+
+    # The second call waits about a second for quota, longer than the timeout
+    start = time.monotonic()
+    assert [item.content for item in router.stream("second")] == ["graph TD"]
+    assert time.monotonic() - start > 0.5
+    stats = router.get_stats()
+    assert stats["first_token_timeouts"] == 0
+    assert max(router._health["big"].ttft_samples) < 0.3
+
+
+def test_async_queue_time_does_not_count_toward_the_first_token_timeout():
+    scheduler = make_scheduler()
+
+    async def agenerate(requirements, model):
+        reservation = await scheduler.areserve(model, 10)
+        reservation.settle()
+        yield SimpleNamespace(content="graph TD")
+
+    router = ModelRouter(None, primary="big", retry_attempts=1, first_token_timeout=0.3,
+                         agenerate=agenerate)
+
+    async def run():
+        first = [item async for item in router.astream("first")]
+        second = [item async for item in router.astream("second")]
+        return first + second
+
+    assert len(asyncio.run(run())) == 2
+    assert router.get_stats()["first_token_timeouts"] == 0
+
+
+def test_abandoned_call_leaves_the_queue():
+    scheduler = make_scheduler()
+    scheduler.reserve("big", 10).settle()
+    state = CallState()
+    state.abandoned.set()
+    context = contextvars.copy_context()
+    context.run(_call_state.set, state)
+
+    start = time.monotonic()
+    with pytest.raises(RateLimitQueueTimeout):
+        context.run(scheduler.reserve, "big", 10)
+    assert time.monotonic() - start < 0.5
+    assert scheduler.get_stats()["queue_depth"] == {}
+
+
+def test_quota_admitted_after_abandonment_is_handed_back():
+    scheduler = make_scheduler()
+    client = make_client(scheduler)
+    state = CallState()
+    state.abandoned.set()
+    context = contextvars.copy_context()
+    context.run(_call_state.set, state)
+
+    with pytest.raises(RateLimitQueueTimeout):
+        context.run(client.chat.completions.create, model="big", messages=[], stream=True)
+    # The request token was refunded, so the next call is admitted at once
+    assert scheduler.try_reserve("big", 10) is not None
@@ -0,0 +1,11 @@
+import os
+
+REQUIREMENTS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "requirements.txt")
+
+
+def test_requirements_file_ends_with_a_newline():
+    # Appending a requirement with echo >> must not join it onto the last line
+    with open(REQUIREMENTS, encoding="utf-8") as f:
+        text = f.read()
+    assert text.endswith("\n")
+    assert all(line.strip() for line in text.splitlines())
@@ -0,0 +1,81 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import yaml
+
+from services.response_cache import ResponseCache, get_response_cache
+
+DIAGRAM_RESPONSE = "Overview.\n```mermaid\ngraph TD\n    A --> B\n```\nDetails."
+
+
+def _chunks(text, size=8):
+    return [SimpleNamespace(content=text[i:i + size]) for i in range(0, len(text), size)]
+
+
+def test_record_stores_responses_with_a_diagram():
+    cache = ResponseCache()
+    list(cache.record("key", iter(_chunks(DIAGRAM_RESPONSE))))
+    assert cache.get("key") == DIAGRAM_RESPONSE
+
+
+def test_record_skips_responses_without_a_diagram():
+    cache = ResponseCache()
+    list(cache.record("key", iter(_chunks("Sorry, I cannot help with that."))))
+    assert cache.get("key") is None
+    assert cache.get_stats()["stores"] == 0
+
+
+def test_record_skips_unterminated_diagrams():
+    cache = ResponseCache()
+    list(cache.record("key", iter(_chunks("```mermaid\ngraph TD\n    A --> "))))
+    assert cache.get("key") is None
+
+
+def test_arecord_skips_responses_without_a_diagram():
+    cache = ResponseCache()
+
+    async def stream(text):
+        for chunk in _chunks(text):
+            yield chunk
+
+    async def consume(key, text):
+        return [item async for item in cache.arecord(key, stream(text))]
+
+    asyncio.run(consume("bad", "The model timed out"))
+    asyncio.run(consume("good", DIAGRAM_RESPONSE))
+    assert cache.get("bad") is None
+    assert cache.get("good") == DIAGRAM_RESPONSE
+
+
+def test_disk_hit_keeps_the_original_age(tmp_path, monkeypatch):
+    db_path = str(tmp_path / "responses.db")
+    ResponseCache(ttl_seconds=100, db_path=db_path).put("key", DIAGRAM_RESPONSE)
+
+    # A fresh process finds the entry on disk 90 seconds after it was stored
+    cache = ResponseCache(ttl_seconds=100, db_path=db_path)
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 90)
+    assert cache.get("key") == DIAGRAM_RESPONSE
+
+    # The promoted memory entry expires with the disk row, not 100s after promotion
+    monkeypatch.setattr(time, "time", lambda: now + 120)
+    assert cache.get("key") is None
+
+
+def _write_config(path, **cache):
+    path.write_text(yaml.safe_dump({"cache": dict({"enabled": True, "disk_path": ""}, **cache)}), encoding="utf-8")
+    return str(path)
+
+
+def test_shared_cache_follows_its_settings(tmp_path):
+    first = _write_config(tmp_path / "a.yaml", memory_entries=3)
+    same = _write_config(tmp_path / "b.yaml", memory_entries=3)
+    changed = _write_config(tmp_path / "c.yaml", memory_entries=5)
+
+    cache = get_response_cache(first)
+    assert cache is get_response_cache(first)
+    assert cache is get_response_cache(same)
+    assert get_response_cache(changed) is not cache
+    assert get_response_cache(changed).max_entries == 5
+    assert get_response_cache(_write_config(tmp_path / "d.yaml", enabled=False)) is None
@@ -0,0 +1,69 @@
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+pytest.importorskip("agno")
+
+from core.search_tools import CachedSearchTools, SearchResultCache, load_fixtures  # noqa: E402
+
+FIXTURES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                        "benchmarks", "fixtures", "search_results.json")
+
+
+class CountingTools(CachedSearchTools):
+    """Fixture-backed toolkit that counts searches and can be made slow"""
+
+    def __init__(self, delay=0.0, **kwargs):
+        super().__init__(SearchResultCache(), ThreadPoolExecutor(max_workers=4),
+                         fixtures=load_fixtures(FIXTURES), **kwargs)
+        self.delay = delay
+        self.searches = []
+
+    def _search(self, kind, query, max_results):
+        self.searches.append(query)
+        time.sleep(self.delay)
+        return super()._search(kind, query, max_results)
+
+
+def test_fixture_results_are_cached_by_normalized_query():
+    tools = CountingTools()
+    first = json.loads(tools.web_search("API gateway patterns", max_results=2))
+    second = json.loads(tools.web_search("  api GATEWAY   patterns ", max_results=2))
+
+    assert len(first) == 2
+    assert first[0]["href"] == "https://microservices.io/patterns/apigateway.html"
+    assert second == first
+    assert len(tools.searches) == 1
+    assert tools.cache.get_stats()["hits"] == 1
+
+
+def test_multi_search_deduplicates_queries():
+    tools = CountingTools()
+    results = json.loads(tools.multi_search(["CDC pipeline", "service discovery", "CDC pipeline"]))
+
+    assert list(results) == ["CDC pipeline", "service discovery"]
+    assert sorted(tools.searches) == ["CDC pipeline", "service discovery"]
+
+
+def test_slow_search_returns_an_error_within_the_timeout():
+    tools = CountingTools(delay=1.0, timeout_seconds=0.1)
+    start = time.monotonic()
+    results = json.loads(tools.multi_search(["CDC pipeline", "service discovery"]))
+
+    assert time.monotonic() - start < 0.5
+    assert results["CDC pipeline"] == {"error": "Search timed out after 0.1 seconds"}
+    assert "error" in results["service discovery"]
+    # A timed-out search is not cached
+    assert tools.cache.get_stats()["entries"] == 0
+
+
+def test_expired_entries_are_deleted():
+    cache = SearchResultCache(ttl_seconds=0.01)
+    cache.put(("web", "q", 5), [{"title": "t"}])
+    time.sleep(0.02)
+
+    assert cache.get(("web", "q", 5)) is None
+    assert cache.get_stats()["entries"] == 0
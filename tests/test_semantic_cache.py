@@ -0,0 +1,55 @@
+from services.semantic_cache import HashingEmbedder, NumpyVectorIndex, SemanticCache
+
+DIAGRAM = "Here it is:\n```mermaid\ngraph TD\n    A --> B\n```\n"
+
+LONG = ("Design a scalable three-tier web application on {cloud} with a load balancer, autoscaling "
+        "application servers, a {db} database with read replicas, a Redis cache and object storage")
+
+
+def make_cache():
+    embedder = HashingEmbedder(dimensions=256)
+    return SemanticCache(NumpyVectorIndex(embedder.dimensions, max_entries=16), embedder, threshold=0.9)
+
+
+def test_one_word_swap_in_a_long_prompt_is_a_miss():
+    cache = make_cache()
+    cache.store(LONG.format(cloud="AWS", db="relational"), "model", "", DIAGRAM)
+    assert cache.lookup(LONG.format(cloud="Azure", db="relational"), "model") is None
+    assert cache.lookup(LONG.format(cloud="AWS", db="document"), "model") is None
+    assert cache.lookup(LONG.format(cloud="AWS", db="relational"), "model") == DIAGRAM
+
+
+def test_with_and_without_are_different_requests():
+    cache = make_cache()
+    cache.store("Microservices for a marketplace with an API gateway and a Kafka bus", "model", "", DIAGRAM)
+    assert cache.lookup("Microservices for a marketplace without an API gateway and a Kafka bus", "model") is None
+
+
+def test_paraphrase_with_the_same_content_words_is_a_hit():
+    cache = make_cache()
+    cache.store("Multi-region web application with a CDN and a database replica", "model", "", DIAGRAM)
+    assert cache.lookup("multi region web app with CDN and DB replicas", "model") == DIAGRAM
+
+
+def test_response_without_a_diagram_is_not_stored():
+    cache = make_cache()
+    cache.store("Web application with a CDN", "model", "", "Which cloud provider should I use?")
+    cache.store("Web application with a CDN", "model", "", "```mermaid\n```")
+    assert cache.get_stats()["stores"] == 0
+    assert cache.lookup("Web application with a CDN", "model") is None
+
+
+def test_reversed_direction_is_a_miss():
+    cache = make_cache()
+    cache.store("Migration plan from Oracle to PostgreSQL with CDC replication", "model", "", DIAGRAM)
+    assert cache.lookup("Migration plan from PostgreSQL to Oracle with CDC replication", "model") is None
+    cache.store("payments service calls fraud service", "model", "", DIAGRAM)
+    assert cache.lookup("fraud service calls payments service", "model") is None
+
+
+def test_filler_words_and_word_forms_still_hit():
+    cache = make_cache()
+    cache.store("microservices for a banking app", "model", "", DIAGRAM)
+    assert cache.lookup("banking app built from microservices", "model") == DIAGRAM
+    cache.store("data pipeline with validation stages", "model", "", DIAGRAM)
+    assert cache.lookup("data pipeline that validates each stage", "model") == DIAGRAM
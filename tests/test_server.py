@@ -0,0 +1,59 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("dotenv")
+
+from server import http_error, produce_events
+from services.model_router import FirstTokenTimeout
+from services.request_scheduler import RateLimitQueueTimeout
+
+
+class FakeStream:
+    """Async stream that learns its serving model while it is read"""
+
+    def __init__(self):
+        self.served_model = None
+        self._items = iter([SimpleNamespace(content="```mermaid\ngraph TD\n    A --> B\n```")])
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        self.served_model = "small"
+        try:
+            return next(self._items)
+        except StopIteration:
+            raise StopAsyncIteration
+
+    async def aclose(self):
+        pass
+
+
+def test_done_event_carries_the_served_model():
+    async def run():
+        events = asyncio.Queue()
+        await produce_events(FakeStream(), events, 0.0)
+        items = []
+        while not events.empty():
+            items.append(events.get_nowait())
+        return items
+
+    done = [data for event, data in filter(None, asyncio.run(run())) if event == "done"]
+    assert done[0]["model"] == "small"
+
+
+@pytest.mark.parametrize("error", [
+    FirstTokenTimeout("No token within 10s"),
+    RateLimitQueueTimeout("Waited 5s for llama-3.3-70b-versatile"),
+])
+def test_slow_or_rate_limited_models_map_to_503(error):
+    mapped = http_error(error)
+    assert mapped.status_code == 503
+    assert "Retry-After" in mapped.headers
+
+
+def test_other_errors_are_not_mapped():
+    assert http_error(RuntimeError("boom")) is None
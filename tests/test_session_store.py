@@ -0,0 +1,67 @@
+import time
+
+from services.session_store import SessionSpillStore, SessionStore
+
+RESPONSE = "Here is the design:\n```mermaid\ngraph TD\n    A --> B\n```\nA calls B over HTTPS."
+
+
+def test_diagram_and_explanation_are_offsets_into_the_response():
+    store = SessionStore("s")
+    generation = store.add("Two services", RESPONSE, diagram_code="graph TD\n    A --> B")
+    assert generation.prompt == "Two services"
+    assert generation.response == RESPONSE
+    assert generation.diagram == "graph TD\n    A --> B"
+    assert generation.explanation == "Here is the design:\n\nA calls B over HTTPS."
+    # The diagram matched its span, so nothing was stored next to the response
+    assert "repaired" not in generation._meta
+
+
+def test_repaired_diagram_is_stored_alongside():
+    store = SessionStore("s")
+    generation = store.add("Two services", RESPONSE, diagram_code="graph TD\n    A --> C")
+    assert generation.diagram == "graph TD\n    A --> C"
+    assert generation.response == RESPONSE
+
+
+def test_history_is_compressed():
+    store = SessionStore("s")
+    store.add("Repeat", RESPONSE * 50, diagram_code="graph TD\n    A --> B")
+    assert store.get_stats()["compression_ratio"] > 5
+
+
+def test_generations_over_the_cap_are_dropped_without_a_spill_store():
+    store = SessionStore("s", max_memory_bytes=400)
+    for index in range(5):
+        store.add(f"prompt {index}", RESPONSE + str(index))
+    stats = store.get_stats()
+    assert stats["dropped"] > 0
+    assert stats["memory_bytes"] <= 400 or stats["memory_entries"] == 1
+    assert store.get(1) is None
+    assert store.current.prompt == "prompt 4"
+
+
+def test_generations_over_the_cap_spill_and_stay_readable(tmp_path):
+    spill = SessionSpillStore(str(tmp_path / "sessions.db"))
+    store = SessionStore("s", spill=spill, max_memory_bytes=400)
+    other = SessionStore("other", spill=spill, max_memory_bytes=1)
+    for index in range(5):
+        store.add(f"prompt {index}", RESPONSE + str(index), diagram_code="graph TD\n    A --> B")
+        other.add(f"other {index}", RESPONSE)
+
+    assert store.get_stats()["spilled"] > 0
+    assert [title for _, _, title in store.list_generations()] == [f"prompt {i}" for i in range(4, -1, -1)]
+    first = store.get(1)
+    assert first.prompt == "prompt 0"
+    assert first.diagram == "graph TD\n    A --> B"
+    assert first.explanation.endswith("HTTPS.0")
+
+
+def test_spill_store_evicts_by_size_and_age(tmp_path):
+    spill = SessionSpillStore(str(tmp_path / "sessions.db"), ttl_seconds=60, max_bytes=250)
+    for index in range(5):
+        spill.put("s", index, time.time(), b"x" * 100, "{}")
+    assert [row[0] for row in spill.list("s")] == [4, 3]
+
+    spill.put("s", 9, time.time() - 120, b"x", "{}")
+    spill.put("s", 10, time.time(), b"x", "{}")
+    assert 9 not in [row[0] for row in spill.list("s")]
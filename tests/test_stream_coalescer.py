@@ -0,0 +1,189 @@
+import asyncio
+import threading
+
+import pytest
+
+from services.stream_coalescer import StreamCoalescer
+
+
+class Upstream:
+    """Controllable upstream: yields "a", waits for the gate, then "b" or an error"""
+
+    def __init__(self, error=None):
+        self.gate = threading.Event()
+        self.closed = threading.Event()
+        self.starts = 0
+        self.error = error
+
+    def start(self):
+        self.starts += 1
+        return self._generate()
+
+    def _generate(self):
+        try:
+            yield "a"
+            self.gate.wait(5)
+            if self.error:
+                raise self.error
+            yield "b"
+        finally:
+            self.closed.set()
+
+    def astart(self):
+        self.starts += 1
+        return self._agenerate()
+
+    async def _agenerate(self):
+        try:
+            yield "a"
+            while not self.gate.is_set():
+                await asyncio.sleep(0.01)
+            if self.error:
+                raise self.error
+            yield "b"
+        finally:
+            self.closed.set()
+
+
+def consume(stream, results):
+    try:
+        results.append(list(stream))
+    except Exception as e:
+        results.append(e)
+
+
+def test_concurrent_identical_streams_share_one_upstream():
+    coalescer = StreamCoalescer()
+    upstream = Upstream()
+    streams = [coalescer.stream("k", upstream.start) for _ in range(5)]
+    results = []
+    threads = [threading.Thread(target=consume, args=(stream, results)) for stream in streams]
+    for thread in threads:
+        thread.start()
+    upstream.gate.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert upstream.starts == 1
+    assert results == [["a", "b"]] * 5
+    assert [stream.leader for stream in streams] == [True, False, False, False, False]
+    assert coalescer.get_stats()["joins"] == 4
+
+
+def test_late_joiner_gets_the_buffered_prefix():
+    coalescer = StreamCoalescer()
+    upstream = Upstream()
+    leader = coalescer.stream("k", upstream.start)
+    assert next(leader) == "a"
+    late = coalescer.stream("k", upstream.start)
+    upstream.gate.set()
+
+    assert list(leader) == ["b"]
+    assert list(late) == ["a", "b"]
+    assert upstream.starts == 1
+
+
+def test_upstream_is_cancelled_when_every_subscriber_leaves():
+    coalescer = StreamCoalescer()
+    upstream = Upstream()
+    first = coalescer.stream("k", upstream.start)
+    second = coalescer.stream("k", upstream.start)
+    assert next(first) == "a"
+    assert next(second) == "a"
+    first.close()
+    second.close()
+    upstream.gate.set()
+
+    assert upstream.closed.wait(5)
+    stats = coalescer.get_stats()
+    assert stats["cancelled"] == 1
+    assert stats["active"] == 0
+
+
+def test_upstream_error_reaches_every_subscriber():
+    coalescer = StreamCoalescer()
+    upstream = Upstream(error=RuntimeError("upstream failed"))
+    streams = [coalescer.stream("k", upstream.start) for _ in range(3)]
+    results = []
+    threads = [threading.Thread(target=consume, args=(stream, results)) for stream in streams]
+    for thread in threads:
+        thread.start()
+    upstream.gate.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(results) == 3
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+def test_async_concurrent_identical_streams_share_one_upstream():
+    coalescer = StreamCoalescer()
+    upstream = Upstream()
+
+    async def main():
+        streams = [coalescer.astream("k", upstream.astart) for _ in range(5)]
+
+        async def read(stream):
+            return [item async for item in stream]
+
+        tasks = [asyncio.ensure_future(read(stream)) for stream in streams]
+        await asyncio.sleep(0.05)
+        upstream.gate.set()
+        return await asyncio.wait_for(asyncio.gather(*tasks), 5)
+
+    assert asyncio.run(main()) == [["a", "b"]] * 5
+    assert upstream.starts == 1
+
+
+def test_async_late_joiner_gets_the_buffered_prefix():
+    coalescer = StreamCoalescer()
+    upstream = Upstream()
+
+    async def main():
+        leader = coalescer.astream("k", upstream.astart)
+        assert await leader.__anext__() == "a"
+        late = coalescer.astream("k", upstream.astart)
+        upstream.gate.set()
+        return [item async for item in leader], [item async for item in late]
+
+    assert asyncio.run(main()) == (["b"], ["a", "b"])
+    assert upstream.starts == 1
+
+
+def test_async_upstream_is_cancelled_when_every_subscriber_leaves():
+    coalescer = StreamCoalescer()
+    upstream = Upstream()
+
+    async def main():
+        first = coalescer.astream("k", upstream.astart)
+        second = coalescer.astream("k", upstream.astart)
+        assert await first.__anext__() == "a"
+        assert await second.__anext__() == "a"
+        await first.aclose()
+        assert not upstream.closed.is_set()
+        await second.aclose()
+        await asyncio.sleep(0.05)
+
+    asyncio.run(main())
+    assert upstream.closed.is_set()
+    assert coalescer.get_stats()["cancelled"] == 1
+
+
+def test_async_upstream_error_reaches_every_subscriber():
+    coalescer = StreamCoalescer()
+    upstream = Upstream(error=RuntimeError("upstream failed"))
+
+    async def main():
+        streams = [coalescer.astream("k", upstream.astart) for _ in range(3)]
+
+        async def read(stream):
+            with pytest.raises(RuntimeError):
+                async for _ in stream:
+                    pass
+            return True
+
+        tasks = [asyncio.ensure_future(read(stream)) for stream in streams]
+        upstream.gate.set()
+        return await asyncio.wait_for(asyncio.gather(*tasks), 5)
+
+    assert asyncio.run(main()) == [True] * 3
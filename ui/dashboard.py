@@ -1,23 +1,46 @@
 import streamlit as st
+import streamlit.components.v1 as components
+import sqlite3
 import uuid
+import time
 import logging
 from utils.logger_config import setup_logging
 from ui.styling import load_enterprise_theme, add_architect_banner, add_professional_footer
-from ui.components import add_project_description, enhance_example_prompts
-from utils.diagram_parser import extract_mermaid_code, repair_mermaid_code
-from services.diagram_service import DiagramGenerationService
-from streamlit_mermaid import st_mermaid
+from ui.components import EnterpriseComponents
+from utils.diagram_parser import (
+    MermaidStreamParser, DIAGRAM_STARTED, DIAGRAM_COMPLETE, EXPLANATION_TEXT
+)
+from utils.config_loader import load_config
+from utils.diagram_layout import DEFAULT_MAX_NODES, OVERVIEW, get_diagram_layout
+from utils.mermaid_ast import validate_and_repair
+from utils.metrics import StageTimer, get_metrics
+from utils.stream_buffer import ResponseBuffer
+from services.service_registry import get_service_registry
+from services.diagram_history import get_diagram_history, is_owner_token, new_owner_token
+from services.diagram_renderer import get_diagram_renderer
+from services.response_cache import get_response_cache
+from services.request_scheduler import get_request_scheduler
+from services.session_store import create_session_store
 
 # Initialize logging
 logger = setup_logging()
 
+# Minimum seconds between live updates of the streamed explanation
+LIVE_RENDER_INTERVAL = 0.1
+
+# Past designs listed per page of the history panel
+HISTORY_PAGE_SIZE = 8
+
+# Query parameter carrying the history owner token of users who are not signed in
+OWNER_PARAM = "owner"
+
 
 class EnterpriseArchitectDashboard:
     """Main dashboard for the Enterprise Architect AI application"""
 
     def __init__(self):
         """Initialize the dashboard"""
-        self.diagram_service = DiagramGenerationService()
+        self.service_registry = get_service_registry()
         self._configure_page()
         self._initialize_session_state()
 
@@ -33,18 +56,42 @@ class EnterpriseArchitectDashboard:
 
     def _initialize_session_state(self):
         """Initialize session state variables"""
-        if "messages" not in st.session_state:
-            st.session_state.messages = []
-        if "current_diagram" not in st.session_state:
-            st.session_state.current_diagram = None
+        # Generations live in the compact session store, not as copies in session state
+        if "session_store" not in st.session_state:
+            st.session_state.session_store = create_session_store(str(uuid.uuid4()))
         if "diagram_id" not in st.session_state:
             st.session_state.diagram_id = str(uuid.uuid4())
         if "diagram_count" not in st.session_state:
             st.session_state.diagram_count = 0
-        if "diagram_explanation" not in st.session_state:
-            st.session_state.diagram_explanation = ""
-        if "raw_response" not in st.session_state:
-            st.session_state.raw_response = ""
+        if "history_owner" not in st.session_state:
+            st.session_state.history_owner = self._history_owner()
+        elif st.session_state.history_owner.startswith("token:"):
+            # Keep the token in the URL so a reload or bookmark finds the same history
+            st.query_params[OWNER_PARAM] = st.session_state.history_owner[len("token:"):]
+
+    @staticmethod
+    def _history_owner():
+        """Key that scopes the design history to the current user
+
+        The signed-in user's email when Streamlit authentication is
+        configured. Otherwise a random token kept in the page URL, so the
+        history survives reloads and can be reopened from a bookmark;
+        anyone with the URL sees that history.
+        """
+        user = getattr(st, "user", None)
+        try:
+            email = user.get("email") if user is not None and user.get("is_logged_in") else None
+        except Exception as e:
+            logger.warning(f"Could not read the signed-in user: {str(e)}")
+            email = None
+        if email:
+            return f"user:{email}"
+
+        token = st.query_params.get(OWNER_PARAM)
+        if not is_owner_token(token):
+            token = new_owner_token()
+            st.query_params[OWNER_PARAM] = token
+        return f"token:{token}"
 
     def _create_sidebar(self):
         """Create the sidebar with settings"""
@@ -68,17 +115,25 @@ class EnterpriseArchitectDashboard:
             st.subheader("Diagram Settings")
             diagram_height = st.slider("Diagram Height", 200, 800, 400, 50)
             show_controls = st.checkbox("Show Diagram Controls", value=True)
+            default_max_nodes = load_config().get("ui", {}).get("diagram", {}).get("max_nodes", DEFAULT_MAX_NODES)
+            max_nodes = st.slider("Max Nodes per View", 10, 200, default_max_nodes, 10)
+
+            self._show_session_panel()
+            self._show_history_panel()
 
             # Debug options
             st.subheader("Debug Options")
             show_raw_response = st.checkbox("Show Raw Response", value=False)
+            show_timings = st.checkbox("Show Stage Timings", value=False)
 
             return {
                 "agent_type": agent_type,
                 "model": model,
                 "diagram_height": diagram_height,
                 "show_controls": show_controls,
-                "show_raw_response": show_raw_response
+                "max_nodes": max_nodes,
+                "show_raw_response": show_raw_response,
+                "show_timings": show_timings
             }
 
     def render(self):
@@ -89,7 +144,7 @@ class EnterpriseArchitectDashboard:
         settings = self._create_sidebar()
 
         # Add project description
-        add_project_description()
+        EnterpriseComponents.add_project_description()
 
         # Chat input
         user_input = st.text_area(
@@ -107,9 +162,12 @@ class EnterpriseArchitectDashboard:
 
         # Add example prompts and footer
         st.markdown("---")
-        enhance_example_prompts()
+        EnterpriseComponents.enhance_example_prompts()
         add_professional_footer()
 
+        # The page is painted; build the service in the background before the first generation
+        self.service_registry.prewarm_diagram_service()
+
     def _handle_generation(self, user_input, settings):
         """Handle diagram generation"""
         if not user_input:
@@ -119,16 +177,10 @@ class EnterpriseArchitectDashboard:
         with st.spinner("Generating Architecture Design..."):
             logger.info(f"Processing user request: {user_input[:100]}...")
 
-            # Reset session state
-            st.session_state.messages = []
-            st.session_state.current_diagram = None
+            # Start a new diagram; earlier generations stay in the session store
             st.session_state.diagram_id = str(uuid.uuid4())
             st.session_state.diagram_count = 0
-            st.session_state.diagram_explanation = ""
-            st.session_state.raw_response = ""
-
-            # Add user message
-            st.session_state.messages.append({"role": "user", "content": user_input})
+            st.session_state.history_entry = None
 
             try:
                 # Generate diagram
@@ -138,91 +190,428 @@ class EnterpriseArchitectDashboard:
                 st.error(f"Error generating architecture: {str(e)}")
 
     def _generate_and_display_diagram(self, user_input, settings):
-        """Generate and display diagram"""
+        """Generate and display diagram, rendering partial output as it streams"""
         # Create containers
-        response_container = st.container()
         diagram_container = st.container()
+        response_container = st.container()
         debug_container = st.container()
 
-        # Generate diagram
-        response_stream = self.diagram_service.generate(
-            user_input,
-            model=settings["model"]
-        )
-
-        full_response = ""
         with response_container:
-            for response in response_stream:
-                if response.content:
-                    full_response += response.content
-                    st.session_state.raw_response = full_response
-
-            # Process response
-            self._process_diagram_response(
-                full_response,
-                diagram_container,
-                debug_container,
-                settings
-            )
+            explanation_placeholder = st.empty()
 
-    def _process_diagram_response(self, response, diagram_container, debug_container, settings):
-        """Process diagram response"""
-        # Extract diagram code
-        diagram_code = extract_mermaid_code(response)
-
-        if diagram_code:
-            # Repair if needed
-            if len(diagram_code.splitlines()) <= 2:
-                diagram_code = repair_mermaid_code(diagram_code)
+        # Generate diagram with the shared service; the model is chosen per request
+        timer = StageTimer({"model": settings["model"]})
+        with timer.stage("service"):
+            diagram_service = self.service_registry.get_diagram_service()
+        response_stream = diagram_service.generate(
+            user_input,
+            model=settings["model"],
+            timer=timer
+        )
 
-            st.session_state.current_diagram = diagram_code
-            st.session_state.diagram_count += 1
+        buffer = ResponseBuffer()
+        explanation = ResponseBuffer()
+        parser = MermaidStreamParser()
+        diagram_code = None
+        invalid_diagram = None
+        last_render = 0.0
+
+        with diagram_container:
+            diagram_status = st.empty()
+
+        for response in response_stream:
+            if not response.content:
+                continue
+            buffer.append(response.content)
+
+            with timer.stage("extraction"):
+                events = parser.push(response.content)
+            for event in events:
+                if event.kind == EXPLANATION_TEXT:
+                    explanation.append(event.text)
+                elif diagram_code is None and event.kind == DIAGRAM_STARTED:
+                    diagram_status.info("Receiving architecture diagram...")
+                elif diagram_code is None and event.kind == DIAGRAM_COMPLETE and event.text:
+                    # Validate before sending anything to the browser; auto-repair is cheap
+                    with timer.stage("validation"):
+                        code, diagram = validate_and_repair(event.text)
+                    if diagram.is_valid:
+                        # Show the diagram as soon as its closing fence has arrived
+                        diagram_status.empty()
+                        diagram_code = self._show_diagram(code, diagram_container, settings, timer)
+                    elif invalid_diagram is None:
+                        invalid_diagram = code
+
+            # Throttle partial explanation updates to keep websocket traffic low
+            now = time.monotonic()
+            if now - last_render >= LIVE_RENDER_INTERVAL:
+                partial = explanation.getvalue().strip()
+                if partial:
+                    explanation_placeholder.markdown(partial + " ▌")
+                last_render = now
+
+        with timer.stage("extraction"):
+            events = parser.close()
+        for event in events:
+            if event.kind == EXPLANATION_TEXT:
+                explanation.append(event.text)
+        # Only a diagram that auto-repair could not fix costs another model call
+        if diagram_code is None and invalid_diagram is not None:
+            diagram_status.info("The diagram has syntax errors, asking the model to correct them...")
+            with timer.stage("reprompt"):
+                code, diagram = diagram_service.validate_diagram(invalid_diagram, model=settings["model"])
+            diagram_status.empty()
+            if diagram.is_valid:
+                diagram_code = self._show_diagram(code, diagram_container, settings, timer)
+            else:
+                self._show_invalid_diagram(code, diagram, diagram_container)
+        diagram_status.empty()
+
+        timer.finish()
+        # Keep one compressed copy of the response; diagram and explanation are offsets into it
+        st.session_state.session_store.add(
+            user_input, buffer.getvalue(), diagram_code=diagram_code, timings=timer.as_dict()
+        )
+        history = get_diagram_history()
+        if history and diagram_code:
+            try:
+                history.add(st.session_state.history_owner, user_input, settings["model"], diagram_code,
+                            explanation.getvalue().strip(), timer.as_dict())
+            except sqlite3.Error as e:
+                logger.warning(f"Could not save the diagram to history: {str(e)}")
+
+        # Process response
+        self._process_diagram_response(
+            diagram_code,
+            explanation.getvalue().strip(),
+            explanation_placeholder,
+            debug_container,
+            settings
+        )
 
-            # Display diagram
-            with diagram_container:
-                st.subheader("Generated Architecture")
-                try:
+    def _show_diagram(self, diagram_code, diagram_container, settings, timer):
+        """Store and render a validated diagram
+
+        Args:
+            diagram_code: Validated Mermaid code
+            diagram_container: Container to render the diagram in
+            settings: Sidebar settings
+            timer: StageTimer for the render stage
+
+        Returns:
+            str: The diagram code
+        """
+        st.session_state.diagram_count += 1
+
+        # Large diagrams are first shown as an overview of folded groups
+        with timer.stage("layout"):
+            layout = get_diagram_layout(diagram_code, settings["max_nodes"])
+            view_code = layout.overview() if layout else diagram_code
+
+        # Lay the diagram out on the server in the background, so reruns can serve the SVG
+        renderer = get_diagram_renderer()
+        if renderer:
+            renderer.prerender(view_code)
+
+        # Display diagram; the component is imported on first use to keep cold start fast
+        from streamlit_mermaid import st_mermaid
+
+        with diagram_container:
+            st.subheader("Generated Architecture")
+            if layout:
+                st.caption(f"Overview of {len(layout.diagram.nodes)} nodes; "
+                           "open a group below the diagram to see its details")
+            try:
+                with timer.stage("render"):
                     st_mermaid(
-                        diagram_code,
+                        view_code,
                         height=settings["diagram_height"],
                         show_controls=settings["show_controls"],
                         key=f"mermaid_{st.session_state.diagram_id}_{st.session_state.diagram_count}"
                     )
-                except Exception as e:
-                    st.error(f"Error rendering diagram: {str(e)}")
-                    st.code(diagram_code, language="mermaid")
-
-            # Extract explanation
-            import re
-            explanation = re.sub(r'```mermaid\n.*?\n```', '', response, flags=re.DOTALL).strip()
+            except Exception as e:
+                st.error(f"Error rendering diagram: {str(e)}")
+                st.code(diagram_code, language="mermaid")
+
+        return diagram_code
+
+    def _show_invalid_diagram(self, diagram_code, diagram, diagram_container):
+        """Show the code and errors of a diagram that could not be repaired"""
+        with diagram_container:
+            st.subheader("Generated Architecture")
+            st.warning("The model returned a diagram with syntax errors:\n\n" +
+                       "\n".join(f"- {error}" for error in diagram.errors))
+            st.code(diagram_code, language="mermaid")
+
+    def _process_diagram_response(self, diagram_code, explanation, explanation_placeholder,
+                                  debug_container, settings):
+        """Process the completed diagram response"""
+        if diagram_code:
             if explanation:
-                st.session_state.diagram_explanation = explanation
-                st.subheader("Architecture Explanation")
-                st.markdown(explanation)
+                with explanation_placeholder.container():
+                    st.subheader("Architecture Explanation")
+                    st.markdown(explanation)
+            else:
+                explanation_placeholder.empty()
         else:
+            explanation_placeholder.empty()
+            logger.error("No mermaid code found in response")
             st.warning("Could not extract a valid diagram from the response.")
 
         # Show raw response if enabled
+        session_store = st.session_state.session_store
+        generation = session_store.current
         with debug_container:
-            if settings["show_raw_response"] and st.session_state.raw_response:
+            if settings["show_raw_response"] and generation and generation.response:
                 st.subheader("Raw Model Response (Debug)")
-                st.text_area("Response", st.session_state.raw_response, height=200, disabled=True)
+                st.text_area("Response", generation.response, height=200, disabled=True)
+
+                stats = self.service_registry.get_stats()
+                st.caption(
+                    f"Service cache: {stats['hits']} hits, {stats['misses']} builds "
+                    f"({stats['hit_rate']:.0%} hit rate), "
+                    f"avg build {stats['avg_build_seconds'] * 1000:.0f} ms"
+                )
+
+                response_cache = get_response_cache()
+                if response_cache:
+                    cache_stats = response_cache.get_stats()
+                    st.caption(
+                        f"Response cache: {cache_stats['memory_hits']} memory hits, "
+                        f"{cache_stats['disk_hits']} disk hits, {cache_stats['misses']} misses "
+                        f"({cache_stats['hit_rate']:.0%} hit rate)"
+                    )
+
+                semantic_cache = self.service_registry.get_diagram_service().semantic_cache
+                if semantic_cache:
+                    semantic_stats = semantic_cache.get_stats()
+                    st.caption(
+                        f"Semantic cache: {semantic_stats['hits']} hits, {semantic_stats['misses']} misses "
+                        f"({semantic_stats['hit_rate']:.0%} hit rate, threshold {semantic_stats['threshold']:.2f}), "
+                        f"{semantic_stats['near_misses']} near misses, {semantic_stats['entries']} entries"
+                    )
+
+                hedger = self.service_registry.get_diagram_service().hedger
+                if hedger:
+                    hedge_stats = hedger.get_stats()
+                    st.caption(
+                        f"Hedging: {hedge_stats['hedges']} of {hedge_stats['requests']} requests hedged "
+                        f"({hedge_stats['hedge_rate']:.0%}), hedge won {hedge_stats['hedge_wins']} "
+                        f"({hedge_stats['hedge_win_rate']:.0%})"
+                    )
+
+                coalescer = self.service_registry.get_diagram_service().coalescer
+                if coalescer:
+                    coalesce_stats = coalescer.get_stats()
+                    st.caption(
+                        f"Coalescing: {coalesce_stats['joins']} requests joined "
+                        f"{coalesce_stats['flights']} upstream streams "
+                        f"({coalesce_stats['coalesced_rate']:.0%}), {coalesce_stats['active']} in flight"
+                    )
+
+                scheduler = get_request_scheduler()
+                if scheduler:
+                    scheduler_stats = scheduler.get_stats()
+                    st.caption(
+                        f"Scheduler: {scheduler_stats['admitted']} calls admitted, "
+                        f"{scheduler_stats['queued']} queued, {scheduler_stats['timeouts']} timed out, "
+                        f"p95 wait {scheduler_stats['p95_wait_seconds']:.2f}s"
+                    )
+
+                renderer = get_diagram_renderer()
+                if renderer:
+                    render_stats = renderer.get_stats()
+                    st.caption(
+                        f"SVG cache: {render_stats['hits']} hits, {render_stats['misses']} misses, "
+                        f"{render_stats['renders']} renders "
+                        f"(avg {render_stats['avg_render_seconds'] * 1000:.0f} ms), "
+                        f"{render_stats['failures']} failed"
+                    )
+
+                store_stats = session_store.get_stats()
+                st.caption(
+                    f"Session store: {store_stats['memory_entries']} generations in memory "
+                    f"({store_stats['memory_bytes'] / 1024:.1f} KB), {store_stats['spilled']} spilled, "
+                    f"{store_stats['dropped']} dropped, {store_stats['compression_ratio']:.1f}x compression"
+                )
+
+            if settings["show_timings"] and generation and generation.timings:
+                self._show_stage_timings(generation.timings, settings["model"])
+
+    def _show_stage_timings(self, timings, model):
+        """Show the latest per-stage breakdown next to recent percentiles
+
+        Args:
+            timings: Stage name to seconds (plus tokens_per_second) from a StageTimer
+            model: Model the timings were recorded for
+        """
+        st.subheader("Stage Timings (Debug)")
+        summaries = {}
+        metrics = get_metrics()
+        if hasattr(metrics, "summary"):
+            for label, summary in metrics.summary("generation_stage_seconds").items():
+                labels = dict(part.split("=", 1) for part in label.split(","))
+                if labels.get("model") == model:
+                    summaries[labels.get("stage")] = summary
+
+        rows = []
+        for stage, seconds in timings.items():
+            if stage == "tokens_per_second":
+                continue
+            summary = summaries.get(stage, {})
+            rows.append({
+                "Stage": stage,
+                "Latest (ms)": round(seconds * 1000, 1),
+                "p50 (ms)": round(summary.get("p50", 0.0) * 1000, 1),
+                "p95 (ms)": round(summary.get("p95", 0.0) * 1000, 1),
+            })
+        st.table(rows)
+        if "tokens_per_second" in timings:
+            st.caption(f"Throughput: {timings['tokens_per_second']:.0f} tokens/sec (estimated)")
 
     def _display_current_diagram(self, settings):
         """Display current diagram if it exists"""
-        if st.session_state.current_diagram:
+        # A design reopened from history replaces the latest generation until the next one
+        generation = st.session_state.get("history_entry") or st.session_state.session_store.current
+        if generation and generation.diagram:
             st.subheader("Current Architecture Design")
-            try:
-                st_mermaid(
-                    st.session_state.current_diagram,
+            if generation is st.session_state.get("history_entry"):
+                created = time.strftime('%Y-%m-%d %H:%M', time.localtime(generation.created_at))
+                if hasattr(generation, "model"):
+                    st.caption(f"Reopened from history: {generation.model}, {created}")
+                else:
+                    st.caption(f"Reopened from this session: {created}")
+            view_code = self._select_diagram_view(generation.diagram, settings)
+
+            # Serve the pre-rendered SVG when it is ready; the browser then skips mermaid.js layout
+            renderer = get_diagram_renderer()
+            svg = renderer.get(view_code) if renderer else None
+            if svg:
+                components.html(
+                    f'<div style="overflow:auto">{svg}</div>',
                     height=settings["diagram_height"],
-                    show_controls=settings["show_controls"],
-                    key=f"current_mermaid_{st.session_state.diagram_id}"
+                    scrolling=True
                 )
-            except Exception as e:
-                st.error(f"Error rendering current diagram: {str(e)}")
-                st.code(st.session_state.current_diagram, language="mermaid")
+            else:
+                if renderer:
+                    renderer.prerender(view_code)
+                self._render_in_browser(view_code, settings)
 
-            if st.session_state.diagram_explanation:
+            explanation = generation.explanation
+            if explanation:
                 st.subheader("Architecture Explanation")
-                st.markdown(st.session_state.diagram_explanation)
\ No newline at end of file
+                st.markdown(explanation)
+
+    def _show_session_panel(self):
+        """List this session's earlier generations in the sidebar
+
+        Titles come from the session store without decompressing anything;
+        opening one reads it from memory or the spill file.
+        """
+        session_store = st.session_state.session_store
+        current = session_store.current
+        earlier = [item for item in session_store.list_generations() if not current or item[0] != current.id]
+        if not earlier:
+            return
+
+        st.subheader("This Session")
+        for generation_id, created_at, title in earlier:
+            created = time.strftime("%H:%M", time.localtime(created_at))
+            if st.button(f"{title} ({created})", key=f"session_{generation_id}", use_container_width=True):
+                try:
+                    generation = session_store.get(generation_id)
+                except sqlite3.Error as e:
+                    logger.warning(f"Could not load generation {generation_id}: {str(e)}")
+                    generation = None
+                if generation:
+                    st.session_state.history_entry = generation
+                    st.session_state.diagram_id = str(uuid.uuid4())
+
+    def _show_history_panel(self):
+        """List past designs in the sidebar, newest first, with search and paging
+
+        Only titles are loaded per page; a design's diagram is read when it is
+        opened, and opening it makes no model call.
+        """
+        history = get_diagram_history()
+        if not history:
+            return
+
+        st.subheader("Design History")
+        query = st.text_input("Search History", placeholder="e.g. kafka pipeline", key="history_query")
+        # Cursors of the pages up to the current one; a new search starts again at the first page
+        if st.session_state.get("history_cursors_query") != query:
+            st.session_state.history_cursors = [None]
+            st.session_state.history_cursors_query = query
+        cursors = st.session_state.history_cursors
+
+        try:
+            page, next_cursor = history.list_page(st.session_state.history_owner, query,
+                                                  before=cursors[-1], limit=HISTORY_PAGE_SIZE)
+        except sqlite3.Error as e:
+            logger.warning(f"Could not list the diagram history: {str(e)}")
+            st.caption("History is unavailable")
+            return
+        if not page:
+            st.caption("No matching designs" if query else "No saved designs yet")
+
+        for summary in page:
+            created = time.strftime("%b %d %H:%M", time.localtime(summary.created_at))
+            if st.button(f"{summary.title} ({created})", key=f"history_{summary.id}", use_container_width=True):
+                entry = history.get(st.session_state.history_owner, summary.id)
+                if entry:
+                    st.session_state.history_entry = entry
+                    st.session_state.diagram_id = str(uuid.uuid4())
+
+        newer, older = st.columns(2)
+        if newer.button("Newer", disabled=len(cursors) == 1, key="history_newer"):
+            cursors.pop()
+            st.rerun()
+        if older.button("Older", disabled=next_cursor is None, key="history_older"):
+            cursors.append(next_cursor)
+            st.rerun()
+
+    def _select_diagram_view(self, diagram_code, settings):
+        """Let the user pick the overview or one group of a large diagram
+
+        Args:
+            diagram_code: Validated Mermaid code of the current diagram
+            settings: Sidebar settings
+
+        Returns:
+            str: Mermaid code of the selected view
+        """
+        layout = get_diagram_layout(diagram_code, settings["max_nodes"])
+        if not layout:
+            return diagram_code
+
+        clusters = {cluster_id: (title, size, depth) for cluster_id, title, size, depth in layout.list_clusters()}
+
+        def format_view(cluster_id):
+            if cluster_id is OVERVIEW:
+                return f"Overview ({len(layout.diagram.nodes)} nodes)"
+            title, size, depth = clusters[cluster_id]
+            return f"{'— ' * depth}{title} ({size} nodes)"
+
+        selected = st.selectbox(
+            "Diagram View",
+            [OVERVIEW] + list(clusters),
+            format_func=format_view,
+            key=f"diagram_view_{st.session_state.diagram_id}"
+        )
+        return layout.detail(selected)
+
+    def _render_in_browser(self, view_code, settings):
+        """Render a view of the current diagram with mermaid.js in the browser"""
+        from streamlit_mermaid import st_mermaid
+
+        try:
+            st_mermaid(
+                view_code,
+                height=settings["diagram_height"],
+                show_controls=settings["show_controls"],
+                key=f"current_mermaid_{st.session_state.diagram_id}"
+            )
+        except Exception as e:
+            st.error(f"Error rendering current diagram: {str(e)}")
+            st.code(view_code, language="mermaid")
@@ -0,0 +1,31 @@
+import inspect
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+async def astream_agent_run(agent, message):
+    """Stream an agent run on the event loop
+
+    Wraps ``agent.arun(message, stream=True)``, which depending on the agno
+    version returns either an async iterator or an awaitable resolving to
+    one. The upstream iterator is closed when the consumer stops early, so a
+    client disconnect cancels the model request.
+
+    Args:
+        agent: The agno agent
+        message: The message to run
+
+    Yields:
+        RunResponse: Streamed response chunks
+    """
+    stream = agent.arun(message, stream=True)
+    if inspect.isawaitable(stream):
+        stream = await stream
+    try:
+        async for chunk in stream:
+            yield chunk
+    finally:
+        aclose = getattr(stream, "aclose", None)
+        if aclose:
+            await aclose()
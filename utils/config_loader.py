@@ -0,0 +1,55 @@
+import os
+import threading
+import logging
+import yaml
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONFIG_PATH = "config/settings.yaml"
+
+_lock = threading.Lock()
+_config_cache = {}
+
+
+def get_config_mtime(config_path=DEFAULT_CONFIG_PATH):
+    """Get the modification time of a configuration file
+
+    Args:
+        config_path: Path to configuration file
+
+    Returns:
+        float: Modification time, or 0.0 if the file does not exist
+    """
+    try:
+        return os.path.getmtime(config_path)
+    except OSError:
+        return 0.0
+
+
+def load_config(config_path=DEFAULT_CONFIG_PATH):
+    """Load YAML configuration, re-parsing only when the file changes
+
+    The parsed dictionary is shared between callers and must be treated
+    as read-only.
+
+    Args:
+        config_path: Path to configuration file
+
+    Returns:
+        Dict: Parsed configuration
+    """
+    mtime = get_config_mtime(config_path)
+
+    with _lock:
+        cached = _config_cache.get(config_path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+
+    with open(config_path, 'r') as file:
+        config = yaml.safe_load(file) or {}
+
+    with _lock:
+        _config_cache[config_path] = (mtime, config)
+
+    logger.info(f"Loaded configuration from {config_path}")
+    return config
@@ -0,0 +1,442 @@
+import hashlib
+import logging
+import threading
+from collections import Counter, OrderedDict, deque
+
+from utils.mermaid_ast import parse_mermaid
+from utils.mermaid_lexer import FLOWCHART
+
+logger = logging.getLogger(__name__)
+
+# Nodes shown at once when no limit is configured
+DEFAULT_MAX_NODES = 40
+
+# Label propagation rounds when detecting clusters in graphs without subgraphs
+PROPAGATION_ROUNDS = 10
+
+OVERVIEW = None
+
+# Layouts kept in memory for the whole process, shared by every session
+LAYOUT_CACHE_ENTRIES = 16
+
+_layouts: "OrderedDict[tuple, object]" = OrderedDict()
+_layouts_lock = threading.Lock()
+
+
+class Cluster:
+    """A group of nodes that can be folded into one summary node
+
+    Clusters come from subgraphs or, for flat graphs, from label
+    propagation over the links. ``nodes`` includes the nodes of nested
+    clusters.
+    """
+
+    def __init__(self, id, title, nodes, children=None):
+        self.id = id
+        self.title = title
+        self.nodes = nodes
+        self.children = children or []
+
+    def __repr__(self):
+        return f"Cluster({self.id!r}, {self.title!r}, nodes={len(self.nodes)})"
+
+
+class DiagramLayout:
+    """Level-of-detail views of a large flowchart
+
+    The overview folds clusters into summary nodes until at most max_nodes
+    nodes are visible; detail() drills into one cluster, showing its nodes
+    and folding everything outside it. Links between folded groups are
+    merged and labelled with their count.
+    """
+
+    def __init__(self, diagram, max_nodes=DEFAULT_MAX_NODES):
+        """Build the cluster hierarchy of a parsed diagram
+
+        Args:
+            diagram: MermaidDiagram from utils.mermaid_ast.parse_mermaid
+            max_nodes: Maximum nodes (including summary nodes) in one view
+        """
+        self.diagram = diagram
+        self.max_nodes = max(3, max_nodes)
+        # Inside a drill-down view one node is kept for the rest of the diagram
+        self.capacity = self.max_nodes - 1
+        self.direction = _direction(diagram.header)
+        self.node_order = {node_id: index for index, node_id in enumerate(diagram.nodes)}
+
+        self.neighbors = {node_id: set() for node_id in diagram.nodes}
+        for edge in diagram.edges:
+            self.neighbors[edge.source].add(edge.target)
+            self.neighbors[edge.target].add(edge.source)
+
+        self.clusters = self._from_subgraphs(diagram.subgraphs, "")
+        self._index = {}
+        self._detected = False
+
+    @property
+    def needs_collapse(self):
+        """Whether the full diagram has more nodes than one view may show"""
+        return self.diagram.diagram_type == FLOWCHART and len(self.diagram.nodes) > self.max_nodes
+
+    def list_clusters(self):
+        """Clusters available for drill-down, parents before children
+
+        Returns:
+            List[Tuple[str, str, int, int]]: (cluster id, title, node count, depth)
+        """
+        self._detect_all()
+        return [(cluster.id, cluster.title, len(cluster.nodes), cluster.id.count("."))
+                for cluster in self._walk(self.clusters)]
+
+    def overview(self):
+        """Mermaid code of the whole diagram folded to at most max_nodes nodes
+
+        Returns:
+            str: Mermaid code; the original code when no folding is needed
+        """
+        if not self.needs_collapse:
+            return self.diagram.to_code()
+        self._detect_all()
+        return self._render(list(self.diagram.nodes), self.clusters, outside={})
+
+    def detail(self, cluster_id):
+        """Mermaid code of one cluster, with the rest of the diagram folded
+
+        Args:
+            cluster_id: Cluster id from list_clusters(), or OVERVIEW
+
+        Returns:
+            str: Mermaid code
+        """
+        if cluster_id is OVERVIEW:
+            return self.overview()
+        self._detect_all()
+        cluster = self._index.get(cluster_id)
+        if cluster is None:
+            raise ValueError(f"Unknown cluster {cluster_id}")
+
+        ancestors = []
+        parts = cluster.id.split(".")
+        for depth in range(1, len(parts)):
+            ancestors.append(self._index[".".join(parts[:depth])])
+
+        # Linked nodes outside the cluster are shown as the nearest group that
+        # does not contain the cluster, or as themselves at the top level
+        outside = {}
+        for node_id in cluster.nodes:
+            for other in self.neighbors[node_id]:
+                if other not in cluster.nodes and other not in outside:
+                    outside[other] = self._outside_group(other, cluster, ancestors)
+        return self._render(sorted(cluster.nodes, key=self.node_order.get), cluster.children, outside)
+
+    def _outside_group(self, node_id, cluster, ancestors):
+        container = None
+        for ancestor in ancestors:
+            if node_id in ancestor.nodes:
+                container = ancestor
+        for group in (container.children if container else self.clusters):
+            if node_id in group.nodes:
+                return group.id, group.title, len(group.nodes)
+        if container:
+            return container.id, f"Rest of {container.title}", len(container.nodes) - len(cluster.nodes)
+        return None
+
+    def _from_subgraphs(self, subgraphs, prefix):
+        """Clusters of the subgraphs that contain nodes; empty ones have nothing to show"""
+        clusters = []
+        for subgraph in subgraphs:
+            cluster_id = f"{prefix}{len(clusters) + 1}"
+            children = self._from_subgraphs(subgraph.subgraphs, f"{cluster_id}.")
+            nodes = set(subgraph.nodes)
+            for child in children:
+                nodes |= child.nodes
+            if nodes:
+                clusters.append(Cluster(cluster_id, _subgraph_title(subgraph) or f"Group {cluster_id}",
+                                        nodes, children))
+        return clusters
+
+    @staticmethod
+    def _walk(clusters):
+        stack = list(reversed(clusters))
+        while stack:
+            cluster = stack.pop()
+            yield cluster
+            stack.extend(reversed(cluster.children))
+
+    def _detect_all(self):
+        """Index the clusters, detecting extra ones wherever a view would exceed the limit"""
+        if self._detected:
+            return
+        self._detected = True
+        self.clusters.extend(self._detect_loose(self.diagram.nodes, self.clusters, "", self.max_nodes))
+        # _walk reads children after yielding, so detected children are visited too
+        for cluster in self._walk(self.clusters):
+            self._index[cluster.id] = cluster
+            if len(cluster.nodes) > self.capacity:
+                cluster.children.extend(
+                    self._detect_loose(cluster.nodes, cluster.children, f"{cluster.id}.", self.capacity))
+
+    def _detect_loose(self, node_ids, children, prefix, limit):
+        """Cluster the nodes not in any child when they would not fit in one view"""
+        clustered = set()
+        for child in children:
+            clustered |= child.nodes
+        loose = sorted((node_id for node_id in node_ids if node_id not in clustered), key=self.node_order.get)
+        if len(loose) + len(children) <= limit:
+            return []
+        clusters = self._detect(loose, prefix, len(children) + 1)
+        logger.debug(f"Detected {len(clusters)} clusters among {len(loose)} nodes")
+        return clusters
+
+    def _detect(self, node_ids, prefix, first_index):
+        """Partition nodes into clusters that fit a drill-down view by label propagation
+
+        Args:
+            node_ids: Nodes to partition, in declaration order
+            prefix: Id prefix of the new clusters, e.g. "2." for children of cluster 2
+            first_index: Index of the first new cluster
+
+        Returns:
+            List[Cluster]: Detected clusters, largest first
+        """
+        members = set(node_ids)
+        labels = {node_id: self.node_order[node_id] for node_id in node_ids}
+        for _ in range(PROPAGATION_ROUNDS):
+            changed = False
+            for node_id in node_ids:
+                counts = Counter(labels[other] for other in self.neighbors[node_id] if other in members)
+                if not counts:
+                    continue
+                # Most common neighbour label, ties broken towards the earliest node
+                best = min(counts.items(), key=lambda item: (-item[1], item[0]))[0]
+                if best != labels[node_id]:
+                    labels[node_id] = best
+                    changed = True
+            if not changed:
+                break
+
+        groups = {}
+        for node_id in node_ids:
+            groups.setdefault(labels[node_id], []).append(node_id)
+        self._merge_small(groups, labels, members)
+
+        # Split oversized groups in breadth-first order, so each piece stays connected
+        pieces = []
+        for group in groups.values():
+            pieces.extend(self._split(group) if len(group) > self.capacity else [group])
+        pieces.sort(key=lambda piece: (-len(piece), self.node_order[piece[0]]))
+
+        clusters = []
+        for index, piece in enumerate(pieces, first_index):
+            hub = max(piece, key=lambda node_id: (len(self.neighbors[node_id]), -self.node_order[node_id]))
+            label = self.diagram.nodes[hub].label or hub
+            title = f"{label} and {len(piece) - 1} more" if len(piece) > 1 else label
+            clusters.append(Cluster(f"{prefix}{index}", title, set(piece)))
+        return clusters
+
+    def _merge_small(self, groups, labels, members):
+        """Merge small groups into their most linked neighbour group while it has room"""
+        min_size = max(2, self.max_nodes // 4)
+        for label in sorted(groups, key=lambda key: (len(groups[key]), key)):
+            group = groups.get(label)
+            if group is None or len(group) >= min_size:
+                continue
+            links = Counter(labels[other] for node_id in group for other in self.neighbors[node_id]
+                            if other in members and labels[other] != label)
+            for target, _ in sorted(links.items(), key=lambda item: (-item[1], item[0])):
+                if len(groups[target]) + len(group) <= self.capacity:
+                    groups[target].extend(group)
+                    groups[target].sort(key=self.node_order.get)
+                    for node_id in group:
+                        labels[node_id] = target
+                    del groups[label]
+                    break
+
+        # Groups without room or links to merge into are packed together
+        packed = None
+        for label in sorted(groups, key=lambda key: self.node_order[groups[key][0]]):
+            if len(groups[label]) >= min_size:
+                continue
+            if packed is not None and len(groups[packed]) + len(groups[label]) <= self.capacity:
+                groups[packed].extend(groups.pop(label))
+            else:
+                packed = label
+    def _split(self, group):
+        members = set(group)
+        seen = set()
+        ordered = []
+        for start in group:
+            if start in seen:
+                continue
+            seen.add(start)
+            queue = deque([start])
+            while queue:
+                node_id = queue.popleft()
+                ordered.append(node_id)
+                for other in sorted(self.neighbors[node_id] & members, key=self.node_order.get):
+                    if other not in seen:
+                        seen.add(other)
+                        queue.append(other)
+        return [ordered[i:i + self.capacity] for i in range(0, len(ordered), self.capacity)]
+
+    def _render(self, node_ids, clusters, outside):
+        """Render nodes with as few clusters folded as the node limit allows
+
+        Args:
+            node_ids: Nodes of the view, in declaration order
+            clusters: Clusters within the view that may be folded
+            outside: Linked node id outside the view to its (group id, title, size),
+                or None to show the node itself
+        """
+        clustered = set()
+        for cluster in clusters:
+            clustered |= cluster.nodes
+        loose = [node_id for node_id in node_ids if node_id not in clustered]
+        external_groups = sorted({group for group in outside.values() if group})
+        external_nodes = sorted((node_id for node_id, group in outside.items() if group is None),
+                                key=self.node_order.get)
+
+        # Fold the largest clusters first until the view fits
+        visible = len(loose) + len(external_groups) + len(external_nodes) + len(clustered)
+        folded = set()
+        for cluster in sorted(clusters, key=lambda c: -len(c.nodes)):
+            if visible <= self.max_nodes:
+                break
+            folded.add(cluster.id)
+            visible -= len(cluster.nodes) - 1
+
+        # Still too many: merge the smallest folded clusters into one summary
+        overflow = []
+        if visible > self.max_nodes:
+            candidates = sorted((c for c in clusters if c.id in folded), key=lambda c: len(c.nodes))
+            while visible > self.max_nodes and len(candidates) > 1:
+                # The first merged cluster only changes which summary node is shown
+                if overflow:
+                    visible -= 1
+                overflow.append(candidates.pop(0))
+
+        # Still too many: show everything outside the view as one node
+        if visible > self.max_nodes and len(external_groups) + len(external_nodes) > 1:
+            visible -= len(external_groups) + len(external_nodes) - 1
+            external_groups = [("outside", "Rest of the diagram", len(self.diagram.nodes) - len(node_ids))]
+            external_nodes = []
+            outside = dict.fromkeys(outside, external_groups[0])
+
+        owner = {}
+        for cluster in clusters:
+            if cluster.id in folded:
+                summary = "lod_other" if cluster in overflow else self._summary_id(cluster.id)
+                for node_id in cluster.nodes:
+                    owner[node_id] = summary
+        for node_id, group in outside.items():
+            if group:
+                owner[node_id] = self._summary_id(group[0])
+
+        lines = [f"graph {self.direction}"]
+        for cluster in clusters:
+            if cluster.id in folded and cluster not in overflow:
+                lines.append(f"    {self._summary_id(cluster.id)}{_summary_shape(cluster.title, len(cluster.nodes))}")
+        if overflow:
+            size = sum(len(cluster.nodes) for cluster in overflow)
+            lines.append(f"    lod_other{_summary_shape(f'{len(overflow)} smaller groups', size)}")
+        for group_id, title, size in external_groups:
+            lines.append(f"    {self._summary_id(group_id)}{_summary_shape(title, size)}:::external")
+        lines.extend(f"    {self._node_code(node_id)}:::external" for node_id in external_nodes)
+
+        for cluster in clusters:
+            if cluster.id not in folded:
+                lines.append(f"    subgraph {self._summary_id(cluster.id)}[\"{_escape(cluster.title)}\"]")
+                lines.extend(f"        {self._node_code(node_id)}"
+                             for node_id in node_ids if node_id in cluster.nodes)
+                lines.append("    end")
+        lines.extend(f"    {self._node_code(node_id)}" for node_id in loose)
+
+        lines.extend(self._edges(set(node_ids), owner))
+        if outside:
+            lines.append("    classDef external stroke-dasharray: 5 5")
+        logger.debug(f"Rendered view of {len(node_ids)} nodes as {visible} visible nodes")
+        return "\n".join(lines)
+
+    def _edges(self, members, owner):
+        """Links with at least one end in the view; folded links are merged and counted"""
+        merged = {}
+        for edge in self.diagram.edges:
+            if edge.source not in members and edge.target not in members:
+                continue
+            source = owner.get(edge.source, edge.source)
+            target = owner.get(edge.target, edge.target)
+            if source == target:
+                continue
+            merged.setdefault((source, target), []).append(edge)
+
+        lines = []
+        for (source, target), edges in merged.items():
+            if len(edges) == 1 and edges[0].source == source and edges[0].target == target:
+                edge = edges[0]
+                label = f"|{edge.label}|" if edge.label else ""
+                lines.append(f"    {source} {edge.arrow}{label} {target}")
+            else:
+                label = f"|{len(edges)} links|" if len(edges) > 1 else ""
+                lines.append(f"    {source} -->{label} {target}")
+        return lines
+
+    def _node_code(self, node_id):
+        node = self.diagram.nodes[node_id]
+        return f"{node_id}{node.shape}" if node.shape else node_id
+
+    @staticmethod
+    def _summary_id(cluster_id):
+        return "lod_" + cluster_id.replace(".", "_")
+
+
+def _summary_shape(title, size):
+    return f'[["{_escape(title)} ({size} node{"" if size == 1 else "s"})"]]'
+
+
+def _subgraph_title(subgraph):
+    """Display title of a subgraph declared as "id", "id [title]" or "title" """
+    title = subgraph.title or ""
+    if subgraph.id and title.startswith(subgraph.id):
+        title = title[len(subgraph.id):].strip() or subgraph.id
+    if title[:1] in "[(":
+        title = title.strip("[]() ")
+    return title.strip('"') or subgraph.id
+
+
+def _escape(text):
+    return str(text).replace('"', "#quot;")
+
+
+def _direction(header):
+    parts = (header or "").split()
+    return parts[1] if len(parts) > 1 else "TD"
+
+
+def get_diagram_layout(code, max_nodes=DEFAULT_MAX_NODES):
+    """Get the level-of-detail layout of a diagram, reused across reruns
+
+    Layouts live in a small process-wide LRU keyed by a hash of the code,
+    so memory stays bounded however many sessions are open; an evicted
+    layout is rebuilt from the code on the next rerun.
+
+    Args:
+        code: Validated Mermaid code
+        max_nodes: Maximum nodes in one view
+
+    Returns:
+        DiagramLayout: Layout, or None if the diagram fits in one view
+    """
+    key = (hashlib.sha256(code.encode("utf-8")).hexdigest(), max_nodes)
+    with _layouts_lock:
+        if key in _layouts:
+            _layouts.move_to_end(key)
+            return _layouts[key]
+
+    layout = DiagramLayout(parse_mermaid(code), max_nodes)
+    layout = layout if layout.needs_collapse else None
+    with _layouts_lock:
+        _layouts[key] = layout
+        _layouts.move_to_end(key)
+        while len(_layouts) > LAYOUT_CACHE_ENTRIES:
+            _layouts.popitem(last=False)
+    return layout
@@ -1,8 +1,213 @@
-import re
 import logging
+from collections import namedtuple
+
+from utils.mermaid_lexer import repair_mermaid
 
 logger = logging.getLogger(__name__)
 
+FENCE = "```"
+MERMAID_TAG = "mermaid"
+
+# Parser event kinds
+DIAGRAM_STARTED = "diagram_started"
+DIAGRAM_COMPLETE = "diagram_complete"
+EXPLANATION_TEXT = "explanation_text"
+
+ParseEvent = namedtuple("ParseEvent", ["kind", "text"])
+
+
+class MermaidStreamParser:
+    """Push-based state machine that splits a streamed response into events
+
+    Feed chunks as they arrive with ``push``; each call returns the events
+    completed by that chunk:
+
+    - ``DIAGRAM_STARTED`` when a ```mermaid fence opens
+    - ``DIAGRAM_COMPLETE`` with the Mermaid code when the fence closes
+    - ``EXPLANATION_TEXT`` with text outside Mermaid fences
+
+    Work per push is proportional to the chunk size: only a fence that is
+    split across chunks is carried over, never the accumulated response.
+    Responses can contain any number of Mermaid and other fenced blocks;
+    non-Mermaid blocks are passed through as explanation text.
+    """
+
+    _TEXT = 0
+    _DIAGRAM = 1
+    _OTHER_FENCE = 2
+
+    def __init__(self):
+        """Initialize the parser in the text state"""
+        self._state = self._TEXT
+        self._carry = ""
+        self._code_parts = []
+        self.diagram_count = 0
+
+    def push(self, chunk):
+        """Consume the next chunk of the response
+
+        Args:
+            chunk: Text chunk from the model stream
+
+        Returns:
+            List[ParseEvent]: Events completed by this chunk
+        """
+        events = []
+        if not chunk:
+            return events
+
+        buf = self._carry + chunk
+        self._carry = ""
+        pos = 0
+
+        while pos < len(buf):
+            fence = buf.find(FENCE, pos)
+
+            if fence == -1:
+                # Hold back trailing backticks that may begin a fence
+                end = len(buf)
+                while end > pos and end > len(buf) - 2 and buf[end - 1] == "`":
+                    end -= 1
+                self._emit_body(buf[pos:end], events)
+                self._carry = buf[end:]
+                break
+
+            if self._state == self._DIAGRAM:
+                self._code_parts.append(buf[pos:fence])
+                code = "".join(self._code_parts).strip()
+                self._code_parts = []
+                self._state = self._TEXT
+                events.append(ParseEvent(DIAGRAM_COMPLETE, code))
+                pos = fence + len(FENCE)
+                continue
+
+            if self._state == self._OTHER_FENCE:
+                self._emit_text(buf[pos:fence + len(FENCE)], events)
+                self._state = self._TEXT
+                pos = fence + len(FENCE)
+                continue
+
+            # Text state: decide what kind of fence this is
+            info = buf[fence + len(FENCE):fence + len(FENCE) + len(MERMAID_TAG)]
+            if len(info) < len(MERMAID_TAG) and MERMAID_TAG.startswith(info):
+                # Not enough input yet to tell a mermaid fence from another one
+                self._emit_text(buf[pos:fence], events)
+                self._carry = buf[fence:]
+                break
+
+            self._emit_text(buf[pos:fence], events)
+            if info == MERMAID_TAG:
+                self._state = self._DIAGRAM
+                self.diagram_count += 1
+                events.append(ParseEvent(DIAGRAM_STARTED, ""))
+                pos = fence + len(FENCE) + len(MERMAID_TAG)
+            else:
+                self._state = self._OTHER_FENCE
+                self._emit_text(FENCE, events)
+                pos = fence + len(FENCE)
+
+        return events
+
+    def close(self):
+        """Flush buffered input at the end of the stream
+
+        An unterminated Mermaid block is discarded, matching the behaviour of
+        ``extract_mermaid_code``.
+
+        Returns:
+            List[ParseEvent]: Remaining events
+        """
+        events = []
+        if self._state == self._DIAGRAM:
+            logger.warning("Response ended inside an unterminated mermaid block")
+            self._code_parts = []
+        elif self._carry:
+            self._emit_text(self._carry, events)
+        self._carry = ""
+        self._state = self._TEXT
+        return events
+
+    def _emit_body(self, text, events):
+        """Route text to the current block"""
+        if self._state == self._DIAGRAM:
+            if text:
+                self._code_parts.append(text)
+        else:
+            self._emit_text(text, events)
+
+    @staticmethod
+    def _emit_text(text, events):
+        """Emit explanation text, merging with a preceding text event"""
+        if not text:
+            return
+        if events and events[-1].kind == EXPLANATION_TEXT:
+            events[-1] = ParseEvent(EXPLANATION_TEXT, events[-1].text + text)
+        else:
+            events.append(ParseEvent(EXPLANATION_TEXT, text))
+
+
+def parse_mermaid_response(text):
+    """Split a complete response into Mermaid diagrams and explanation
+
+    Args:
+        text: The response text
+
+    Returns:
+        Tuple[List[str], str]: Mermaid code blocks in order, and the
+        explanation text with all Mermaid blocks removed
+    """
+    parser = MermaidStreamParser()
+    diagrams = []
+    explanation_parts = []
+    for event in parser.push(text) + parser.close():
+        if event.kind == DIAGRAM_COMPLETE:
+            diagrams.append(event.text)
+        elif event.kind == EXPLANATION_TEXT:
+            explanation_parts.append(event.text)
+    return diagrams, "".join(explanation_parts).strip()
+
+
+def response_spans(text):
+    """Locate Mermaid code and explanation text in a complete response
+
+    Follows the same rules as MermaidStreamParser, so slicing the response
+    with the spans gives the same diagrams and explanation as
+    parse_mermaid_response without keeping copies of them.
+
+    Args:
+        text: The response text
+
+    Returns:
+        Tuple[List[Tuple[int, int]], List[Tuple[int, int]]]: Unstripped
+        Mermaid code spans, and the explanation spans whose concatenation
+        is the explanation before stripping
+    """
+    code_spans = []
+    text_spans = []
+    pos = 0
+    while True:
+        fence = text.find(FENCE, pos)
+        if fence == -1:
+            text_spans.append((pos, len(text)))
+            break
+        if text.startswith(MERMAID_TAG, fence + len(FENCE)):
+            start = fence + len(FENCE) + len(MERMAID_TAG)
+            end = text.find(FENCE, start)
+            text_spans.append((pos, fence))
+            if end == -1:
+                # An unterminated Mermaid block is discarded
+                break
+            code_spans.append((start, end))
+            pos = end + len(FENCE)
+        else:
+            end = text.find(FENCE, fence + len(FENCE))
+            if end == -1:
+                text_spans.append((pos, len(text)))
+                break
+            text_spans.append((pos, end + len(FENCE)))
+            pos = end + len(FENCE)
+    return code_spans, [span for span in text_spans if span[0] < span[1]]
+
 
 def extract_mermaid_code(text):
     """Extract mermaid code from response text
@@ -11,21 +216,11 @@ def extract_mermaid_code(text):
         text: The response text containing mermaid code
 
     Returns:
-        str: Extracted mermaid code or None if not found
+        str: Extracted mermaid code (the first block) or None if not found
     """
-    # Try standard regex pattern first
-    match = re.search(r'```mermaid\s*(.*?)\s*```', text, re.DOTALL)
-    if match:
-        logger.info("Matched mermaid code with standard pattern")
-        return match.group(1).strip()
-
-    # If no match found with standard pattern, try direct extraction
-    if '```mermaid' in text and '```' in text[text.find('```mermaid') + 10:]:
-        start = text.find('```mermaid') + 10
-        end = text.find('```', start)
-        if start > 10 and end > start:
-            logger.info("Extracted mermaid code using direct string positions")
-            return text[start:end].strip()
+    diagrams, _ = parse_mermaid_response(text)
+    if diagrams:
+        return diagrams[0]
 
     logger.error("No mermaid code found in response")
     return None
@@ -34,6 +229,9 @@ def extract_mermaid_code(text):
 def repair_mermaid_code(code):
     """Repair malformed mermaid code
 
+    Splits statements collapsed onto one line, normalizes arrows and adds a
+    missing diagram header; see utils.mermaid_lexer for the details.
+
     Args:
         code: The mermaid code to repair
 
@@ -43,31 +241,4 @@ def repair_mermaid_code(code):
     if not code:
         return None
 
-    # Check if code is already properly formatted with multiple lines
-    if len(code.splitlines()) > 3:
-        # Fix incorrect arrow syntax -->|text|> to -->|text|
-        repaired = re.sub(r'-->(\|[^|]+\|)>', r'-->\1', code)
-        return repaired
-
-    # Force line breaks between common mermaid elements
-    repaired = code
-    # For flowcharts
-    repaired = re.sub(r'(\w+)-->', r'\n\1-->', repaired)
-    repaired = re.sub(r'(\w+)-.->(\w+)', r'\n\1-.-> \2', repaired)
-    # For sequence diagrams
-    repaired = re.sub(r'(participant\s+\w+)', r'\n\1', repaired)
-    repaired = re.sub(r'(\w+)->>', r'\n\1->>', repaired)
-    # For general graph elements
-    repaired = re.sub(r'(\w+)\[', r'\n\1[', repaired)
-
-    # Fix incorrect arrow syntax -->|text|> to -->|text|
-    repaired = re.sub(r'-->(\|[^|]+\|)>', r'-->\1', repaired)
-
-    # Add proper graph type declaration if missing
-    if not re.match(r'^(graph|sequenceDiagram|classDiagram|gantt|pie|flowchart)', repaired.strip()):
-        if 'participant' in repaired:
-            repaired = "sequenceDiagram\n" + repaired
-        else:
-            repaired = "graph LR\n" + repaired
-
-    return repaired
\ No newline at end of file
+    return repair_mermaid(code)
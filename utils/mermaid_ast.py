@@ -0,0 +1,441 @@
+import logging
+from collections import namedtuple
+
+from utils.mermaid_lexer import (
+    FLOWCHART, SEQUENCE, CLASS, GANTT, PIE,
+    FLOWCHART_DIRECTIONS, FLOWCHART_KEYWORDS, CLASS_KEYWORDS, GANTT_KEYWORDS,
+    PLAIN, OPEN, CLOSE, HEADER,
+    ARROW, AMP, ANNOTATION, CLASSREF, COLON, COMMENT, LABEL, OTHER, SHAPE, STRAY, STRING, WORD,
+    format_statements, split_statements, tokenize,
+)
+
+logger = logging.getLogger(__name__)
+
+Node = namedtuple("Node", ["id", "label", "shape"])
+Edge = namedtuple("Edge", ["source", "target", "arrow", "label"])
+Participant = namedtuple("Participant", ["id", "alias", "kind"])
+
+# A problem found on a line of the formatted code. fix is the replacement
+# statement, "" to delete the statement, or None when it cannot be fixed
+# without the model.
+Issue = namedtuple("Issue", ["line", "message", "fix"])
+
+# Characters that, left over after tokenizing, mean a bracket or quote was not closed
+_UNBALANCED = set("[](){}|\"")
+
+# Middle keywords of sequence blocks and the block they belong to
+_SEQUENCE_MIDDLES = {"else": "alt", "and": "par", "option": "critical"}
+
+
+class Subgraph:
+    """A flowchart subgraph and the nodes declared inside it"""
+
+    def __init__(self, id, title, parent=None):
+        self.id = id
+        self.title = title
+        self.parent = parent
+        self.nodes = []
+        self.subgraphs = []
+
+    def __repr__(self):
+        return f"Subgraph({self.id!r}, nodes={len(self.nodes)}, subgraphs={len(self.subgraphs)})"
+
+
+class MermaidDiagram:
+    """Typed graph AST of a Mermaid diagram
+
+    Nodes are flowchart nodes, classes, gantt tasks or pie slices; edges
+    are flowchart links, sequence messages or class relations.
+    """
+
+    def __init__(self, diagram_type, header=None):
+        self.diagram_type = diagram_type
+        self.header = header
+        self.nodes = {}
+        self.edges = []
+        self.subgraphs = []
+        self.participants = {}
+        self.issues = []
+        self.statements = []
+
+    @property
+    def is_valid(self):
+        return not self.issues
+
+    @property
+    def errors(self):
+        """Human-readable issues, e.g. for a re-prompt"""
+        return [f"line {issue.line}: {issue.message}" for issue in self.issues]
+
+    def add_node(self, id, label=None, shape=None, subgraph=None):
+        node = self.nodes.get(id)
+        if node is None or (label is not None and node.label is None):
+            self.nodes[id] = Node(id, label, shape)
+            if node is None and subgraph is not None:
+                subgraph.nodes.append(id)
+        return self.nodes[id]
+
+    def to_code(self):
+        """Render the diagram's statements as formatted Mermaid code"""
+        return format_statements(self.statements)
+
+
+def parse_mermaid(code):
+    """Parse Mermaid code into a MermaidDiagram and validate it
+
+    The code is normalized by the lexer first, so line numbers in issues
+    refer to the formatted code (see MermaidDiagram.to_code()).
+
+    Args:
+        code: Mermaid code
+
+    Returns:
+        MermaidDiagram: The AST; diagram_type is None for diagram types that
+        are not validated, which are always considered valid
+    """
+    diagram_type, statements = split_statements(code or "")
+    diagram = MermaidDiagram(diagram_type)
+    if diagram_type is None:
+        diagram.statements = [(line, HEADER) for line in (code or "").strip().splitlines()]
+        return diagram
+
+    diagram.statements = statements
+    _PARSERS[diagram_type](diagram, statements)
+    return diagram
+
+
+def validate_and_repair(code):
+    """Validate Mermaid code, applying cheap fixes where possible
+
+    Issues with a known fix (unclosed or stray blocks, dangling arrows, the
+    reserved node id ``end``) are fixed in place and the result is parsed
+    again. Whatever is left can only be fixed by the model.
+
+    Args:
+        code: Mermaid code
+
+    Returns:
+        Tuple[str, MermaidDiagram]: Formatted code and its AST
+    """
+    diagram = parse_mermaid(code)
+    if diagram.is_valid or not any(issue.fix is not None for issue in diagram.issues):
+        return diagram.to_code(), diagram
+
+    fixes = {issue.line: issue.fix for issue in diagram.issues if issue.fix is not None}
+    statements = []
+    for line, (text, role) in enumerate(diagram.statements, 1):
+        fix = fixes.get(line)
+        if fix is None:
+            statements.append((text, role))
+        elif fix:
+            statements.append((fix, PLAIN if role == CLOSE else role))
+    # Unclosed blocks are reported on the line after the last statement
+    closers = fixes.get(len(diagram.statements) + 1)
+    if closers:
+        statements.extend((closer, CLOSE) for closer in closers.split("\n"))
+
+    fixed = parse_mermaid(format_statements(statements))
+    logger.info(f"Auto-repaired {len(fixes)} Mermaid issue(s), {len(fixed.issues)} left")
+    return fixed.to_code(), fixed
+
+
+class _Blocks:
+    """Tracks open blocks while walking statements"""
+
+    def __init__(self, diagram, closer):
+        self.diagram = diagram
+        self.closer = closer
+        self.stack = []
+
+    def open(self, line, name, value=None):
+        self.stack.append((line, name, value))
+
+    def close(self, line):
+        if not self.stack:
+            self.diagram.issues.append(Issue(line, f"'{self.closer}' without an open block", ""))
+            return None
+        return self.stack.pop()
+
+    def finish(self, describe):
+        if not self.stack:
+            return
+        end = len(self.diagram.statements) + 1
+        messages = [describe(line, name) for line, name, _ in reversed(self.stack)]
+        self.diagram.issues.append(Issue(end, "; ".join(messages), "\n".join([self.closer] * len(self.stack))))
+
+
+def _statement_tokens(diagram, text):
+    return [token for token in tokenize(text, diagram.diagram_type) if token.kind != COMMENT]
+
+
+def _accept_unknown(diagram, line, text, tokens):
+    """Accept a statement the parser does not model, unless a bracket or quote is left open
+
+    Mermaid grows new statements (create, destroy, links, ...) faster than
+    this parser, so only provable mistakes are reported.
+    """
+    unbalanced = [token for token in tokens if token.kind == OTHER and token.text in _UNBALANCED]
+    if unbalanced:
+        diagram.issues.append(Issue(line, f"unbalanced '{unbalanced[0].text}' in: {text}", None))
+
+
+def _parse_flowchart(diagram, statements):
+    blocks = _Blocks(diagram, "end")
+    for line, (text, role) in enumerate(statements, 1):
+        if role == HEADER:
+            diagram.header = diagram.header or (text if not text.startswith("%%") else None)
+            continue
+        tokens = _statement_tokens(diagram, text)
+        if not tokens:
+            continue
+        first = tokens[0]
+
+        if role == OPEN:
+            parent = blocks.stack[-1][2] if blocks.stack else None
+            title = text[len("subgraph"):].strip()
+            subgraph = Subgraph(tokens[1].text if len(tokens) > 1 else None, title, parent)
+            (parent.subgraphs if parent else diagram.subgraphs).append(subgraph)
+            blocks.open(line, "subgraph", subgraph)
+        elif role == CLOSE:
+            blocks.close(line)
+        elif first.kind == WORD and first.text in FLOWCHART_KEYWORDS:
+            if first.text == "direction" and (len(tokens) < 2 or tokens[1].text not in FLOWCHART_DIRECTIONS):
+                diagram.issues.append(Issue(line, "direction must be one of TB, TD, BT, RL, LR", None))
+        else:
+            subgraph = blocks.stack[-1][2] if blocks.stack else None
+            _parse_flowchart_chain(diagram, line, text, tokens, subgraph)
+
+    blocks.finish(lambda line, name: f"subgraph opened on line {line} is never closed")
+    _require_content(diagram, statements, bool(diagram.nodes or diagram.subgraphs))
+
+
+def _parse_flowchart_chain(diagram, line, text, tokens, subgraph):
+    """Parse ``A[x] & B -->|label| C`` style statements into nodes and edges"""
+    unknown = [token for token in tokens if token.kind == OTHER]
+    if any(token.text in _UNBALANCED for token in unknown):
+        diagram.issues.append(Issue(line, f"unbalanced '{unknown[0].text}' in: {text}", None))
+        return
+    if unknown:
+        # Syntax the lexer does not model (e.g. A@{ shape: rect }); accept as is
+        return
+
+    groups = []
+    arrows = []
+    current = []
+    reserved = []
+    i = 0
+    while i < len(tokens):
+        token = tokens[i]
+        if token.kind in (WORD, STRING):
+            shape = None
+            label = None
+            if i + 1 < len(tokens) and tokens[i + 1].kind == SHAPE:
+                i += 1
+                shape = tokens[i].text
+                label = _shape_label(shape)
+            if i + 1 < len(tokens) and tokens[i + 1].kind == CLASSREF:
+                i += 1
+            if token.text == "end":
+                reserved.append(token)
+            current.append(diagram.add_node(token.text, label, shape, subgraph).id)
+        elif token.kind == AMP and current:
+            pass
+        elif token.kind == ARROW and current:
+            label = None
+            if i + 1 < len(tokens) and tokens[i + 1].kind == LABEL:
+                i += 1
+                label = tokens[i].text[1:-1].strip()
+            groups.append(current)
+            arrows.append((token.text, label))
+            current = []
+        elif token.kind == STRAY:
+            pass
+        else:
+            diagram.issues.append(Issue(line, f"unexpected '{token.text}' in: {text}", None))
+            return
+        i += 1
+
+    if arrows and not current:
+        # Dangling link: keep the nodes, drop the link to nowhere
+        last_arrow = next(token for token in reversed(tokens) if token.kind == ARROW)
+        diagram.issues.append(Issue(line, f"link has no target in: {text}", text[:last_arrow.start].rstrip()))
+        return
+    groups.append(current)
+
+    if reserved:
+        fixed = text
+        for token in reversed(reserved):
+            fixed = fixed[:token.start] + "End" + fixed[token.end:]
+        diagram.issues.append(Issue(line, "'end' is reserved and cannot be a node id", fixed))
+
+    for (arrow, label), sources, targets in zip(arrows, groups, groups[1:]):
+        for source in sources:
+            for target in targets:
+                diagram.edges.append(Edge(source, target, arrow, label))
+
+
+def _shape_label(shape):
+    """Text inside a node shape such as ``[(Database)]``"""
+    label = shape.strip("[](){}/\\>")
+    if len(label) >= 2 and label[0] == label[-1] == '"':
+        label = label[1:-1]
+    return label.strip()
+
+
+def _parse_sequence(diagram, statements):
+    blocks = _Blocks(diagram, "end")
+    for line, (text, role) in enumerate(statements, 1):
+        if role == HEADER:
+            diagram.header = diagram.header or (text if not text.startswith("%%") else None)
+            continue
+        tokens = _statement_tokens(diagram, text)
+        if not tokens:
+            continue
+        first = tokens[0]
+        keyword = first.text if first.kind == WORD else None
+
+        if role == OPEN:
+            blocks.open(line, keyword)
+        elif role == CLOSE:
+            blocks.close(line)
+        elif keyword in _SEQUENCE_MIDDLES:
+            parent = _SEQUENCE_MIDDLES[keyword]
+            if not blocks.stack or blocks.stack[-1][1] != parent:
+                diagram.issues.append(Issue(line, f"'{keyword}' must be inside '{parent}'", None))
+        elif keyword in ("participant", "actor"):
+            if len(tokens) < 2:
+                diagram.issues.append(Issue(line, f"{keyword} has no name", ""))
+                continue
+            alias = text.split(" as ", 1)[1].strip() if " as " in text else None
+            diagram.participants[tokens[1].text] = Participant(tokens[1].text, alias, keyword)
+        elif keyword in ("note", "Note"):
+            if not any(token.kind == COLON for token in tokens):
+                diagram.issues.append(Issue(line, f"note has no ':' text: {text}", None))
+        elif keyword in ("activate", "deactivate"):
+            if len(tokens) < 2:
+                diagram.issues.append(Issue(line, f"{keyword} has no participant", ""))
+        elif keyword in ("autonumber", "title"):
+            pass
+        elif first.kind == WORD and len(tokens) > 1 and tokens[1].kind == ARROW:
+            if len(tokens) < 3 or tokens[2].kind not in (WORD, STRING):
+                diagram.issues.append(Issue(line, f"message has no receiver: {text}", None))
+                continue
+            source, target = first.text, tokens[2].text
+            for actor in (source, target):
+                diagram.participants.setdefault(actor, Participant(actor, None, "participant"))
+            message = text.split(":", 1)[1].strip() if ":" in text else None
+            diagram.edges.append(Edge(source, target, tokens[1].text, message))
+        else:
+            _accept_unknown(diagram, line, text, tokens)
+
+    blocks.finish(lambda line, name: f"'{name}' opened on line {line} is never closed")
+    _require_content(diagram, statements, bool(diagram.edges or diagram.participants))
+
+
+def _parse_class(diagram, statements):
+    blocks = _Blocks(diagram, "}")
+    for line, (text, role) in enumerate(statements, 1):
+        if role == HEADER:
+            diagram.header = diagram.header or (text if not text.startswith("%%") else None)
+            continue
+        tokens = _statement_tokens(diagram, text)
+        if not tokens:
+            continue
+        first = tokens[0]
+        keyword = first.text if first.kind == WORD else None
+
+        if role == OPEN:
+            name = tokens[1].text if len(tokens) > 1 else None
+            if keyword == "namespace":
+                blocks.open(line, f"namespace {name}", keyword)
+                continue
+            if name:
+                diagram.add_node(name, shape="class")
+            blocks.open(line, f"class {name}", keyword)
+        elif role == CLOSE:
+            blocks.close(line)
+        elif blocks.stack and blocks.stack[-1][2] != "namespace":
+            # Members inside a class body are free text
+            continue
+        elif keyword == "class":
+            if len(tokens) < 2 or tokens[1].kind != WORD:
+                diagram.issues.append(Issue(line, "class has no name", ""))
+                continue
+            diagram.add_node(tokens[1].text, shape="class")
+        elif first.kind == ANNOTATION or keyword in CLASS_KEYWORDS:
+            continue
+        elif first.kind == WORD:
+            relation = [token for token in tokens if token.kind != STRING]
+            if len(relation) > 1 and relation[1].kind == ARROW:
+                if len(relation) < 3 or relation[2].kind != WORD:
+                    diagram.issues.append(Issue(line, f"relation has no target class: {text}", None))
+                    continue
+                source, target = relation[0].text, relation[2].text
+                diagram.add_node(source, shape="class")
+                diagram.add_node(target, shape="class")
+                label = text.split(":", 1)[1].strip() if ":" in text else None
+                diagram.edges.append(Edge(source, target, relation[1].text, label))
+            elif len(tokens) > 1 and tokens[1].kind == COLON:
+                diagram.add_node(first.text, shape="class")
+            else:
+                _accept_unknown(diagram, line, text, tokens)
+        else:
+            _accept_unknown(diagram, line, text, tokens)
+
+    blocks.finish(lambda line, name: f"{name} opened on line {line} is never closed")
+    _require_content(diagram, statements, bool(diagram.nodes))
+
+
+def _parse_gantt(diagram, statements):
+    for line, (text, role) in enumerate(statements, 1):
+        if role == HEADER:
+            diagram.header = diagram.header or (text if not text.startswith("%%") else None)
+            continue
+        tokens = _statement_tokens(diagram, text)
+        if not tokens or (tokens[0].kind == WORD and tokens[0].text in GANTT_KEYWORDS):
+            continue
+        name, colon, metadata = text.partition(":")
+        if not colon or not metadata.strip():
+            diagram.issues.append(Issue(line, f"task has no ':' metadata: {text}", None))
+            continue
+        items = [item.strip() for item in metadata.split(",")]
+        # A task id is a leading item that is neither a date, a duration nor a dependency
+        task_id = items[0] if len(items) > 2 else name.strip()
+        diagram.add_node(task_id, name.strip(), "task")
+    _require_content(diagram, statements, bool(diagram.nodes))
+
+
+def _parse_pie(diagram, statements):
+    for line, (text, role) in enumerate(statements, 1):
+        if role == HEADER:
+            diagram.header = diagram.header or (text if not text.startswith("%%") else None)
+            continue
+        tokens = _statement_tokens(diagram, text)
+        if not tokens or (tokens[0].kind == WORD and tokens[0].text == "title"):
+            continue
+        if len(tokens) == 3 and tokens[0].kind == STRING and tokens[1].kind == COLON:
+            try:
+                value = float(tokens[2].text)
+            except ValueError:
+                value = -1
+            if value < 0:
+                diagram.issues.append(Issue(line, f"slice value must be a non-negative number: {text}", None))
+                continue
+            diagram.add_node(tokens[0].text[1:-1], tokens[2].text, "slice")
+        else:
+            diagram.issues.append(Issue(line, f"expected '\"label\" : value': {text}", None))
+    _require_content(diagram, statements, bool(diagram.nodes))
+
+
+def _require_content(diagram, statements, has_content):
+    if not has_content and not diagram.issues:
+        diagram.issues.append(Issue(len(statements), f"{diagram.diagram_type} diagram is empty", None))
+
+
+_PARSERS = {
+    FLOWCHART: _parse_flowchart,
+    SEQUENCE: _parse_sequence,
+    CLASS: _parse_class,
+    GANTT: _parse_gantt,
+    PIE: _parse_pie,
+}
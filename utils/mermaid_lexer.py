@@ -0,0 +1,796 @@
+import re
+import logging
+from collections import namedtuple
+
+logger = logging.getLogger(__name__)
+
+# Diagram types the lexer understands
+FLOWCHART = "flowchart"
+SEQUENCE = "sequence"
+CLASS = "class"
+GANTT = "gantt"
+PIE = "pie"
+
+HEADER_TYPES = {
+    "graph": FLOWCHART,
+    "flowchart": FLOWCHART,
+    "sequenceDiagram": SEQUENCE,
+    "classDiagram": CLASS,
+    "classDiagram-v2": CLASS,
+    "gantt": GANTT,
+    "pie": PIE,
+}
+
+# Header inserted when a diagram has none
+DEFAULT_HEADERS = {
+    FLOWCHART: "graph LR",
+    SEQUENCE: "sequenceDiagram",
+    CLASS: "classDiagram",
+    GANTT: "gantt",
+    PIE: "pie",
+}
+
+FLOWCHART_DIRECTIONS = {"TD", "TB", "BT", "RL", "LR"}
+
+# Code with at most this many lines is treated as collapsed onto one line
+COLLAPSED_MAX_LINES = 3
+
+INDENT = "    "
+
+Token = namedtuple("Token", ["kind", "text", "start", "end"])
+
+# Token kinds
+NEWLINE = "newline"
+COMMENT = "comment"
+STRING = "string"
+LABEL = "label"
+ARROW = "arrow"
+SHAPE = "shape"
+CLASSREF = "classref"
+ANNOTATION = "annotation"
+AMP = "amp"
+COLON = "colon"
+COMMA = "comma"
+LBRACE = "lbrace"
+RBRACE = "rbrace"
+WORD = "word"
+STRAY = "stray"
+OTHER = "other"
+
+# Statement roles, used for indentation
+PLAIN = 0
+OPEN = 1
+MIDDLE = 2
+CLOSE = 3
+HEADER = 4
+
+_HEAD = r"(?P<newline>\r?\n|;)|(?P<comment>%%\{.*?\}%%|%%[^\n]*)"
+
+# Whitespace is skipped by a prefix on every token rather than matched as a token
+_SPACE = r"[ \t\f\v\r]*(?:"
+
+# Flowchart node shapes as (opener, closer); longer openers first
+_SHAPES = (
+    ("(((", ")))"), ("((", "))"), ("([", "])"), ("[[", "]]"), ("[(", ")]"), ("{{", "}}"),
+    ("[/", "/]"), ("[\\", "\\]"), ("[/", "\\]"), ("[\\", "/]"),
+    ("[", "]"), ("(", ")"), ("{", "}"), (">", "]"),
+)
+
+
+def _shape_pattern():
+    alternatives = []
+    for opener, closer in _SHAPES:
+        # Text may contain quoted strings but not the closing bracket
+        content = f'(?:"[^"\\n]*"|[^"\\n{re.escape(closer[-1])}])*?'
+        alternatives.append(f"{re.escape(opener)}{content}{re.escape(closer)}")
+    return "|".join(alternatives)
+
+
+_TOKEN_PATTERNS = {
+    FLOWCHART: re.compile(_SPACE + "|".join([
+        _HEAD,
+        r"(?P<classref>:::[\w\-]+)",
+        r'(?P<string>"[^"\n]*")',
+        r"(?P<label>\|[^|\n]*\|)",
+        r"(?P<stray>(?<=\|)>)",
+        r"(?P<arrow>(?<!\w)(?:o(?:-{2,}|={2,}|-\.+-)o|x(?:-{2,}|={2,}|-\.+-)x)(?!\w)"
+        r"|<?(?:-{2,}|={2,}|-\.+-)(?:>|[ox](?!\w))?|~~~|(?<![-=<])->(?!>)|→)",
+        f"(?P<shape>{_shape_pattern()})",
+        r"(?P<amp>&)",
+        r"(?P<colon>:)",
+        r"(?P<comma>,)",
+        r"(?P<word>\w+(?:[.\-]\w+)*)",
+        r"(?P<other>.)",
+    ]) + ")", re.UNICODE),
+    SEQUENCE: re.compile(_SPACE + "|".join([
+        _HEAD,
+        r'(?P<string>"[^"\n]*")',
+        r"(?P<arrow><<-{1,2}>>|-{1,2}(?:>>|>|x|\))[+\-]?)",
+        r"(?P<colon>:)",
+        r"(?P<comma>,)",
+        # Actor IDs may contain hyphens that do not start an arrow, e.g. API-Gateway
+        r'(?P<word>[^\s:;,<>\-+"]+(?:-(?![->x)])[^\s:;,<>\-+"]+)*)',
+        r"(?P<other>.)",
+    ]) + ")"),
+    CLASS: re.compile(_SPACE + "|".join([
+        _HEAD,
+        r"(?P<classref>:::[\w\-]+)",
+        r'(?P<string>"[^"\n]*")',
+        r"(?P<annotation><<[^>\n]*>>)",
+        r"(?P<arrow>\(\)--|--\(\)|<\|--|<\|\.\.|\*--|(?<!\w)o--|<--|<\.\.|--\|>|\.\.\|>|--\*|--o(?!\w)|-->|\.\.>|--|\.\.)",
+        r"(?P<lbrace>\{)",
+        r"(?P<rbrace>\})",
+        r"(?P<colon>:)",
+        r"(?P<comma>,)",
+        r"(?P<word>[\w$~]+)",
+        r"(?P<other>.)",
+    ]) + ")"),
+    GANTT: re.compile(_SPACE + "|".join([
+        _HEAD,
+        r"(?P<colon>:)",
+        r"(?P<comma>,)",
+        r"(?P<word>[^\s:;,]+)",
+        r"(?P<other>.)",
+    ]) + ")"),
+    PIE: re.compile(_SPACE + "|".join([
+        _HEAD,
+        r'(?P<string>"[^"\n]*")',
+        r"(?P<colon>:)",
+        r'(?P<word>[^\s:;"]+)',
+        r"(?P<other>.)",
+    ]) + ")"),
+}
+
+# Statement keywords per diagram type
+FLOWCHART_KEYWORDS = {"subgraph", "end", "direction", "style", "classDef", "class", "click", "linkStyle"}
+SEQUENCE_BLOCKS = {"loop", "alt", "opt", "par", "critical", "break", "rect", "box"}
+SEQUENCE_MIDDLES = {"else", "and", "option"}
+SEQUENCE_KEYWORDS = SEQUENCE_BLOCKS | SEQUENCE_MIDDLES | {
+    "participant", "actor", "note", "Note", "end", "activate", "deactivate", "autonumber", "title",
+}
+CLASS_KEYWORDS = {
+    "class", "namespace", "note", "direction", "classDef", "style", "cssClass", "click", "link", "callback",
+}
+GANTT_KEYWORDS = {
+    "title", "dateFormat", "axisFormat", "tickInterval", "excludes", "includes",
+    "todayMarker", "weekday", "section",
+}
+PIE_KEYWORDS = {"title", "showData"}
+
+_FLOW_OPEN_ARROWS = {"--", "=="}
+_FLOW_ARROW_ALIASES = {"->": "-->", "→": "-->"}
+
+_FIRST_WORD = re.compile(r"\s*(?:%%\{.*?\}%%\s*)*([\w\-]+)", re.DOTALL)
+_THREE_RUNS = re.compile(r"[^\s;]+(?:[ \t]+[^\s;]+){0,2}")
+_SEQUENCE_HINT = re.compile(r"\b(?:participant|actor)\b|->>|-->>")
+_CLASS_HINT = re.compile(r"<\|--|--\|>|\bclass\s+\w+\s*\{")
+_GANTT_HINT = re.compile(r"\bdateFormat\b|\bsection\b[^\n]*:")
+_PIE_HINT = re.compile(r'"[^"\n]*"\s*:\s*\d')
+
+
+def detect_diagram_type(code):
+    """Infer the Mermaid diagram type of some code
+
+    Args:
+        code: Mermaid code, with or without a header
+
+    Returns:
+        str: FLOWCHART, SEQUENCE, CLASS, GANTT, PIE, or None for another
+        declared Mermaid type (such as erDiagram) the lexer does not handle
+    """
+    match = _FIRST_WORD.match(code)
+    first = match.group(1) if match else ""
+    if first in HEADER_TYPES:
+        return HEADER_TYPES[first]
+    if re.fullmatch(r"[a-z]+[A-Z]\w*(?:-v\d)?|mindmap|timeline|journey|quadrantChart|sankey-beta", first):
+        # Another declared diagram type, e.g. stateDiagram or erDiagram
+        return None
+    if _SEQUENCE_HINT.search(code):
+        return SEQUENCE
+    if _CLASS_HINT.search(code):
+        return CLASS
+    if _GANTT_HINT.search(code):
+        return GANTT
+    if _PIE_HINT.search(code) and "-->" not in code:
+        return PIE
+    return FLOWCHART
+
+
+def tokenize(code, diagram_type):
+    """Split Mermaid code into tokens in one pass
+
+    Args:
+        code: Mermaid code
+        diagram_type: Diagram type from detect_diagram_type
+
+    Returns:
+        List[Token]: Tokens without whitespace
+    """
+    tokens = []
+    append = tokens.append
+    for match in _TOKEN_PATTERNS[diagram_type].finditer(code):
+        kind = match.lastgroup
+        append(Token(kind, match.group(kind), match.start(kind), match.end()))
+    return tokens
+
+
+class _Statements:
+    """Collects formatted statements with their block roles"""
+
+    def __init__(self):
+        self.items = []
+
+    def add(self, text, role=PLAIN):
+        text = text.strip()
+        if text:
+            self.items.append((text, role))
+
+
+class _Cursor:
+    """Token cursor shared by the per-type statement readers"""
+
+    def __init__(self, tokens, source, collapsed):
+        self.tokens = tokens
+        self.source = source
+        self.collapsed = collapsed
+        self.i = 0
+
+    def peek(self, offset=0):
+        index = self.i + offset
+        return self.tokens[index] if index < len(self.tokens) else None
+
+    def kind(self, offset=0):
+        token = self.peek(offset)
+        return token.kind if token else None
+
+    def next(self):
+        token = self.tokens[self.i]
+        self.i += 1
+        return token
+
+    def done(self):
+        return self.i >= len(self.tokens)
+
+    def span(self, first, last):
+        """Original text from the start of one token to the end of another"""
+        return self.source[first.start:last.end]
+
+    def rest_of_line(self):
+        """Consume tokens up to the next statement separator and return their text"""
+        first = last = None
+        while not self.done() and self.kind() != NEWLINE:
+            last = self.next()
+            first = first or last
+        return self.span(first, last) if first else ""
+
+    def three_runs(self):
+        """Consume a keyword and up to two whitespace-separated arguments, e.g. ``style A fill:#f9f``"""
+        match = _THREE_RUNS.match(self.source, self.peek().start)
+        while not self.done() and self.peek().start < match.end():
+            self.next()
+        return match.group()
+
+    def text_until(self, is_boundary):
+        """Consume free text up to a boundary and return its original spelling"""
+        first = last = None
+        while not self.done() and self.kind() != NEWLINE and not (first and is_boundary(self)):
+            last = self.next()
+            first = first or last
+        return self.span(first, last) if first else ""
+
+
+def _normalize_flow_arrow(text):
+    return _FLOW_ARROW_ALIASES.get(text, text)
+
+
+def _read_flowchart(cursor, out):
+    """Read flowchart statements: edge chains, node declarations and keywords"""
+    parts = []
+    after_node = False
+
+    def flush():
+        if parts:
+            out.add(" ".join(parts))
+            parts.clear()
+
+    while not cursor.done():
+        token = cursor.peek()
+        kind = token.kind
+
+        if kind == NEWLINE:
+            cursor.next()
+            flush()
+            after_node = False
+        elif kind == COMMENT:
+            cursor.next()
+            flush()
+            after_node = False
+            out.add(token.text)
+        elif kind == WORD and not parts and token.text in FLOWCHART_KEYWORDS:
+            _read_flowchart_keyword(cursor, out)
+        elif kind in (WORD, STRING):
+            if after_node:
+                # A node directly after a complete node starts a new statement
+                flush()
+                if token.text in FLOWCHART_KEYWORDS:
+                    after_node = False
+                    continue
+            cursor.next()
+            parts.append(token.text)
+            after_node = True
+        elif kind in (SHAPE, CLASSREF) and after_node:
+            cursor.next()
+            parts[-1] += token.text
+        elif kind == ARROW and after_node:
+            cursor.next()
+            parts.append(_read_flow_arrow(cursor, _normalize_flow_arrow(token.text)))
+            after_node = False
+        elif kind == LABEL and parts and not after_node:
+            cursor.next()
+            parts[-1] += token.text
+        elif kind == AMP:
+            cursor.next()
+            parts.append("&")
+            after_node = False
+        elif kind == STRAY:
+            cursor.next()
+        else:
+            cursor.next()
+            parts.append(token.text)
+    flush()
+
+
+def _read_flow_arrow(cursor, arrow):
+    """Attach an edge label, turning ``A -- text --> B`` into ``A -->|text| B``"""
+    if arrow in _FLOW_OPEN_ARROWS:
+        offset = 0
+        while cursor.kind(offset) in (WORD, STRING, OTHER, COMMA, COLON):
+            offset += 1
+        closing = cursor.peek(offset)
+        if offset and closing is not None and closing.kind == ARROW:
+            label = cursor.span(cursor.peek(), cursor.peek(offset - 1))
+            cursor.i += offset + 1
+            return f"{_normalize_flow_arrow(closing.text)}|{label}|"
+    if cursor.kind() == LABEL:
+        arrow += cursor.next().text
+        if cursor.kind() == STRAY:
+            cursor.next()
+    return arrow
+
+
+def _read_flowchart_keyword(cursor, out):
+    keyword = cursor.peek().text
+    if keyword == "end":
+        cursor.next()
+        out.add("end", CLOSE)
+    elif keyword == "subgraph":
+        out.add(_read_subgraph(cursor), OPEN)
+    elif keyword == "direction":
+        cursor.next()
+        direction = cursor.next().text if cursor.kind() == WORD else ""
+        out.add(f"direction {direction}")
+    elif not cursor.collapsed:
+        out.add(cursor.rest_of_line())
+    elif keyword == "click":
+        # click <node> <callback or "url"> ["tooltip"]
+        parts = [cursor.next().text]
+        if cursor.kind() == WORD:
+            parts.append(cursor.next().text)
+        if cursor.kind() in (WORD, STRING):
+            parts.append(cursor.next().text)
+        if cursor.kind() == STRING:
+            parts.append(cursor.next().text)
+        out.add(" ".join(parts))
+    else:
+        # style, classDef, class and linkStyle take a name and one property list
+        out.add(cursor.three_runs())
+
+
+def _read_subgraph(cursor):
+    cursor.next()
+    if not cursor.collapsed:
+        rest = cursor.rest_of_line()
+        return f"subgraph {rest}" if rest else "subgraph"
+
+    parts = ["subgraph"]
+    if cursor.kind() in (WORD, STRING):
+        parts.append(cursor.next().text)
+        if cursor.kind() == SHAPE:
+            parts[-1] += cursor.next().text
+            return " ".join(parts)
+    # Title words run until the first node of the subgraph body
+    while cursor.kind() == WORD and cursor.peek().text not in FLOWCHART_KEYWORDS and \
+            cursor.kind(1) not in (ARROW, SHAPE, AMP, CLASSREF):
+        parts.append(cursor.next().text)
+    return " ".join(parts)
+
+
+def _sequence_boundary(cursor):
+    """Collapsed free text in a sequence diagram ends before ``id ->>`` or a keyword"""
+    token = cursor.peek()
+    if not cursor.collapsed or token.kind != WORD:
+        return False
+    return cursor.kind(1) == ARROW or token.text in SEQUENCE_KEYWORDS
+
+
+def _read_sequence(cursor, out):
+    """Read sequence diagram statements: participants, messages, notes and blocks"""
+    while not cursor.done():
+        token = cursor.peek()
+        if token.kind == NEWLINE:
+            cursor.next()
+            continue
+        if token.kind == COMMENT:
+            out.add(cursor.next().text)
+            continue
+
+        keyword = token.text if token.kind == WORD else None
+        if keyword == "end":
+            cursor.next()
+            out.add("end", CLOSE)
+        elif keyword in SEQUENCE_BLOCKS or keyword in SEQUENCE_MIDDLES:
+            cursor.next()
+            text = cursor.text_until(_sequence_boundary)
+            out.add(f"{keyword} {text}", MIDDLE if keyword in SEQUENCE_MIDDLES else OPEN)
+        elif keyword in ("participant", "actor"):
+            cursor.next()
+            name = cursor.next().text if cursor.kind() in (WORD, STRING) else ""
+            alias = ""
+            if cursor.kind() == WORD and cursor.peek().text == "as":
+                cursor.next()
+                alias = " as " + cursor.text_until(_sequence_boundary)
+            out.add(f"{keyword} {name}{alias}")
+        elif keyword in ("note", "Note"):
+            cursor.next()
+            target = cursor.text_until(lambda c: c.kind() == COLON)
+            text = ""
+            if cursor.kind() == COLON:
+                cursor.next()
+                text = ": " + cursor.text_until(_sequence_boundary)
+            out.add(f"{keyword} {target}{text}")
+        elif keyword in ("activate", "deactivate"):
+            cursor.next()
+            name = cursor.next().text if cursor.kind() == WORD else ""
+            out.add(f"{keyword} {name}")
+        elif keyword == "autonumber":
+            # Optional start and step numbers
+            parts = [cursor.next().text]
+            while cursor.kind() == WORD and cursor.peek().text.isdigit():
+                parts.append(cursor.next().text)
+            out.add(" ".join(parts))
+        elif keyword == "title":
+            cursor.next()
+            out.add(f"title {cursor.text_until(_sequence_boundary)}")
+        elif token.kind == WORD and cursor.kind(1) == ARROW:
+            source = cursor.next().text
+            arrow = cursor.next().text
+            target = cursor.next().text if cursor.kind() in (WORD, STRING) else ""
+            text = ""
+            if cursor.kind() == COLON:
+                cursor.next()
+                text = ": " + cursor.text_until(_sequence_boundary)
+            out.add(f"{source}{arrow}{target}{text}")
+        else:
+            out.add(cursor.text_until(_sequence_boundary))
+
+
+def _class_boundary(cursor):
+    """Collapsed free text in a class diagram ends before the next member or relation"""
+    token = cursor.peek()
+    if not cursor.collapsed:
+        return False
+    if token.kind in (ANNOTATION, RBRACE):
+        return True
+    if token.kind in (WORD, STRING) and cursor.kind(1) in (ARROW, COLON):
+        return True
+    if token.kind == WORD and cursor.kind(1) == STRING and cursor.kind(2) == ARROW:
+        return True
+    return token.kind == WORD and token.text in CLASS_KEYWORDS
+
+
+def _read_class(cursor, out):
+    """Read class diagram statements: namespaces, classes with member blocks, members and relations"""
+    namespaces = 0
+    while not cursor.done():
+        token = cursor.peek()
+        if token.kind == NEWLINE:
+            cursor.next()
+            continue
+        if token.kind == COMMENT:
+            out.add(cursor.next().text)
+            continue
+
+        keyword = token.text if token.kind == WORD else None
+        if keyword == "namespace":
+            cursor.next()
+            name = cursor.next().text if cursor.kind() == WORD else ""
+            if cursor.kind() == LBRACE:
+                cursor.next()
+                namespaces += 1
+                out.add(f"namespace {name} {{", OPEN)
+            else:
+                out.add(f"namespace {name}")
+        elif token.kind == RBRACE and namespaces:
+            cursor.next()
+            namespaces -= 1
+            out.add("}", CLOSE)
+        elif keyword == "class":
+            cursor.next()
+            name = cursor.next().text if cursor.kind() == WORD else ""
+            if cursor.kind() == OTHER and cursor.peek().text == "[" and cursor.kind(1) == STRING and \
+                    cursor.kind(2) == OTHER and cursor.peek(2).text == "]":
+                # Display label, e.g. class Animal["Animal with a label"]
+                name += "".join(cursor.next().text for _ in range(3))
+            while cursor.kind() in (CLASSREF, STRING):
+                name += cursor.next().text if cursor.kind() == CLASSREF else " " + cursor.next().text
+            if cursor.kind() == LBRACE:
+                cursor.next()
+                out.add(f"class {name} {{", OPEN)
+                _read_class_members(cursor, out)
+                out.add("}", CLOSE)
+            else:
+                out.add(f"class {name}")
+        elif token.kind == ANNOTATION:
+            cursor.next()
+            name = cursor.next().text if cursor.kind() == WORD else ""
+            out.add(f"{token.text} {name}")
+        elif keyword == "note":
+            cursor.next()
+            parts = ["note"]
+            while not cursor.done() and cursor.kind() != NEWLINE:
+                part = cursor.next()
+                parts.append(part.text)
+                if part.kind == STRING:
+                    break
+            out.add(" ".join(parts))
+        elif keyword == "direction":
+            cursor.next()
+            out.add(f"direction {cursor.next().text if cursor.kind() == WORD else ''}")
+        elif keyword in CLASS_KEYWORDS:
+            out.add(cursor.three_runs() if cursor.collapsed else cursor.rest_of_line())
+        elif token.kind == WORD:
+            # <class> ["multiplicity"] <arrow> ["multiplicity"] <class> [: label], or <class> : <member>
+            parts = [cursor.next().text]
+            if cursor.kind() == STRING and cursor.kind(1) == ARROW:
+                parts.append(cursor.next().text)
+            if cursor.kind() == ARROW:
+                parts.append(cursor.next().text)
+                if cursor.kind() == STRING:
+                    parts.append(cursor.next().text)
+                if cursor.kind() == WORD:
+                    parts.append(cursor.next().text)
+            if cursor.kind() == COLON:
+                cursor.next()
+                parts += [":", cursor.text_until(_class_boundary)]
+            out.add(" ".join(parts))
+        else:
+            out.add(cursor.text_until(_class_boundary))
+
+
+def _read_class_members(cursor, out):
+    """Read a ``{ ... }`` member block, one member per statement"""
+    first = last = None
+    while not cursor.done() and cursor.kind() != RBRACE:
+        token = cursor.next()
+        previous = cursor.tokens[cursor.i - 2] if cursor.i >= 2 else None
+        starts_member = token.kind == NEWLINE or (
+            cursor.collapsed and token.kind in (OTHER, WORD) and token.text[0] in "+-#~"
+            and first is not None and previous is not None and token.start > previous.end
+        )
+        if starts_member and first:
+            out.add(cursor.span(first, last))
+            first = last = None
+        if token.kind != NEWLINE:
+            first = first or token
+            last = token
+    if first:
+        out.add(cursor.span(first, last))
+    if cursor.kind() == RBRACE:
+        cursor.next()
+
+
+def _gantt_boundary(cursor):
+    return cursor.collapsed and _is_keyword(cursor.peek(), GANTT_KEYWORDS)
+
+
+def _is_keyword(token, keywords):
+    return token is not None and token.kind == WORD and token.text in keywords
+
+
+def _read_gantt(cursor, out):
+    """Read gantt statements: settings, sections and tasks"""
+    while not cursor.done():
+        token = cursor.peek()
+        if token.kind == NEWLINE:
+            cursor.next()
+            continue
+        if token.kind == COMMENT:
+            out.add(cursor.next().text)
+            continue
+
+        if _is_keyword(token, GANTT_KEYWORDS):
+            cursor.next()
+            if not cursor.collapsed:
+                text = cursor.rest_of_line()
+            elif token.text == "section":
+                # Without line breaks, a section followed by a task keeps only its first word
+                words = 0
+                while cursor.kind(words) == WORD and not _is_keyword(cursor.peek(words), GANTT_KEYWORDS):
+                    words += 1
+                if cursor.kind(words) == COLON and words >= 2:
+                    words = 1
+                text = cursor.span(cursor.peek(), cursor.peek(words - 1)) if words else ""
+                cursor.i += words
+            else:
+                text = cursor.text_until(_gantt_boundary)
+            out.add(f"{token.text} {text}")
+            continue
+
+        name = cursor.text_until(lambda c: c.kind() == COLON or _gantt_boundary(c))
+        if cursor.kind() != COLON:
+            out.add(name)
+            continue
+        cursor.next()
+        metadata = _read_gantt_metadata(cursor) if cursor.collapsed else cursor.rest_of_line()
+        out.add(f"{name} :{metadata}")
+
+
+def _read_gantt_metadata(cursor):
+    """Read collapsed ``id, start, duration`` task metadata
+
+    Each comma-separated item is one word, or two for ``after <id>`` and
+    ``until <id>``; the first item not followed by a comma ends the task.
+    """
+    items = []
+    while cursor.kind() == WORD:
+        item = cursor.next().text
+        if item in ("after", "until") and cursor.kind() == WORD:
+            item += " " + cursor.next().text
+        items.append(item)
+        if cursor.kind() != COMMA:
+            break
+        cursor.next()
+    return ", ".join(items)
+
+
+def _read_pie(cursor, out):
+    """Read pie statements: title and ``"label" : value`` slices"""
+    while not cursor.done():
+        token = cursor.peek()
+        if token.kind == NEWLINE:
+            cursor.next()
+            continue
+        if token.kind == COMMENT:
+            out.add(cursor.next().text)
+            continue
+
+        if token.kind == WORD and token.text == "title":
+            cursor.next()
+            out.add(f"title {cursor.text_until(lambda c: c.kind() == STRING)}")
+        elif token.kind == STRING and cursor.kind(1) == COLON:
+            cursor.next()
+            cursor.next()
+            value = cursor.next().text if cursor.kind() == WORD else ""
+            out.add(f"{token.text} : {value}")
+        else:
+            out.add(cursor.text_until(lambda c: c.kind() == STRING))
+
+
+_READERS = {
+    FLOWCHART: _read_flowchart,
+    SEQUENCE: _read_sequence,
+    CLASS: _read_class,
+    GANTT: _read_gantt,
+    PIE: _read_pie,
+}
+
+# Types whose statements never span lines, so a line the lexer cannot read is kept as written
+_LINE_READERS = {FLOWCHART, SEQUENCE}
+
+
+def _read_header(cursor, diagram_type, out):
+    """Read init directives and the diagram header, adding a default header when missing"""
+    while cursor.kind() in (NEWLINE, COMMENT):
+        token = cursor.next()
+        if token.kind == COMMENT:
+            out.add(token.text, HEADER)
+
+    token = cursor.peek()
+    if token is None or token.kind != WORD or token.text not in HEADER_TYPES:
+        out.add(DEFAULT_HEADERS[diagram_type], HEADER)
+        return
+
+    header = [cursor.next().text]
+    if diagram_type == FLOWCHART and cursor.kind() == WORD and cursor.peek().text in FLOWCHART_DIRECTIONS:
+        header.append(cursor.next().text)
+    elif diagram_type == PIE and cursor.kind() == WORD and cursor.peek().text == "showData":
+        header.append(cursor.next().text)
+    out.add(" ".join(header), HEADER)
+
+
+def _read_lines(cursor, out, reader):
+    """Read multi-line code line by line, keeping lines with unrecognized syntax verbatim"""
+    while not cursor.done():
+        start = cursor.i
+        while not cursor.done() and cursor.kind() != NEWLINE:
+            cursor.next()
+        line = cursor.tokens[start:cursor.i]
+        if not cursor.done():
+            cursor.next()
+        if not line:
+            continue
+        if any(token.kind == OTHER for token in line):
+            out.add(cursor.span(line[0], line[-1]))
+        else:
+            reader(_Cursor(line, cursor.source, False), out)
+
+
+def split_statements(code):
+    """Split Mermaid code into statements
+
+    The code is tokenized by one compiled pattern and read in a single
+    forward pass, so the cost is linear in the length of the code.
+
+    Args:
+        code: Mermaid code, possibly collapsed onto a single line
+
+    Returns:
+        Tuple[str, List[Tuple[str, int]]]: Diagram type and (statement, role)
+        pairs, or (None, []) for diagram types the lexer does not handle
+    """
+    diagram_type = detect_diagram_type(code)
+    if diagram_type is None:
+        return None, []
+
+    collapsed = code.count("\n") < COLLAPSED_MAX_LINES
+    cursor = _Cursor(tokenize(code, diagram_type), code, collapsed)
+    statements = _Statements()
+    _read_header(cursor, diagram_type, statements)
+    if diagram_type in _LINE_READERS and not collapsed:
+        _read_lines(cursor, statements, _READERS[diagram_type])
+    else:
+        _READERS[diagram_type](cursor, statements)
+    return diagram_type, statements.items
+
+
+def format_statements(statements):
+    """Render statements one per line, indenting block bodies
+
+    Args:
+        statements: (statement, role) pairs from split_statements
+
+    Returns:
+        str: Formatted Mermaid code
+    """
+    lines = []
+    depth = 1
+    for text, role in statements:
+        if role == HEADER:
+            lines.append(text)
+            continue
+        if role == CLOSE:
+            depth = max(1, depth - 1)
+        lines.append(INDENT * (depth - 1 if role == MIDDLE else depth) + text)
+        if role == OPEN:
+            depth += 1
+    return "\n".join(lines)
+
+
+def repair_mermaid(code):
+    """Normalize Mermaid code to one statement per line
+
+    Handles code collapsed onto one line, missing headers, ``->`` and
+    ``-- text -->`` flowchart arrows and stray ``>`` after edge labels.
+    Diagram types other than flowchart, sequence, class, gantt and pie are
+    returned unchanged.
+
+    Args:
+        code: Mermaid code
+
+    Returns:
+        str: Repaired Mermaid code
+    """
+    diagram_type, statements = split_statements(code)
+    if diagram_type is None:
+        return code.strip()
+    return format_statements(statements)
@@ -0,0 +1,279 @@
+from typing import Dict, Optional, Tuple
+from collections import deque
+from contextlib import contextmanager
+import bisect
+import threading
+import time
+
+# Histogram bucket upper bounds, in seconds for timings
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# Buckets for throughput metrics, in tokens per second
+RATE_BUCKETS = (10, 25, 50, 100, 200, 400, 800, 1600)
+
+# Prefix for exported metric names
+METRIC_PREFIX = "architect_"
+
+
+def percentile(samples, fraction: float) -> Optional[float]:
+    """Nearest-rank percentile of a sample collection
+
+    Shared by the router, hedging, the scheduler, benchmarks and the
+    histogram summaries so every reported p95 means the same thing.
+
+    Args:
+        samples: Numeric samples
+        fraction: Percentile as a fraction, e.g. 0.95
+
+    Returns:
+        float: Percentile value, or None if there are no samples
+    """
+    ordered = sorted(samples)
+    if not ordered:
+        return None
+    index = min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))
+    return ordered[index]
+
+
+def _label_key(labels: Optional[Dict[str, str]]) -> Tuple:
+    return tuple(sorted((labels or {}).items()))
+
+
+class Metrics:
+    """Metrics interface; this base implementation discards measurements
+
+    Backends override observe() and increment(). Instrumented code only
+    talks to this interface, so the backend can be swapped with
+    set_metrics() without touching call sites.
+    """
+
+    def observe(self, name: str, value: float, labels: Optional[Dict[str, str]] = None):
+        """Record a measurement, e.g. a duration in seconds
+
+        Args:
+            name: Metric name
+            value: Measured value
+            labels: Optional label values
+        """
+
+    def increment(self, name: str, amount: float = 1, labels: Optional[Dict[str, str]] = None):
+        """Increase a counter
+
+        Args:
+            name: Metric name
+            amount: Amount to add
+            labels: Optional label values
+        """
+
+
+class _Histogram:
+    """Cumulative bucket counts plus a window of recent samples for percentiles"""
+
+    def __init__(self, buckets: Tuple[float, ...], window_size: int):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.recent = deque(maxlen=window_size)
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.counts):
+            self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+        self.recent.append(value)
+
+
+class HistogramMetrics(Metrics):
+    """In-process metrics backend with histograms and counters"""
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS, window_size: int = 500,
+                 metric_buckets: Optional[Dict[str, Tuple[float, ...]]] = None):
+        """Initialize the backend
+
+        Args:
+            buckets: Default histogram bucket upper bounds
+            window_size: Recent samples kept per series for percentiles
+            metric_buckets: Bucket bounds for specific metric names
+        """
+        self.buckets = tuple(sorted(buckets))
+        self.metric_buckets = {"generation_tokens_per_second": RATE_BUCKETS}
+        self.metric_buckets.update(metric_buckets or {})
+        self.window_size = window_size
+        self._lock = threading.Lock()
+        self._histograms: Dict[str, Dict[Tuple, _Histogram]] = {}
+        self._counters: Dict[str, Dict[Tuple, float]] = {}
+
+    def observe(self, name: str, value: float, labels: Optional[Dict[str, str]] = None):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                buckets = tuple(sorted(self.metric_buckets.get(name, self.buckets)))
+                histogram = series[key] = _Histogram(buckets, self.window_size)
+            histogram.observe(value)
+
+    def increment(self, name: str, amount: float = 1, labels: Optional[Dict[str, str]] = None):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + amount
+
+    def summary(self, name: str) -> Dict[str, Dict[str, float]]:
+        """Summarize a histogram per label set
+
+        Args:
+            name: Metric name
+
+        Returns:
+            Dict: Label string to count, average, p50 and p95
+        """
+        with self._lock:
+            series = {key: (h.count, h.sum, list(h.recent))
+                      for key, h in self._histograms.get(name, {}).items()}
+
+        summaries = {}
+        for key, (count, total, recent) in series.items():
+            label = ",".join(f"{k}={v}" for k, v in key)
+            summaries[label] = {
+                "count": count,
+                "avg": total / count if count else 0.0,
+                "p50": percentile(recent, 0.50) or 0.0,
+                "p95": percentile(recent, 0.95) or 0.0,
+            }
+        return summaries
+
+    def to_prometheus(self) -> str:
+        """Render all series in the Prometheus text exposition format
+
+        Returns:
+            str: Exposition text
+        """
+        lines = []
+        with self._lock:
+            for name in sorted(self._counters):
+                metric = f"{METRIC_PREFIX}{name}_total"
+                lines.append(f"# TYPE {metric} counter")
+                for key, value in sorted(self._counters[name].items()):
+                    lines.append(f"{metric}{_format_labels(key)} {value}")
+
+            for name in sorted(self._histograms):
+                metric = f"{METRIC_PREFIX}{name}"
+                lines.append(f"# TYPE {metric} histogram")
+                for key, histogram in sorted(self._histograms[name].items()):
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets, histogram.counts):
+                        cumulative += count
+                        lines.append(
+                            f"{metric}_bucket{_format_labels(key + (('le', repr(float(bound))),))} {cumulative}"
+                        )
+                    lines.append(f"{metric}_bucket{_format_labels(key + (('le', '+Inf'),))} {histogram.count}")
+                    lines.append(f"{metric}_sum{_format_labels(key)} {histogram.sum}")
+                    lines.append(f"{metric}_count{_format_labels(key)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+def _format_labels(key: Tuple) -> str:
+    if not key:
+        return ""
+    pairs = []
+    for name, value in key:
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{name}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+class StageTimer:
+    """Per-request stage timings for the generation pipeline
+
+    Stage durations accumulate, so a stage measured in several pieces (such
+    as incremental parsing of each streamed chunk) reports its total.
+    finish() sends every stage to the metrics backend once.
+    """
+
+    def __init__(self, labels: Optional[Dict[str, str]] = None, metrics: Optional[Metrics] = None):
+        """Initialize the timer
+
+        Args:
+            labels: Labels attached to every recorded measurement, e.g. the model
+            metrics: Backend to record into, defaults to get_metrics()
+        """
+        self.labels = dict(labels or {})
+        self.metrics = metrics
+        self.stages: Dict[str, float] = {}
+        self.values: Dict[str, float] = {}
+        self.finished = False
+
+    @contextmanager
+    def stage(self, name: str):
+        """Time the with-block as (part of) a stage
+
+        Args:
+            name: Stage name
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def record(self, name: str, seconds: float):
+        """Add a duration to a stage
+
+        Args:
+            name: Stage name
+            seconds: Duration in seconds
+        """
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def set(self, name: str, value: float):
+        """Record a non-duration value, e.g. tokens per second
+
+        Args:
+            name: Value name
+            value: Measured value
+        """
+        self.values[name] = value
+
+    def finish(self):
+        """Record all stages and values in the metrics backend"""
+        if self.finished:
+            return
+        self.finished = True
+        metrics = self.metrics or get_metrics()
+        for name, seconds in self.stages.items():
+            metrics.observe("generation_stage_seconds", seconds, dict(self.labels, stage=name))
+        for name, value in self.values.items():
+            metrics.observe(f"generation_{name}", value, self.labels)
+
+    def as_dict(self) -> Dict[str, float]:
+        """Get stage durations and values
+
+        Returns:
+            Dict: Stage name to seconds, plus recorded values
+        """
+        return dict(self.stages, **self.values)
+
+
+_metrics: Metrics = HistogramMetrics()
+
+
+def get_metrics() -> Metrics:
+    """Get the process-wide metrics backend
+
+    Returns:
+        Metrics: Current backend
+    """
+    return _metrics
+
+
+def set_metrics(metrics: Metrics):
+    """Replace the process-wide metrics backend
+
+    Args:
+        metrics: New backend, e.g. Metrics() to disable recording
+    """
+    global _metrics
+    _metrics = metrics
@@ -0,0 +1,121 @@
+from typing import Optional
+import threading
+import time
+
+
+class TokenBucket:
+    """Thread-safe token bucket
+
+    Tokens refill continuously at ``rate`` per second up to ``capacity``, so
+    short bursts are allowed while the long-run rate stays at ``rate``.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        """Initialize a full bucket
+
+        Args:
+            rate: Tokens added per second
+            capacity: Maximum tokens held, defaults to one second of refill
+        """
+        if rate <= 0:
+            raise ValueError("Token bucket rate must be positive")
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def per_minute(cls, amount: float, burst: Optional[float] = None) -> "TokenBucket":
+        """Build a bucket from a per-minute quota
+
+        Args:
+            amount: Tokens allowed per minute
+            burst: Maximum burst, defaults to one second of refill
+
+        Returns:
+            TokenBucket: Configured bucket
+        """
+        return cls(amount / 60.0, burst)
+
+    def _refill(self, now: float):
+        """Add tokens for the time elapsed since the last refill; caller holds the lock"""
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, tokens: float = 1) -> float:
+        """Take tokens if available without waiting
+
+        Args:
+            tokens: Tokens to take
+
+        Returns:
+            float: 0 if the tokens were taken, otherwise seconds until they would be available
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            wait = self._wait_time(tokens)
+            if wait == 0:
+                self._tokens -= tokens
+            return wait
+
+    def wait_time(self, tokens: float = 1) -> float:
+        """Get the seconds until tokens would be available, without taking them
+
+        Args:
+            tokens: Tokens needed
+
+        Returns:
+            float: 0 if available now, otherwise seconds to wait
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            return self._wait_time(tokens)
+
+    def _wait_time(self, tokens: float) -> float:
+        # Requests larger than the bucket are admitted once it is full
+        needed = min(tokens, self.capacity)
+        if self._tokens >= needed:
+            return 0.0
+        return (needed - self._tokens) / self.rate
+
+    def credit(self, tokens: float):
+        """Return unused tokens, or take extra ones when usage exceeded the estimate
+
+        The balance may go negative, which delays later acquisitions until
+        the overdraft is repaid.
+
+        Args:
+            tokens: Tokens to add; negative values take tokens
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self.capacity, self._tokens + tokens)
+
+    def acquire(self, tokens: float = 1, timeout: Optional[float] = None) -> bool:
+        """Take tokens, waiting for the bucket to refill if needed
+
+        Args:
+            tokens: Tokens to take
+            timeout: Maximum seconds to wait, None waits forever
+
+        Returns:
+            bool: True if the tokens were taken, False on timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self.try_acquire(tokens)
+            if wait == 0:
+                return True
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            time.sleep(wait)
+
+    def available(self) -> float:
+        """Get the tokens currently in the bucket"""
+        with self._lock:
+            self._refill(time.monotonic())
+            return self._tokens
@@ -0,0 +1,45 @@
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseBuffer:
+    """Accumulates streamed response chunks with amortized appends
+
+    Chunks are collected in a list and joined lazily, so appending is O(1)
+    instead of re-copying the whole response on every token.
+    """
+
+    def __init__(self):
+        """Initialize an empty buffer"""
+        self._chunks = []
+        self._length = 0
+        self._text = ""
+        self._dirty = False
+
+    def append(self, chunk):
+        """Append a streamed chunk
+
+        Args:
+            chunk: Text chunk from the model stream
+        """
+        if not chunk:
+            return
+        self._chunks.append(chunk)
+        self._length += len(chunk)
+        self._dirty = True
+
+    def __len__(self):
+        return self._length
+
+    def getvalue(self):
+        """Get the full accumulated text
+
+        Returns:
+            str: Accumulated response text
+        """
+        if self._dirty:
+            self._text = "".join(self._chunks)
+            self._chunks = [self._text]
+            self._dirty = False
+        return self._text